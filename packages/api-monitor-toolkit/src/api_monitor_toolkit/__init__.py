@@ -5,6 +5,8 @@ from api_monitor_toolkit.commands.analyzer import analyzer as analyzer_command
 from api_monitor_toolkit.commands.spider import spider as spider_command
 
 logger = get_logger(__name__)
+# Windows-only dependencies (pywin32, pefile, ...) are imported inside the
+# commands, so the CLI and its --help load on any platform.
 app = typer.Typer(no_args_is_help=True, pretty_exceptions_show_locals=False)
 
 app.command()(analyzer_command)
@@ -1,36 +1,10 @@
 import shlex
 import shutil
-import subprocess
-import sys
-import time
-import zipfile
 from enum import Enum
 from pathlib import Path
 from typing import Annotated
 
-import psutil
-import requests
 import typer
-import win32com.client
-from api_monitor_toolkit.core.monitor import (
-    fill_monitor_form,
-    open_monitor_dialog,
-    set_foreground,
-    wait_for_window,
-)
-from api_monitor_toolkit.core.runner import (
-    close_monitor,
-    detect_arch,
-    kill_target_processes,
-    launch_monitor,
-    wait_for_process_exit_unbounded,
-    wait_for_process_start,
-)
-from api_monitor_toolkit.utils.trace import (
-    get_results,
-    save_apmx,
-    save_results,
-)
 from common.callbacks import verbose_callback
 from common.logger import get_logger
 
@@ -89,6 +63,27 @@ def analyzer(
     If the user presses Ctrl+C at any point, save any partial trace, close API Monitor, kill the target,
     and still zip whatever files exist before exiting.
     """
+    import win32com.client
+    from api_monitor_toolkit.core.monitor import (
+        fill_monitor_form,
+        open_monitor_dialog,
+        set_foreground,
+        wait_for_window,
+    )
+    from api_monitor_toolkit.core.runner import (
+        close_monitor,
+        detect_arch,
+        kill_target_processes,
+        launch_monitor,
+        wait_for_process_exit_unbounded,
+        wait_for_process_start,
+    )
+    from api_monitor_toolkit.utils.trace import (
+        get_results,
+        save_apmx,
+        save_results,
+    )
+
     binary = input.resolve()
     workdir = working_directory.resolve()
     args = shlex.split(arguments)
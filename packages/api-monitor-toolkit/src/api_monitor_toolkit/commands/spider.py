@@ -3,11 +3,6 @@ from pathlib import Path
 from typing import Annotated
 
 import typer
-import win32com.client
-from api_monitor_toolkit.core.monitor import send_text, set_foreground, wait_for_window
-from api_monitor_toolkit.core.runner import close_monitor, launch_monitor
-from api_monitor_toolkit.output.handler import get_output_handler
-from api_monitor_toolkit.services.spider_controller import SpiderController
 from common.callbacks import verbose_callback
 from common.checks import check_python, is_admin
 from common.logger import get_logger
@@ -34,6 +29,8 @@ def detect_apmx_arch(apmx_path: Path) -> str:
 
 
 def load_apmx(shell, apmx_path: Path, timeout=2.5):
+    from api_monitor_toolkit.core.monitor import send_text
+
     time.sleep(timeout)
     shell.SendKeys("^o")  # Ctrl+O to open APMX file
     time.sleep(1)
@@ -69,6 +66,12 @@ def spider(
     If --input is provided, API Monitor will be launched and the trace will be loaded.
     If not, it assumes API Monitor is already open with the trace loaded.
     """
+    import win32com.client
+    from api_monitor_toolkit.core.monitor import set_foreground, wait_for_window
+    from api_monitor_toolkit.core.runner import close_monitor, launch_monitor
+    from api_monitor_toolkit.output.handler import get_output_handler
+    from api_monitor_toolkit.services.spider_controller import SpiderController
+
     if not is_admin():
         logger.error("This script must be run as administrator when using --input.")
         raise typer.Exit(code=1)
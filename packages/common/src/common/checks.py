@@ -4,8 +4,6 @@ import re
 import subprocess
 import sys
 
-import psutil
-
 from common.logger import get_logger
 
 logger = get_logger(__name__)
@@ -46,6 +44,8 @@ def check_python() -> int:
 
 
 def check_process_arch(pid):
+    import psutil
+
     try:
         proc = psutil.Process(pid)
         exe_path = proc.exe()
@@ -0,0 +1,252 @@
+"""
+Benchmark suite for ioc-extractor, run over a synthetic trace and the shipped
+`patterns/`.
+
+    python bench.py run -n 20000 -o results.json
+    python bench.py compare baseline.json results.json
+
+Each benchmark is timed `--repeat` times; the JSON result keeps the minimum and
+median per benchmark together with the commit, interpreter and parameters, so
+runs can be compared across commits with `compare`.
+"""
+
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Annotated, Any, Callable
+
+import typer
+from ioc_extractor.engine.executor import execute_rule
+from ioc_extractor.engine.matcher import evaluate_conditions
+from ioc_extractor.engine.selector import resolve_selector
+from ioc_extractor.rules.modifiers import apply_modifiers
+from ioc_extractor.rules.rule_loader import load_query_rules
+from ioc_extractor.utils.io import read_json_chunks
+from ioc_extractor.utils.pipeline_executor import PipelineOptions, run_pipeline
+from trace_generator import TraceGenerator
+
+PATTERNS_DIR = Path(__file__).resolve().parent.parent / "patterns"
+RESULT_FORMAT = "ioc-extractor/bench"
+RESULT_VERSION = 1
+
+# Selectors representative of the shipped patterns
+SELECTORS = [
+    "api",
+    "metadata.pid",
+    "parameters[?name=='hKey'].pre_value",
+    "parameters[?name=='lpFileName'].post_value",
+    "call_stack[0].module",
+]
+
+app = typer.Typer(add_completion=False)
+
+
+def pattern_files(root: Path = PATTERNS_DIR) -> list[Path]:
+    """Shipped pattern files that hold rules (metadata-only stubs are skipped)."""
+    files = []
+    for path in sorted(root.rglob("*.y*ml")):
+        if path.name.startswith("template"):
+            continue
+        try:
+            load_query_rules([path])
+        except ValueError:
+            continue
+        files.append(path)
+    return files
+
+
+def collect_transforms(rules: list[dict]) -> list[list]:
+    return [
+        sel["transform"]
+        for rule in rules
+        for sel in rule["variant"].get("select", [])
+        if sel.get("transform")
+    ]
+
+
+def timed(fn: Callable[[], Any], repeat: int) -> list[float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+@app.command()
+def run(
+    entries: Annotated[
+        int, typer.Option("-n", "--entries", help="Entries in the synthetic trace")
+    ] = 20000,
+    sample: Annotated[
+        int, typer.Option("--sample", help="Entries used by the micro-benchmarks")
+    ] = 2000,
+    repeat: Annotated[int, typer.Option("-r", "--repeat")] = 5,
+    workers: Annotated[int, typer.Option("-t", "--threads")] = 4,
+    chunk: Annotated[int, typer.Option("-c", "--chunk")] = 1000,
+    seed: Annotated[int, typer.Option("--seed")] = 0,
+    skew: Annotated[float, typer.Option("--skew")] = 1.0,
+    stack_depth: Annotated[int, typer.Option("--stack-depth")] = 4,
+    extra_params: Annotated[int, typer.Option("--extra-params")] = 0,
+    only: Annotated[
+        list[str], typer.Option("--only", help="Run only these benchmarks")
+    ] = None,
+    output: Annotated[Path, typer.Option("-o", "--output")] = None,
+):
+    """Generate a trace, run the benchmarks and print (or save) the results."""
+    # Shipped patterns log warnings (e.g. unknown transforms) on every evaluation
+    logging.basicConfig(level=logging.ERROR)
+    rules = load_query_rules(pattern_files())
+    where_clauses = [r["variant"]["where"] for r in rules if r["variant"].get("where")]
+    transforms = collect_transforms(rules)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        trace = Path(tmp) / "trace.json"
+        TraceGenerator(seed, skew, extra_params, stack_depth).write(trace, entries)
+        entries_sample = list(
+            TraceGenerator(seed, skew, extra_params, stack_depth).entries(sample)
+        )
+        strings = [
+            p["post_value"]
+            for e in entries_sample
+            for p in e["parameters"]
+            if isinstance(p["post_value"], str)
+        ][:sample]
+
+        def bench_evaluate_conditions():
+            for entry in entries_sample:
+                for where in where_clauses:
+                    evaluate_conditions(entry, where)
+
+        def bench_resolve_selector():
+            for entry in entries_sample:
+                for selector in SELECTORS:
+                    resolve_selector(entry, selector)
+
+        def bench_apply_modifiers():
+            for value in strings:
+                for chain in transforms:
+                    apply_modifiers(value, chain)
+
+        def bench_execute_rule():
+            for entry in entries_sample:
+                for rule in rules:
+                    execute_rule(entry, rule, "bench")
+
+        def bench_read_json_chunks():
+            for _ in read_json_chunks(trace, chunk):
+                pass
+
+        def bench_run_pipeline():
+            run_pipeline(
+                [str(trace)],
+                {str(trace): chunk},
+                workers,
+                rules,
+                PipelineOptions(output_path=str(Path(tmp) / "out.json")),
+            )
+
+        # name -> (benchmark, operations per run)
+        benchmarks = {
+            "evaluate_conditions": (
+                bench_evaluate_conditions,
+                len(entries_sample) * len(where_clauses),
+            ),
+            "resolve_selector": (
+                bench_resolve_selector,
+                len(entries_sample) * len(SELECTORS),
+            ),
+            "apply_modifiers": (bench_apply_modifiers, len(strings) * len(transforms)),
+            "execute_rule": (bench_execute_rule, len(entries_sample) * len(rules)),
+            "read_json_chunks": (bench_read_json_chunks, entries),
+            "run_pipeline": (bench_run_pipeline, entries),
+        }
+
+        results = {}
+        for name, (fn, ops) in benchmarks.items():
+            if only and name not in only:
+                continue
+            samples = timed(fn, 1 if name == "run_pipeline" else repeat)
+            best = min(samples)
+            results[name] = {
+                "ops": ops,
+                "repeat": len(samples),
+                "min_s": best,
+                "median_s": statistics.median(samples),
+                "ops_per_s": ops / best if best else None,
+            }
+            typer.echo(
+                f"{name:<22}{best * 1e3:>10.1f} ms  {results[name]['ops_per_s']:>14,.0f} ops/s"
+            )
+
+    report = {
+        "format": RESULT_FORMAT,
+        "version": RESULT_VERSION,
+        "commit": git_commit(),
+        "timestamp": time.time(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "params": {
+            "entries": entries,
+            "sample": sample,
+            "repeat": repeat,
+            "workers": workers,
+            "chunk": chunk,
+            "seed": seed,
+            "skew": skew,
+            "stack_depth": stack_depth,
+            "extra_params": extra_params,
+            "rules": len(rules),
+        },
+        "results": results,
+    }
+    if output:
+        output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        typer.echo(f"Results written to {output}")
+
+
+@app.command()
+def compare(
+    baseline: Annotated[Path, typer.Argument(help="Earlier results file")],
+    current: Annotated[Path, typer.Argument(help="Later results file")],
+):
+    """Show the speedup of each benchmark between two results files."""
+    old = json.loads(baseline.read_text(encoding="utf-8"))
+    new = json.loads(current.read_text(encoding="utf-8"))
+    if old["params"] != new["params"]:
+        typer.echo("Warning: results were produced with different parameters")
+    typer.echo(
+        f"{'benchmark':<22}{old['commit'] or '?':>12}{new['commit'] or '?':>12}  speedup"
+    )
+    for name, result in new["results"].items():
+        before = old["results"].get(name)
+        if not before:
+            continue
+        speedup = before["min_s"] / result["min_s"] if result["min_s"] else float("inf")
+        typer.echo(
+            f"{name:<22}{before['min_s'] * 1e3:>10.1f}ms{result['min_s'] * 1e3:>10.1f}ms"
+            f"  {speedup:>6.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    app()
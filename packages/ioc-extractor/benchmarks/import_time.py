@@ -0,0 +1,125 @@
+"""
+Import-time check for the toolkit CLIs.
+
+    python import_time.py -o import-times.json
+    python import_time.py --baseline import-times.json
+
+Each CLI package is imported `--repeat` times in a fresh interpreter with
+`-X importtime`; the minimum cumulative time of the package is reported. The
+run fails if a package pulls in a dependency its commands are meant to import
+lazily, or, given a `--baseline` written by an earlier run, if it became more
+than `--tolerance` times slower to import.
+"""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Annotated, Optional
+
+import typer
+
+PACKAGES_DIR = Path(__file__).resolve().parents[2]
+RESULT_FORMAT = "ioc-extractor/import-time"
+RESULT_VERSION = 1
+
+# Modules each CLI must not import at startup
+LAZY_IMPORTS = {
+    "ioc_extractor": ["flask", "networkx", "psutil", "yaml", "jmespath", "ijson"],
+    "malware_downloader": ["vt", "pyzipper", "malwarebazaar", "ratelimit"],
+    "api_monitor_toolkit": ["win32com", "win32gui", "requests", "psutil", "pefile"],
+}
+
+app = typer.Typer(add_completion=False)
+
+
+def source_path() -> str:
+    """PYTHONPATH covering the `src/` of every package, for uninstalled trees."""
+    paths = [str(p) for p in sorted(PACKAGES_DIR.glob("*/src"))]
+    if os.environ.get("PYTHONPATH"):
+        paths.append(os.environ["PYTHONPATH"])
+    return os.pathsep.join(paths)
+
+
+def import_profile(module: str) -> dict[str, int]:
+    """Cumulative import time in microseconds of every module `module` loads."""
+    env = os.environ | {"PYTHONPATH": source_path()}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+@app.command()
+def run(
+    modules: Annotated[
+        Optional[list[str]], typer.Option("-m", "--module", help="Packages to check")
+    ] = None,
+    repeat: Annotated[int, typer.Option("-r", "--repeat")] = 5,
+    baseline: Annotated[
+        Optional[Path], typer.Option("--baseline", help="Earlier results file")
+    ] = None,
+    tolerance: Annotated[
+        float, typer.Option("--tolerance", help="Allowed slowdown over the baseline")
+    ] = 1.5,
+    output: Annotated[Optional[Path], typer.Option("-o", "--output")] = None,
+):
+    """Time the import of each CLI package and check what it loads."""
+    old = {}
+    if baseline is not None:
+        old = json.loads(baseline.read_text(encoding="utf-8"))["modules"]
+
+    results, failures = {}, []
+    for module in modules or list(LAZY_IMPORTS):
+        try:
+            profiles = [import_profile(module) for _ in range(repeat)]
+        except RuntimeError as e:
+            typer.echo(f"{module:<22} cannot be imported: {e}")
+            failures.append(module)
+            continue
+        ms = min(profile[module] for profile in profiles) / 1000
+        loaded = sorted(
+            name
+            for name in LAZY_IMPORTS.get(module, [])
+            if name in profiles[0] or any(m.startswith(f"{name}.") for m in profiles[0])
+        )
+        results[module] = {"ms": round(ms, 1), "eager": loaded}
+
+        line = f"{module:<22} {ms:8.1f} ms"
+        if module in old:
+            line += f"  (baseline {old[module]['ms']:.1f} ms)"
+            if ms > old[module]["ms"] * tolerance:
+                failures.append(module)
+                line += "  SLOWER"
+        if loaded:
+            failures.append(module)
+            line += f"  imports {', '.join(loaded)}"
+        typer.echo(line)
+
+    if output is not None:
+        result = {
+            "format": RESULT_FORMAT,
+            "version": RESULT_VERSION,
+            "python": sys.version.split()[0],
+            "modules": results,
+        }
+        output.write_text(json.dumps(result, indent=2), encoding="utf-8")
+    if failures:
+        raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,420 @@
+"""
+Synthetic API Monitor traces for benchmarking ioc-extractor.
+
+Entries are shaped like the output of api-monitor-toolkit's spider: summary
+columns named after `SUMMARY_MAPPING`, a `parameters` panel, an optional
+`call_stack` panel and the capture `metadata`. Parameter values use the
+`pre_value`/`post_value` keys read by the shipped patterns.
+
+API frequencies follow a Zipf distribution over `API_CATALOG`, with the noisy
+calls (heap, sync, module lookups) first, so most entries match no rule, as
+in real traces.
+
+    python trace_generator.py -n 200000 -o trace.json --skew 1.1 --stack-depth 8
+"""
+
+import json
+import random
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Annotated, Any
+
+import typer
+
+# name -> (module, category, return type, [(parameter type, parameter name)])
+API_CATALOG: dict[str, tuple[str, str, str, list[tuple[str, str]]]] = {
+    "HeapAlloc": (
+        "KERNEL32.dll",
+        "Memory Management/Heap",
+        "LPVOID",
+        [("HANDLE", "hHeap"), ("DWORD", "dwFlags"), ("SIZE_T", "dwBytes")],
+    ),
+    "HeapFree": (
+        "KERNEL32.dll",
+        "Memory Management/Heap",
+        "BOOL",
+        [("HANDLE", "hHeap"), ("DWORD", "dwFlags"), ("LPVOID", "lpMem")],
+    ),
+    "EnterCriticalSection": (
+        "ntdll.dll",
+        "Synchronization",
+        "void",
+        [("LPCRITICAL_SECTION", "lpCriticalSection")],
+    ),
+    "LeaveCriticalSection": (
+        "ntdll.dll",
+        "Synchronization",
+        "void",
+        [("LPCRITICAL_SECTION", "lpCriticalSection")],
+    ),
+    "GetProcAddress": (
+        "KERNEL32.dll",
+        "Dynamic-Link Library",
+        "FARPROC",
+        [("HMODULE", "hModule"), ("LPCSTR", "lpProcName")],
+    ),
+    "CloseHandle": (
+        "KERNEL32.dll",
+        "Handles and Objects",
+        "BOOL",
+        [("HANDLE", "hObject")],
+    ),
+    "RegQueryValueExW": (
+        "ADVAPI32.dll",
+        "System Services/Windows Registry",
+        "LSTATUS",
+        [
+            ("HKEY", "hKey"),
+            ("LPCWSTR", "lpValueName"),
+            ("LPDWORD", "lpReserved"),
+            ("LPDWORD", "lpType"),
+            ("LPBYTE", "lpData"),
+            ("LPDWORD", "lpcbData"),
+        ],
+    ),
+    "RegOpenKeyExW": (
+        "ADVAPI32.dll",
+        "System Services/Windows Registry",
+        "LSTATUS",
+        [
+            ("HKEY", "hKey"),
+            ("LPCWSTR", "lpSubKey"),
+            ("DWORD", "ulOptions"),
+            ("REGSAM", "samDesired"),
+            ("PHKEY", "phkResult"),
+        ],
+    ),
+    "ReadFile": (
+        "KERNEL32.dll",
+        "File Management",
+        "BOOL",
+        [
+            ("HANDLE", "hFile"),
+            ("LPVOID", "lpBuffer"),
+            ("DWORD", "nNumberOfBytesToRead"),
+            ("LPDWORD", "lpNumberOfBytesRead"),
+            ("LPOVERLAPPED", "lpOverlapped"),
+        ],
+    ),
+    "WriteFile": (
+        "KERNEL32.dll",
+        "File Management",
+        "BOOL",
+        [
+            ("HANDLE", "hFile"),
+            ("LPCVOID", "lpBuffer"),
+            ("DWORD", "nNumberOfBytesToWrite"),
+            ("LPDWORD", "lpNumberOfBytesWritten"),
+            ("LPOVERLAPPED", "lpOverlapped"),
+        ],
+    ),
+    "CreateFileW": (
+        "KERNEL32.dll",
+        "File Management",
+        "HANDLE",
+        [
+            ("LPCWSTR", "lpFileName"),
+            ("DWORD", "dwDesiredAccess"),
+            ("DWORD", "dwShareMode"),
+            ("LPSECURITY_ATTRIBUTES", "lpSecurityAttributes"),
+            ("DWORD", "dwCreationDisposition"),
+            ("DWORD", "dwFlagsAndAttributes"),
+            ("HANDLE", "hTemplateFile"),
+        ],
+    ),
+    "RegSetValueExW": (
+        "ADVAPI32.dll",
+        "System Services/Windows Registry",
+        "LSTATUS",
+        [
+            ("HKEY", "hKey"),
+            ("LPCWSTR", "lpValueName"),
+            ("DWORD", "Reserved"),
+            ("DWORD", "dwType"),
+            ("const BYTE*", "lpData"),
+            ("DWORD", "cbData"),
+        ],
+    ),
+    "CryptHashData": (
+        "ADVAPI32.dll",
+        "Security and Identity/Cryptography",
+        "BOOL",
+        [
+            ("HCRYPTHASH", "hHash"),
+            ("const BYTE*", "pbData"),
+            ("DWORD", "dwDataLen"),
+            ("DWORD", "dwFlags"),
+        ],
+    ),
+    "CryptEncrypt": (
+        "ADVAPI32.dll",
+        "Security and Identity/Cryptography",
+        "BOOL",
+        [
+            ("HCRYPTKEY", "hKey"),
+            ("HCRYPTHASH", "hHash"),
+            ("BOOL", "Final"),
+            ("DWORD", "dwFlags"),
+            ("BYTE*", "pbData"),
+            ("DWORD*", "pdwDataLen"),
+            ("DWORD", "dwBufLen"),
+        ],
+    ),
+    "InternetConnectA": (
+        "WININET.dll",
+        "Internet/WinINet",
+        "HINTERNET",
+        [
+            ("HINTERNET", "hInternet"),
+            ("LPCSTR", "lpszServerName"),
+            ("INTERNET_PORT", "nServerPort"),
+            ("LPCSTR", "lpszUserName"),
+            ("LPCSTR", "lpszPassword"),
+            ("DWORD", "dwService"),
+            ("DWORD", "dwFlags"),
+            ("DWORD_PTR", "dwContext"),
+        ],
+    ),
+    "CreateMutexW": (
+        "KERNEL32.dll",
+        "Synchronization",
+        "HANDLE",
+        [
+            ("LPSECURITY_ATTRIBUTES", "lpMutexAttributes"),
+            ("BOOL", "bInitialOwner"),
+            ("LPCWSTR", "lpName"),
+        ],
+    ),
+    "OpenProcess": (
+        "KERNEL32.dll",
+        "System Services/Processes and Threads",
+        "HANDLE",
+        [
+            ("DWORD", "dwDesiredAccess"),
+            ("BOOL", "bInheritHandle"),
+            ("DWORD", "dwProcessId"),
+        ],
+    ),
+    "CreateProcessW": (
+        "KERNEL32.dll",
+        "System Services/Processes and Threads",
+        "BOOL",
+        [
+            ("LPCWSTR", "lpApplicationName"),
+            ("LPWSTR", "lpCommandLine"),
+            ("LPSECURITY_ATTRIBUTES", "lpProcessAttributes"),
+            ("LPSECURITY_ATTRIBUTES", "lpThreadAttributes"),
+            ("BOOL", "bInheritHandles"),
+            ("DWORD", "dwCreationFlags"),
+            ("LPVOID", "lpEnvironment"),
+            ("LPCWSTR", "lpCurrentDirectory"),
+            ("LPSTARTUPINFOW", "lpStartupInfo"),
+            ("LPPROCESS_INFORMATION", "lpProcessInformation"),
+        ],
+    ),
+    "VirtualAllocEx": (
+        "KERNEL32.dll",
+        "Memory Management/Virtual Memory",
+        "LPVOID",
+        [
+            ("HANDLE", "hProcess"),
+            ("LPVOID", "lpAddress"),
+            ("SIZE_T", "dwSize"),
+            ("DWORD", "flAllocationType"),
+            ("DWORD", "flProtect"),
+        ],
+    ),
+    "WriteProcessMemory": (
+        "KERNEL32.dll",
+        "Memory Management/Virtual Memory",
+        "BOOL",
+        [
+            ("HANDLE", "hProcess"),
+            ("LPVOID", "lpBaseAddress"),
+            ("LPCVOID", "lpBuffer"),
+            ("SIZE_T", "nSize"),
+            ("SIZE_T*", "lpNumberOfBytesWritten"),
+        ],
+    ),
+    "CreateRemoteThread": (
+        "KERNEL32.dll",
+        "System Services/Processes and Threads",
+        "HANDLE",
+        [
+            ("HANDLE", "hProcess"),
+            ("LPSECURITY_ATTRIBUTES", "lpThreadAttributes"),
+            ("SIZE_T", "dwStackSize"),
+            ("LPTHREAD_START_ROUTINE", "lpStartAddress"),
+            ("LPVOID", "lpParameter"),
+            ("DWORD", "dwCreationFlags"),
+            ("LPDWORD", "lpThreadId"),
+        ],
+    ),
+}
+
+PATHS = [
+    r"C:\Users\victim\AppData\Roaming\svchost.exe",
+    r"C:\Windows\System32\drivers\etc\hosts",
+    r"C:\Users\victim\Documents\report.docx",
+    r"C:\ProgramData\update\config.ini",
+]
+REGISTRY_KEYS = [
+    r"Software\Microsoft\Windows\CurrentVersion\Run",
+    r"System\CurrentControlSet\Services\Tcpip\Parameters",
+    r"Software\Classes\CLSID",
+]
+HOSTS = ["example.com", "update.example.net", "10.0.0.12", "cdn.example.org"]
+MODULES = ["sample.exe", "KERNEL32.dll", "KERNELBASE.dll", "ntdll.dll", "USER32.dll"]
+
+
+def _value(rng: random.Random, ptype: str, name: str) -> str:
+    """A plausible textual value, as API Monitor renders it, for a parameter."""
+    lname = name.lower()
+    if "filename" in lname or lname in ("lpapplicationname", "lpcurrentdirectory"):
+        return rng.choice(PATHS)
+    if lname == "lpcommandline":
+        return f'"{rng.choice(PATHS)}" /install'
+    if "subkey" in lname:
+        return rng.choice(REGISTRY_KEYS)
+    if "servername" in lname:
+        return rng.choice(HOSTS)
+    if "processinformation" in lname:
+        return f"{{hProcess = 0x{rng.randrange(0x100, 0x900):x}, dwProcessId = {rng.randrange(1000, 9000)}}}"
+    if lname in ("lpname", "lpvaluename", "lpprocname"):
+        return rng.choice(["Global\\mtx", "Startup", "LoadLibraryW", "Path"])
+    if ptype in ("BOOL", "DWORD", "SIZE_T", "INTERNET_PORT", "REGSAM"):
+        return str(rng.choice([0, 1, 4, 80, 443, 0x1000, 0x20019]))
+    if ptype.startswith(("H", "LP", "P")) or "*" in ptype:
+        return f"0x{rng.randrange(0x10, 0x7FFFFFFF):08x}"
+    return str(rng.randrange(0, 1 << 16))
+
+
+class TraceGenerator:
+    """Yields synthetic trace entries; identical parameters yield identical traces."""
+
+    def __init__(
+        self,
+        seed: int = 0,
+        skew: float = 1.0,
+        extra_params: int = 0,
+        stack_depth: int = 4,
+        pids: int = 4,
+        apis: list[str] | None = None,
+    ):
+        self.rng = random.Random(seed)
+        self.apis = apis or list(API_CATALOG)
+        # Zipf weights: the i-th API is 1/(i+1)^skew as likely as the first
+        self.weights = [1 / (i + 1) ** skew for i in range(len(self.apis))]
+        self.extra_params = extra_params
+        self.stack_depth = stack_depth
+        self.pids = [1000 + 4 * i for i in range(max(1, pids))]
+
+    def entry(self, index: int) -> dict[str, Any]:
+        rng = self.rng
+        name = rng.choices(self.apis, self.weights)[0]
+        module, category, return_type, params = API_CATALOG[name]
+        parameters = []
+        for pid, (ptype, pname) in enumerate(params, start=1):
+            pre = _value(rng, ptype, pname)
+            parameters.append(
+                {
+                    "id": pid,
+                    "type": ptype,
+                    "name": pname,
+                    "pre_value": pre,
+                    "post_value": pre
+                    if rng.random() < 0.7
+                    else _value(rng, ptype, pname),
+                }
+            )
+        for extra in range(self.extra_params):
+            parameters.append(
+                {
+                    "id": len(params) + extra + 1,
+                    "type": "LPVOID",
+                    "name": f"lpReserved{extra}",
+                    "pre_value": "NULL",
+                    "post_value": "NULL",
+                }
+            )
+        args = ", ".join(p["pre_value"] for p in parameters[: len(params)])
+        seconds = index * 0.0005
+        pid = rng.choice(self.pids)
+        return {
+            "id": index + 1,
+            "time": f"10:{int(seconds // 60) % 60:02}:{seconds % 60:06.3f}",
+            "rel_time": f"{int(seconds // 60):02}:{seconds % 60:06.3f}",
+            "thread": rng.randrange(1, 5),
+            "tid": pid + rng.randrange(1, 4),
+            "module": rng.choice(MODULES),
+            "category": category.split("/")[-1],
+            "api": f"{name} ( {args} )",
+            "return_type": return_type,
+            "return_value": f"0x{rng.randrange(0, 0x1000):08x}",
+            "return_address": f"0x{rng.randrange(0x400000, 0x500000):08x}",
+            "error": ""
+            if rng.random() < 0.9
+            else "2 = The system cannot find the file specified.",
+            "duration": round(rng.random() / 1000, 7),
+            "full_category": category,
+            "parameters": parameters,
+            "call_stack": [
+                {
+                    "id": depth + 1,
+                    "module": rng.choice(MODULES),
+                    "address": f"0x{rng.randrange(0x400000, 0x7FFFFFFF):08x}",
+                    "offset": f"0x{rng.randrange(0, 0x10000):x}",
+                    "location": f"{module}!{name} + 0x{rng.randrange(0, 0x200):x}",
+                }
+                for depth in range(self.stack_depth)
+            ],
+            "metadata": {
+                "path": PATHS[0],
+                "filename": "svchost.exe",
+                "pid": pid,
+            },
+        }
+
+    def entries(self, count: int) -> Iterator[dict[str, Any]]:
+        for index in range(count):
+            yield self.entry(index)
+
+    def write(self, path: Path, count: int) -> Path:
+        """Write `count` entries as a JSON array, one entry per line."""
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("[\n")
+            for i, entry in enumerate(self.entries(count)):
+                f.write(("," if i else "") + json.dumps(entry) + "\n")
+            f.write("]\n")
+        return path
+
+
+def main(
+    entries: Annotated[int, typer.Option("-n", "--entries")] = 100000,
+    output: Annotated[Path, typer.Option("-o", "--output")] = Path("trace.json"),
+    seed: Annotated[int, typer.Option("--seed")] = 0,
+    skew: Annotated[
+        float, typer.Option("--skew", help="Zipf exponent of the API distribution")
+    ] = 1.0,
+    extra_params: Annotated[
+        int, typer.Option("--extra-params", help="Padding parameters per entry")
+    ] = 0,
+    stack_depth: Annotated[
+        int, typer.Option("--stack-depth", help="Call stack frames per entry")
+    ] = 4,
+    pids: Annotated[int, typer.Option("--pids", help="Distinct process ids")] = 4,
+    apis: Annotated[
+        list[str], typer.Option("--api", help="Restrict to these catalog APIs")
+    ] = None,
+):
+    """Generate a synthetic API Monitor trace."""
+    unknown = sorted(set(apis or []) - set(API_CATALOG))
+    if unknown:
+        raise typer.BadParameter(f"Unknown API(s): {', '.join(unknown)}")
+    generator = TraceGenerator(seed, skew, extra_params, stack_depth, pids, apis)
+    generator.write(output, entries)
+    typer.echo(f"Wrote {entries} entries to {output}")
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -1,12 +1,25 @@
 import typer
 
 from ioc_extractor.commands.analyzer import analyze as analyze_cmd
+from ioc_extractor.commands.indexer import index as index_cmd
+from ioc_extractor.commands.query import query as query_cmd
+from ioc_extractor.commands.rule_compiler import compile_rules as compile_rules_cmd
+from ioc_extractor.commands.server import serve as serve_cmd
 from ioc_extractor.commands.visualizer import visualize as visualize_cmd
+from ioc_extractor.commands.worker import worker as worker_cmd
 
+# Command modules only import what their signatures need; heavier dependencies
+# (rule engine, pipeline, flask, networkx, ...) are imported inside the command
+# that runs, so startup and --help stay fast. See benchmarks/import_time.py.
 app = typer.Typer(no_args_is_help=True, pretty_exceptions_show_locals=False)
 
 app.command()(analyze_cmd)
 app.command()(visualize_cmd)
+app.command()(serve_cmd)
+app.command()(worker_cmd)
+app.command()(index_cmd)
+app.command(name="compile-rules")(compile_rules_cmd)
+app.command()(query_cmd)
 
 if __name__ == "__main__":
     app()
@@ -1,18 +1,32 @@
 import os
+import re
+from concurrent.futures import Executor
+from contextlib import nullcontext
+from enum import Enum
 from pathlib import Path
-from typing import Annotated, Optional
+from typing import TYPE_CHECKING, Annotated, Optional
 
 import typer
 from common.callbacks import verbose_callback
 from common.logger import get_logger
-from ioc_extractor.rules.rule_loader import load_query_rules
-from ioc_extractor.utils.autotune import auto_tune_resources
-from ioc_extractor.utils.pipeline_executor import compute_chunk_size, run_pipeline
-from ioc_extractor.utils.resource_monitor import with_resource_monitoring
+from ioc_extractor.utils.checkpoint import Checkpoint, checkpoint_path
+from ioc_extractor.utils.entry_filter import EntryFilter
+
+if TYPE_CHECKING:
+    from ioc_extractor.utils.pipeline_executor import PipelineOptions
 
 logger = get_logger(__name__)
 app = typer.Typer()
 
+# Chunk size when following a growing trace; small chunks keep latency low
+FOLLOW_CHUNK_SIZE = 256
+
+
+class Partition(str, Enum):
+    ENTRIES = "entries"
+    RULES = "rules"
+    AUTO = "auto"
+
 
 def resolve_chunk_config(
     input_files: list[Path],
@@ -21,10 +35,17 @@ def resolve_chunk_config(
     max_chunk_size: Optional[int],
     max_ram_mb: int,
 ) -> tuple[int, dict[str, int]]:
-    """Resolve thread and chunk configuration using auto-tuning or static values."""
-    if max_threads is None or max_chunk_size is None:
+    """
+    Resolve thread and chunk configuration. Given values are kept: threads and
+    chunk sizes are auto-tuned together only when the thread count is not
+    given, and otherwise missing chunk sizes are estimated from `max_ram_mb`.
+    """
+    from ioc_extractor.utils.autotune import auto_tune_resources
+    from ioc_extractor.utils.pipeline_executor import compute_chunk_size
+
+    if max_threads is None:
         logger.info("Auto-tuning threads and chunk sizes")
-        return auto_tune_resources(
+        threads, chunk_sizes = auto_tune_resources(
             [str(p) for p in input_files],
             rules,
             thread_candidates=[
@@ -35,6 +56,9 @@ def resolve_chunk_config(
             chunk_candidates=[500, 1000, 2000, 4000],
             sample_size=20000,
         )
+        if max_chunk_size is None:
+            return threads, chunk_sizes
+        max_threads = threads
     chunk_sizes = {
         str(infile): max_chunk_size
         or compute_chunk_size(str(infile), rules, target_ram_mb=max_ram_mb)
@@ -43,37 +67,99 @@ def resolve_chunk_config(
     return max_threads, chunk_sizes
 
 
-@with_resource_monitoring(enabled=False)  # dynamically enabled at runtime
 def execute_pipeline(
     input_files: list[Path],
-    output: Optional[Path],
     chunk_sizes: dict[str, int],
     threads: int,
     rules: list[dict],
+    options: "PipelineOptions",
+    executor: Optional[Executor] = None,
 ) -> None:
     """Run the detection pipeline and report total matches."""
+    from ioc_extractor.utils.pipeline_executor import run_pipeline
+
     counts, _ = run_pipeline(
         inputs=[str(f) for f in input_files],
         chunk_sizes=chunk_sizes,
         workers=threads,
         rules=rules,
-        output_path=str(output) if output else None,
+        options=options,
+        executor=executor,
     )
     logger.info(f"Total matches: {sum(counts.values())}")
 
 
+def run_corpus_mode(
+    corpus: Path,
+    output: Path,
+    rules: list[dict],
+    max_threads: Optional[int],
+    max_chunk_size: Optional[int],
+    jobs: int,
+    compact: bool,
+    ordered: bool,
+    executor: Optional[Executor] = None,
+    triage: bool = False,
+    triage_examples: int = 3,
+) -> None:
+    """Analyze a corpus directory, tuning once on its largest trace."""
+    from ioc_extractor.utils.corpus import discover_traces, run_corpus
+
+    threads, chunk_size = max_threads, max_chunk_size
+    if threads is None or chunk_size is None:
+        traces = discover_traces(corpus, exclude=output)
+        if traces:
+            largest = max(traces, key=lambda p: p.stat().st_size)
+            tuned_threads, tuned_chunks = resolve_chunk_config(
+                [largest], rules, max_threads, max_chunk_size, 2048
+            )
+            threads = threads or tuned_threads
+            chunk_size = chunk_size or tuned_chunks[str(largest)]
+    summary = run_corpus(
+        corpus,
+        output,
+        rules,
+        workers=threads or os.cpu_count(),
+        chunk_size=chunk_size or 1000,
+        jobs=jobs,
+        compact=compact,
+        ordered=ordered,
+        executor=executor,
+        triage=triage,
+        triage_examples=triage_examples,
+    )
+    logger.info(
+        f"Corpus done: {summary['traces']} trace(s), {summary['matches']} match(es), "
+        f"{len(summary['failed'])} failed"
+    )
+
+
 @app.command()
 def analyze(
-    input: Annotated[
-        list[Path], typer.Option("-i", "--input", help="Input JSON file(s)")
-    ],
     patterns: Annotated[
         list[Path],
         typer.Option("-p", "--patterns", help="YAML rule file(s) or directory"),
     ],
+    input: Annotated[
+        list[Path], typer.Option("-i", "--input", help="Input JSON file(s)")
+    ] = None,
     output: Annotated[
-        Path, typer.Option("-o", "--output", help="Output file for results")
+        Path,
+        typer.Option(
+            "-o", "--output", help="Output file for results (directory with --corpus)"
+        ),
     ] = None,
+    corpus: Annotated[
+        Path,
+        typer.Option(
+            "--corpus",
+            help="Analyze every JSON trace below this directory, skipping done ones",
+        ),
+    ] = None,
+    jobs: Annotated[
+        int,
+        typer.Option("-j", "--jobs", help="With --corpus, traces analyzed at once"),
+    ] = 2,
     max_threads: Annotated[
         int, typer.Option("-t", "--threads", help="Maximum number of worker threads")
     ] = None,
@@ -83,21 +169,308 @@ def analyze(
     max_ram_mb: Annotated[
         int, typer.Option("-m", "--memory", help="Soft memory usage limit in MB")
     ] = 2048,
+    compact: Annotated[
+        bool,
+        typer.Option(
+            "--compact", help="Store rule metadata once and reference it by rule id"
+        ),
+    ] = False,
+    ordered: Annotated[
+        bool,
+        typer.Option("--ordered", help="Write results in input order"),
+    ] = False,
+    summarize: Annotated[
+        bool,
+        typer.Option(
+            "--summarize",
+            help="Write hit counts per distinct rule/api/attributes instead of matches",
+        ),
+    ] = False,
+    triage: Annotated[
+        bool,
+        typer.Option(
+            "--triage",
+            help="Only evaluate rule conditions: write hit counts and example ids per rule",
+        ),
+    ] = False,
+    triage_examples: Annotated[
+        int,
+        typer.Option(
+            "--triage-examples",
+            min=0,
+            help="Example entry ids kept per rule and input with --triage",
+        ),
+    ] = 3,
+    profile_rules: Annotated[
+        Path,
+        typer.Option(
+            "--profile-rules",
+            help="Profile rule evaluation and write the JSON report to this file",
+        ),
+    ] = None,
+    stage_stats: Annotated[
+        bool,
+        typer.Option("--stage-stats", help="Log per-stage pipeline timings at the end"),
+    ] = False,
+    stage_stats_file: Annotated[
+        Path,
+        typer.Option(
+            "--stage-stats-file",
+            help="Append periodic per-stage timings to this file as JSON lines",
+        ),
+    ] = None,
+    profile_dir: Annotated[
+        Path,
+        typer.Option(
+            "--profile-dir",
+            help="Run cProfile in the parent and each worker, writing profiles here",
+        ),
+    ] = None,
+    trace_malloc: Annotated[
+        bool,
+        typer.Option(
+            "--trace-malloc",
+            help="With --profile-dir, also snapshot top allocations (tracemalloc)",
+        ),
+    ] = False,
+    progress: Annotated[
+        bool,
+        typer.Option("--progress", help="Print throughput and ETA every few seconds"),
+    ] = False,
+    metrics_file: Annotated[
+        Path,
+        typer.Option(
+            "--metrics-file",
+            help="Keep OpenMetrics counters and gauges updated in this text file",
+        ),
+    ] = None,
+    follow: Annotated[
+        bool,
+        typer.Option(
+            "-f",
+            "--follow",
+            help="Tail input(s) still being written (JSON array or NDJSON)",
+        ),
+    ] = False,
+    follow_timeout: Annotated[
+        float,
+        typer.Option(
+            "--follow-timeout",
+            help="With --follow, stop after this many seconds without new entries",
+        ),
+    ] = None,
+    checkpoint_every: Annotated[
+        float,
+        typer.Option(
+            "--checkpoint-every",
+            help="Checkpoint progress to <output>.ckpt every this many seconds",
+        ),
+    ] = None,
+    resume: Annotated[
+        bool,
+        typer.Option("--resume", help="Continue from the checkpoint of the output"),
+    ] = False,
+    partition: Annotated[
+        Partition,
+        typer.Option(
+            "--partition",
+            help="Split work by entry chunks, by rule shards, or choose by input size",
+        ),
+    ] = Partition.AUTO,
+    batch: Annotated[
+        bool,
+        typer.Option(
+            "--batch",
+            help="Rule out rules per chunk on api/module/return_value/error first",
+        ),
+    ] = False,
+    memo_size: Annotated[
+        int,
+        typer.Option(
+            "--memo-size",
+            min=0,
+            help="Cache the matches of up to N distinct entries per worker (0: off)",
+        ),
+    ] = 0,
+    pids: Annotated[
+        list[int],
+        typer.Option("--pid", help="Only analyze entries of this process (repeatable)"),
+    ] = None,
+    modules: Annotated[
+        list[str],
+        typer.Option(
+            "--module", help="Only analyze calls from this module (repeatable)"
+        ),
+    ] = None,
+    api_regex: Annotated[
+        str,
+        typer.Option("--api-regex", help="Only analyze calls whose api matches"),
+    ] = None,
+    id_range: Annotated[
+        str,
+        typer.Option(
+            "--id-range", help="Only analyze entries with ids in START:END (inclusive)"
+        ),
+    ] = None,
+    no_index: Annotated[
+        bool,
+        typer.Option("--no-index", help="Ignore sidecar indexes of the inputs"),
+    ] = False,
+    remote_workers: Annotated[
+        list[str],
+        typer.Option(
+            "-w",
+            "--worker",
+            help="Run chunks on this `ioc-extractor worker` (HOST:PORT, repeatable)",
+        ),
+    ] = None,
+    auth_key: Annotated[
+        str,
+        typer.Option(
+            "--auth-key",
+            envvar="IOC_EXTRACTOR_AUTH_KEY",
+            help="Secret shared with the remote workers",
+        ),
+    ] = None,
     diagnostics: Annotated[
         bool,
         typer.Option("-d", "--diagnostics", help="Enable resource usage reporting"),
     ] = False,
+    diagnostics_file: Annotated[
+        Path,
+        typer.Option(
+            "--diagnostics-file",
+            help="Write resource usage samples to this CSV (.csv) or JSON lines file",
+        ),
+    ] = None,
     verbose: Annotated[
         int, typer.Option("-v", "--verbose", count=True, callback=verbose_callback)
     ] = 0,
 ):
     """Entry point for IOC extraction using rule-based matching."""
-    rules = load_query_rules(patterns)
-    threads, chunk_sizes = resolve_chunk_config(
-        input, rules, max_threads, max_chunk_size, max_ram_mb
+    from ioc_extractor.output.store import is_store
+    from ioc_extractor.rules.rule_loader import load_query_rules
+    from ioc_extractor.utils.distributed import connect_workers
+    from ioc_extractor.utils.pipeline_executor import (
+        PipelineOptions,
+        resolve_rule_shards,
     )
-    logger.info(f"Running with {threads} threads")
+    from ioc_extractor.utils.resource_monitor import with_resource_monitoring
 
-    # Apply diagnostics at runtime to the pipeline execution
-    wrapped = with_resource_monitoring(enabled=diagnostics)(execute_pipeline)
-    wrapped(input, output, chunk_sizes, threads, rules)
+    if remote_workers and not auth_key:
+        raise typer.BadParameter(
+            "--worker needs --auth-key (or IOC_EXTRACTOR_AUTH_KEY)"
+        )
+    if profile_dir is not None and (remote_workers or corpus is not None):
+        raise typer.BadParameter(
+            "--profile-dir only profiles a local run, not --worker or --corpus"
+        )
+    if corpus is None and not input:
+        raise typer.BadParameter("Provide --input file(s) or a --corpus directory")
+    if corpus is not None and (input or output is None):
+        raise typer.BadParameter("--corpus takes an --output directory, no --input")
+    if triage and summarize:
+        raise typer.BadParameter("--triage and --summarize are mutually exclusive")
+    if is_store(output) and (triage or corpus is not None):
+        raise typer.BadParameter(
+            "A result store cannot hold --triage output or a --corpus"
+        )
+    if (checkpoint_every is not None or resume) and output is None:
+        raise typer.BadParameter("--checkpoint-every and --resume need --output")
+    try:
+        entry_filter = EntryFilter.from_options(pids, modules, api_regex, id_range)
+    except (ValueError, re.error) as e:
+        raise typer.BadParameter(f"Invalid filter: {e}")
+    rules = load_query_rules(patterns)
+    try:
+        remote = (
+            connect_workers(remote_workers, rules, auth_key.encode("utf-8"))
+            if remote_workers
+            else None
+        )
+    except ConnectionError as e:
+        logger.error(str(e))
+        raise typer.Exit(code=1)
+    if remote:
+        # A second chunk per remote process hides the network round trip
+        max_threads = remote.capacity * 2
+        logger.info(f"Distributing chunks to {len(remote.workers)} worker(s)")
+    with remote or nullcontext():
+        if corpus is not None:
+            run_corpus_mode(
+                corpus,
+                output,
+                rules,
+                max_threads,
+                max_chunk_size,
+                jobs,
+                compact,
+                ordered,
+                executor=remote,
+                triage=triage,
+                triage_examples=triage_examples,
+            )
+            return
+
+        if resume and checkpoint_path(str(output)).exists():
+            # Chunk boundaries must match the checkpointed run
+            threads = max_threads or os.cpu_count()
+            chunk_sizes = Checkpoint.load(checkpoint_path(str(output))).settings[
+                "chunk_sizes"
+            ]
+        elif follow:
+            # Growing files cannot be sampled for auto-tuning
+            threads = max_threads or os.cpu_count()
+            chunk_sizes = {str(f): max_chunk_size or FOLLOW_CHUNK_SIZE for f in input}
+        else:
+            threads, chunk_sizes = resolve_chunk_config(
+                input, rules, max_threads, max_chunk_size, max_ram_mb
+            )
+        logger.info(f"Running with {threads} threads")
+        rule_shards = resolve_rule_shards(
+            Partition.ENTRIES.value if follow else partition.value,
+            [str(f) for f in input],
+            chunk_sizes,
+            threads,
+            rules,
+        )
+
+        # Apply diagnostics at runtime to the pipeline execution
+        wrapped = with_resource_monitoring(
+            enabled=diagnostics or diagnostics_file is not None,
+            timeseries=diagnostics_file,
+        )(execute_pipeline)
+        wrapped(
+            input,
+            chunk_sizes,
+            threads,
+            rules,
+            PipelineOptions(
+                output_path=str(output) if output else None,
+                compact=compact,
+                ordered=ordered,
+                summarize=summarize,
+                summary_budget_mb=max_ram_mb // 4,
+                profile_rules=str(profile_rules) if profile_rules else None,
+                stage_stats=stage_stats,
+                stage_stats_file=str(stage_stats_file) if stage_stats_file else None,
+                profile_dir=str(profile_dir) if profile_dir else None,
+                trace_malloc=trace_malloc,
+                progress=progress,
+                metrics_file=str(metrics_file) if metrics_file else None,
+                follow=follow,
+                follow_timeout=follow_timeout,
+                checkpoint_every=checkpoint_every,
+                resume=resume,
+                # A chunk failing on every worker must fail a distributed run
+                strict=remote is not None,
+                rule_shards=rule_shards,
+                use_index=not no_index,
+                entry_filter=entry_filter,
+                batch=batch,
+                memo_size=memo_size,
+                triage=triage,
+                triage_examples=triage_examples,
+            ),
+            executor=remote,
+        )
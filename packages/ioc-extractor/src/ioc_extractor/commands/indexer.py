@@ -0,0 +1,44 @@
+import time
+from pathlib import Path
+from typing import Annotated
+
+import typer
+from common.callbacks import verbose_callback
+from common.logger import get_logger
+
+logger = get_logger(__name__)
+app = typer.Typer()
+
+
+def index(
+    input: Annotated[
+        list[Path], typer.Option("-i", "--input", help="Input JSON file(s)")
+    ],
+    force: Annotated[
+        bool, typer.Option("--force", help="Rebuild indexes that are still current")
+    ] = False,
+    verbose: Annotated[
+        int, typer.Option("-v", "--verbose", count=True, callback=verbose_callback)
+    ] = 0,
+):
+    """Build sidecar indexes that let later analyze runs skip unmatched entries."""
+    import humanfriendly
+    from ioc_extractor.utils.trace_index import (
+        TraceIndex,
+        index_path,
+        load_current_index,
+    )
+
+    for trace in input:
+        path = index_path(str(trace))
+        if not force and load_current_index(str(trace)) is not None:
+            logger.info(f"Index {path} is up to date")
+            continue
+        start = time.perf_counter()
+        trace_index = TraceIndex.build(str(trace))
+        trace_index.save(path)
+        logger.info(
+            f"Indexed {len(trace_index)} entries of {trace} in "
+            f"{humanfriendly.format_timespan(time.perf_counter() - start)} "
+            f"({humanfriendly.format_size(path.stat().st_size)})"
+        )
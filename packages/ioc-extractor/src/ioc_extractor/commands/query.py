@@ -0,0 +1,141 @@
+import json
+import re
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Annotated
+
+import typer
+from common.callbacks import verbose_callback
+from common.logger import get_logger
+
+logger = get_logger(__name__)
+app = typer.Typer()
+
+_AGE = re.compile(r"(\d+)([dhm])")
+_AGE_SECONDS = {"d": 86400, "h": 3600, "m": 60}
+
+
+def parse_since(text: str) -> float:
+    """A start time given as an age (`30d`, `12h`, `15m`) or an ISO date."""
+    if age := _AGE.fullmatch(text):
+        return time.time() - int(age[1]) * _AGE_SECONDS[age[2]]
+    return datetime.fromisoformat(text).timestamp()
+
+
+def parse_attribute(text: str) -> tuple[str, str]:
+    key, sep, value = text.partition("=")
+    if not sep or not key:
+        raise ValueError(f"Expected KEY=VALUE, got '{text}'")
+    return key, value
+
+
+def _format_time(timestamp) -> str:
+    if timestamp is None:
+        return "-"
+    return datetime.fromtimestamp(timestamp).isoformat(sep=" ", timespec="seconds")
+
+
+def query(
+    store: Annotated[
+        Path, typer.Option("-s", "--store", help="Result store (.db) to query")
+    ],
+    apis: Annotated[
+        list[str], typer.Option("--api", help="Only matches of this api (repeatable)")
+    ] = None,
+    rules: Annotated[
+        list[str],
+        typer.Option("--rule", help="Only matches of this rule name (repeatable)"),
+    ] = None,
+    attributes: Annotated[
+        list[str],
+        typer.Option(
+            "--attr", help="Only matches with this attribute, as KEY=VALUE (repeatable)"
+        ),
+    ] = None,
+    input: Annotated[
+        str,
+        typer.Option("--input", help="Only matches of inputs whose path contains this"),
+    ] = None,
+    since: Annotated[
+        str,
+        typer.Option(
+            "--since", help="Only runs started since an age (30d, 12h) or ISO date"
+        ),
+    ] = None,
+    runs: Annotated[
+        list[int], typer.Option("--run", help="Only matches of this run (repeatable)")
+    ] = None,
+    by_input: Annotated[
+        bool,
+        typer.Option("--by-input", help="List matching inputs with match counts"),
+    ] = False,
+    list_runs: Annotated[
+        bool, typer.Option("--runs", help="List the runs in the store")
+    ] = False,
+    limit: Annotated[
+        int, typer.Option("-n", "--limit", min=1, help="Return at most this many")
+    ] = None,
+    output: Annotated[
+        Path,
+        typer.Option(
+            "-o", "--output", help="Write matches to this JSON file (for visualize)"
+        ),
+    ] = None,
+    verbose: Annotated[
+        int, typer.Option("-v", "--verbose", count=True, callback=verbose_callback)
+    ] = 0,
+):
+    """Search the matches of a result store across runs."""
+    from ioc_extractor.output import store as result_store
+
+    try:
+        filters = result_store.StoreQuery(
+            runs=runs,
+            apis=apis,
+            rules=rules,
+            attributes=[parse_attribute(a) for a in attributes or []],
+            input_like=input,
+            since=parse_since(since) if since else None,
+        )
+    except ValueError as e:
+        raise typer.BadParameter(str(e))
+    try:
+        conn = result_store.connect(store)
+    except ValueError as e:
+        logger.error(str(e))
+        raise typer.Exit(code=1)
+
+    try:
+        if list_runs:
+            for run_id, started, finished, matches, inputs in result_store.list_runs(
+                conn
+            )[:limit]:
+                typer.echo(
+                    f"{run_id:>6}  {_format_time(started)}  {_format_time(finished)}  "
+                    f"{matches:>9} match(es)  {inputs} input(s)"
+                )
+            return
+        if by_input:
+            for path, count, started in result_store.count_by_input(conn, filters)[
+                :limit
+            ]:
+                typer.echo(f"{count:>9}  {_format_time(started)}  {path or '-'}")
+            return
+
+        matches = result_store.query_matches(conn, filters, limit)
+        if output is None:
+            for match in matches:
+                typer.echo(json.dumps(match, ensure_ascii=False))
+            return
+        written = 0
+        with open(output, "w", encoding="utf-8") as f:
+            f.write("[")
+            for match in matches:
+                f.write(",\n" if written else "")
+                f.write(json.dumps(match, ensure_ascii=False))
+                written += 1
+            f.write("]\n")
+        logger.info(f"Wrote {written} match(es) to {output}")
+    finally:
+        conn.close()
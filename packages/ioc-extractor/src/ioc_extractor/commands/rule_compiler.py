@@ -0,0 +1,46 @@
+import time
+from pathlib import Path
+from typing import Annotated
+
+import typer
+from common.callbacks import verbose_callback
+from common.logger import get_logger
+
+logger = get_logger(__name__)
+app = typer.Typer()
+
+
+def compile_rules(
+    patterns: Annotated[
+        list[Path],
+        typer.Option("-p", "--patterns", help="Pattern file(s) or directories"),
+    ],
+    output: Annotated[
+        Path, typer.Option("-o", "--output", help="Bundle file to write")
+    ] = Path("rules.bundle.json"),
+    verbose: Annotated[
+        int, typer.Option("-v", "--verbose", count=True, callback=verbose_callback)
+    ] = 0,
+):
+    """Validate pattern files and compile them into one fast-loading bundle."""
+    import humanfriendly
+    from ioc_extractor.rules.bundle import file_stamp, write_bundle
+    from ioc_extractor.rules.rule_loader import (
+        RULE_SUFFIXES,
+        _resolve_rule_files,
+        parse_rule_files,
+    )
+
+    start = time.perf_counter()
+    files = [f for f in _resolve_rule_files(patterns) if f.suffix in RULE_SUFFIXES]
+    try:
+        records = parse_rule_files(files)
+        write_bundle(output, records, file_stamp(files))
+    except (OSError, TypeError, ValueError) as e:
+        logger.error(f"Cannot compile rules: {e}")
+        raise typer.Exit(code=1)
+    logger.info(
+        f"Compiled {len(records)} rule(s) from {len(files)} file(s) into {output} "
+        f"in {humanfriendly.format_timespan(time.perf_counter() - start)} "
+        f"({humanfriendly.format_size(output.stat().st_size)})"
+    )
@@ -0,0 +1,45 @@
+from pathlib import Path
+from typing import Annotated
+
+import typer
+from common.callbacks import verbose_callback
+from common.logger import get_logger
+
+logger = get_logger(__name__)
+app = typer.Typer()
+
+
+def serve(
+    patterns: Annotated[
+        list[Path],
+        typer.Option("-p", "--patterns", help="YAML rule file(s) or directory"),
+    ],
+    host: Annotated[
+        str, typer.Option("--host", help="Address to listen on")
+    ] = "127.0.0.1",
+    port: Annotated[int, typer.Option("--port", help="Port to listen on")] = 8765,
+    max_threads: Annotated[
+        int, typer.Option("-t", "--threads", help="Worker processes kept warm")
+    ] = None,
+    max_jobs: Annotated[
+        int, typer.Option("-j", "--jobs", help="Jobs analyzed concurrently")
+    ] = 2,
+    work_dir: Annotated[
+        Path,
+        typer.Option("--work-dir", help="Directory for uploads and job results"),
+    ] = None,
+    verbose: Annotated[
+        int, typer.Option("-v", "--verbose", count=True, callback=verbose_callback)
+    ] = 0,
+):
+    """Serve analysis jobs over HTTP with preloaded rules and a warm worker pool."""
+    from ioc_extractor.utils.analysis_server import serve_analysis
+
+    serve_analysis(
+        patterns,
+        host=host,
+        port=port,
+        workers=max_threads,
+        max_jobs=max_jobs,
+        work_dir=work_dir,
+    )
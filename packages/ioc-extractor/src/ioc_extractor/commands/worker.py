@@ -0,0 +1,37 @@
+from typing import Annotated
+
+import typer
+from common.callbacks import verbose_callback
+from common.logger import get_logger
+from ioc_extractor.utils.distributed import DEFAULT_PORT
+
+logger = get_logger(__name__)
+app = typer.Typer()
+
+
+def worker(
+    auth_key: Annotated[
+        str,
+        typer.Option(
+            "--auth-key",
+            envvar="IOC_EXTRACTOR_AUTH_KEY",
+            help="Secret shared with the coordinator",
+        ),
+    ],
+    host: Annotated[
+        str, typer.Option("--host", help="Address to listen on")
+    ] = "127.0.0.1",
+    port: Annotated[
+        int, typer.Option("--port", help="Port to listen on")
+    ] = DEFAULT_PORT,
+    max_threads: Annotated[
+        int, typer.Option("-t", "--threads", help="Worker processes")
+    ] = None,
+    verbose: Annotated[
+        int, typer.Option("-v", "--verbose", count=True, callback=verbose_callback)
+    ] = 0,
+):
+    """Evaluate chunks for a remote `analyze -w` coordinator."""
+    from ioc_extractor.utils.distributed import serve_worker
+
+    serve_worker(host, port, auth_key.encode("utf-8"), processes=max_threads)
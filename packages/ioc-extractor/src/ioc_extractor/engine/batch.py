@@ -0,0 +1,77 @@
+"""
+Batch pre-filtering of rules over a whole chunk (`analyze --batch`).
+
+Conditions on scalar top-level fields (`api`, `module`, `return_value`,
+`error`) are evaluated once per distinct value in the chunk instead of once
+per entry: the chunk is turned into one column per field read, its rows are
+grouped by value, and each rule's `where`, restricted to those fields (see
+`may_match`), gives a candidate mask. Entries outside a rule's mask cannot
+match it, so `execute_rule` only runs for the surviving rows.
+"""
+
+from collections import defaultdict
+from typing import Any, Optional
+
+from ioc_extractor.engine.matcher import leaf_fields, may_match
+
+SCALAR_FIELDS = frozenset({"api", "module", "return_value", "error"})
+
+
+class BatchPlan:
+    """Scalar fields read by each rule, worked out once per rule set."""
+
+    def __init__(self, rules: list[dict]):
+        self.rules = rules
+        self.fields: list[Optional[tuple[str, ...]]] = []
+        for rule in rules:
+            where = rule["variant"].get("where")
+            read = leaf_fields(where) & SCALAR_FIELDS if where else set()
+            self.fields.append(tuple(sorted(read)) if read else None)
+
+    def candidates(self, batch: list[dict]) -> list[Optional[bytearray]]:
+        """
+        Per rule, a mask of the rows that may match it, or None when the rule
+        has no scalar conditions (every row is a candidate).
+        """
+        groups: dict[tuple[str, ...], Optional[dict[Any, list[int]]]] = {}
+        masks: list[Optional[bytearray]] = []
+        for rule, fields in zip(self.rules, self.fields):
+            if fields is None:
+                masks.append(None)
+                continue
+            if fields not in groups:
+                groups[fields] = _group_rows(batch, fields)
+            rows_by_value = groups[fields]
+            if rows_by_value is None:
+                masks.append(None)
+                continue
+            where = rule["variant"]["where"]
+            mask = bytearray(len(batch))
+            for (values, _), rows in rows_by_value.items():
+                try:
+                    keep = may_match(dict(zip(fields, values)), where, SCALAR_FIELDS)
+                except Exception:
+                    # Left for the per-entry path to evaluate (and report)
+                    keep = True
+                if keep:
+                    for row in rows:
+                        mask[row] = 1
+            masks.append(mask)
+        return masks
+
+
+def _group_rows(
+    batch: list[dict], fields: tuple[str, ...]
+) -> Optional[dict[Any, list[int]]]:
+    """
+    Row numbers by distinct values of `fields` (and their types, so 1, 1.0 and
+    True stay apart), or None if a value is unhashable.
+    """
+    columns = [[entry.get(field) for entry in batch] for field in fields]
+    rows_by_value: dict[Any, list[int]] = defaultdict(list)
+    try:
+        for row, values in enumerate(zip(*columns)):
+            rows_by_value[values, tuple(map(type, values))].append(row)
+    except TypeError:
+        return None
+    return rows_by_value
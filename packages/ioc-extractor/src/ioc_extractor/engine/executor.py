@@ -26,38 +26,97 @@ def extract_taxonomy(
     return result
 
 
-def execute_rule(entry: dict, rule: dict, source_file: str) -> dict | None:
+TAXONOMY_FIELDS = ["attck", "mbcs", "tags", "categories", "description"]
+
+
+def build_rule_header(rule: dict) -> dict:
     """
-    Executes a rule-variant pair on a given input entry.
-    Input format: { meta: {...}, variant: {...} }
+    Builds the per-rule part of a match: identity, metadata, taxonomy and source.
+    It is identical for every match of a rule-variant pair, which is what lets the
+    compact output format store it once and reference it by rule id.
     """
     meta = rule["meta"]
     variant = rule["variant"]
-
-    if not evaluate_conditions(entry, variant.get("where", {})):
-        return None
-
-    selected = process_select(entry, variant.get("select", []))
-    fields = selected["fields"]
-    raw_api = selected.get("api", "?")
-    clean_api = raw_api.split("(")[0].strip() if isinstance(raw_api, str) else "?"
-
     rule_name = meta.get("name", "?")
     variant_name = variant.get("name")
 
-    taxonomy_fields = ["attck", "mbcs", "tags", "categories", "description"]
-
     return {
-        "api": clean_api,
-        "attributes": fields,
         "rule": {
             "name": rule_name,
             "variant": None if variant_name == rule_name else variant_name,
         },
         "metadata": {k: meta[k] for k in ("version", "authors") if k in meta},
         "taxonomy": {
-            "rule": extract_taxonomy(meta, include=taxonomy_fields),
-            "variant": extract_taxonomy(variant, include=taxonomy_fields),
+            "rule": extract_taxonomy(meta, include=TAXONOMY_FIELDS),
+            "variant": extract_taxonomy(variant, include=TAXONOMY_FIELDS),
         },
-        "sources": {"input": source_file, "rule": variant.get("__source__")},
+        "sources": {"rule": variant.get("__source__")},
+    }
+
+
+def expand_match(match: dict, header: dict) -> dict:
+    """
+    Rebuilds a full match from a compact one and its rule header. Fields the
+    header does not know about (e.g. summary counts) are carried over as-is.
+    """
+    expanded = {
+        "api": match.get("api", "?"),
+        "attributes": match.get("attributes", {}),
+        "rule": header["rule"],
+        "metadata": header["metadata"],
+        "taxonomy": header["taxonomy"],
+        "sources": match.get("sources", {}) | header["sources"],
+    }
+    for key, value in match.items():
+        if key not in expanded and key != "rule_id":
+            expanded[key] = value
+    return expanded
+
+
+def triage_rule(entry: dict, rule: dict, profiler=None) -> bool:
+    """
+    Whether a rule-variant pair matches an entry, evaluating its `where`
+    clause only: nothing is selected, transformed or built (`--triage`).
+    """
+    variant = rule["variant"]
+    if variant.get("steps"):
+        return False
+    return evaluate_conditions(entry, variant.get("where", {}), profiler)
+
+
+def execute_rule(
+    entry: dict,
+    rule: dict,
+    source_file: str,
+    compact: bool = False,
+    profiler=None,
+) -> dict | None:
+    """
+    Executes a rule-variant pair on a given input entry.
+    Input format: { meta: {...}, variant: {...} }
+    With `compact`, the match references the rule by id instead of embedding
+    its header (see `build_rule_header`). A `RuleProfiler` passed as `profiler`
+    receives the timings of every selector, operator and transform involved.
+    """
+    variant = rule["variant"]
+
+    # Sequence variants span several entries and are evaluated by engine.sequence
+    if variant.get("steps"):
+        return None
+
+    if not evaluate_conditions(entry, variant.get("where", {}), profiler):
+        return None
+
+    selected = process_select(entry, variant.get("select", []), profiler)
+    fields = selected["fields"]
+    raw_api = selected.get("api", "?")
+    clean_api = raw_api.split("(")[0].strip() if isinstance(raw_api, str) else "?"
+
+    match = {
+        "api": clean_api,
+        "attributes": fields,
+        "sources": {"input": source_file},
     }
+    if compact:
+        return {"rule_id": variant.get("__id__")} | match
+    return expand_match(match, build_rule_header(rule))
@@ -1,23 +1,74 @@
+from time import perf_counter
+
 from ioc_extractor.engine.selector import resolve_selector
 from ioc_extractor.rules.registry import get_operator
 
 
-def evaluate_conditions(entry, where):
+def evaluate_conditions(entry, where, profiler=None):
+    """
+    Evaluates a `where` tree against an entry. When a `RuleProfiler` is given,
+    each selector and operator call is timed into it.
+    """
     if not where:
         return True
     if isinstance(where, dict):
         if "and" in where:
-            return all(evaluate_conditions(entry, cond) for cond in where["and"])
+            return all(
+                evaluate_conditions(entry, cond, profiler) for cond in where["and"]
+            )
         if "or" in where:
-            return any(evaluate_conditions(entry, cond) for cond in where["or"])
+            return any(
+                evaluate_conditions(entry, cond, profiler) for cond in where["or"]
+            )
         if "not" in where:
-            return not evaluate_conditions(entry, where["not"])
+            return not evaluate_conditions(entry, where["not"], profiler)
         if len(where) == 1:
             op, args = next(iter(where.items()))
             op_func = get_operator(op)
             if op_func is None:
                 raise ValueError(f"Unknown operator: '{op}'")
             field_path, expected = args
+            if profiler is None:
+                value = resolve_selector(entry, field_path)
+                return op_func(value, expected)
+            start = perf_counter()
             value = resolve_selector(entry, field_path)
-            return op_func(value, expected)
+            resolved = perf_counter()
+            result = op_func(value, expected)
+            profiler.record_selector(field_path, resolved - start)
+            profiler.record_operator(op, perf_counter() - resolved)
+            return result
     raise TypeError(f"Invalid condition structure: {where}")
+
+
+def leaf_fields(where) -> set:
+    """Selectors read by the leaves of `where` (None for malformed parts)."""
+    if not where:
+        return set()
+    if isinstance(where, dict):
+        if "and" in where or "or" in where:
+            children = where.get("and", where.get("or"))
+            return set().union(*(leaf_fields(c) for c in children))
+        if "not" in where:
+            return leaf_fields(where["not"])
+        _, args = next(iter(where.items()))
+        return {args[0] if isinstance(args, list) else args}
+    return {None}
+
+
+def may_match(partial: dict, where, known: frozenset) -> bool:
+    """
+    Whether `where` can hold for an entry of which only the fields in `known`
+    (selectors, e.g. "api") are given in `partial`. Conditions on other fields
+    are assumed to hold, so False means no such entry can match.
+    """
+    if not where:
+        return True
+    if isinstance(where, dict):
+        if "and" in where:
+            return all(may_match(partial, cond, known) for cond in where["and"])
+        if "or" in where:
+            return any(may_match(partial, cond, known) for cond in where["or"])
+    if leaf_fields(where) <= known:
+        return evaluate_conditions(partial, where)
+    return True
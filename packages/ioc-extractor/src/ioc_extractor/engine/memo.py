@@ -0,0 +1,133 @@
+"""
+Match memoization (`analyze --memo-size`).
+
+Traces are dominated by loops repeating the same call with the same
+parameters. Workers keep an LRU cache of what the single-entry rules made of
+an entry (its first match, or none), keyed by a hash of the top-level fields
+the rules' selectors read, and hand a repeated entry the cached match with
+only its source replaced. `id` and timestamp fields are left out of the key
+unless a rule reads them.
+
+The cache belongs to the worker process, so it lives across chunks, and is
+bounded to a number of entries, evicting the least recently used.
+"""
+
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any, Optional
+
+import jmespath
+from ioc_extractor.engine.matcher import leaf_fields
+
+# Fields that differ between repeats of the same call
+VOLATILE_FIELDS = frozenset({"id", "time", "timestamp"})
+# JMESPath nodes that may read fields of the entry without naming them
+_UNNAMED_READS = frozenset({"current", "value_projection"})
+# Returned by `MatchMemo.get` for keys not cached (None is a cached "no match")
+MISS = object()
+
+
+def _selector_names(selector: str) -> tuple[set[str], bool]:
+    """Field names in a selector, and whether they are all it may read."""
+    try:
+        stack = [jmespath.compile(selector).parsed]
+    except Exception:
+        return set(), False
+    names, complete = set(), True
+    while stack:
+        node = stack.pop()
+        if node["type"] in _UNNAMED_READS:
+            complete = False
+        elif node["type"] == "field":
+            names.add(node["value"])
+        stack.extend(node.get("children", []))
+    return names, complete
+
+
+def memo_fields(
+    rules: list[dict], where_only: bool = False
+) -> tuple[frozenset[str], bool]:
+    """
+    Top-level fields `rules` read (a superset: every field name their
+    selectors mention), and whether that is known to be all of them. With
+    `where_only`, only what decides whether they match counts (`--triage`).
+    """
+    names, complete = (set() if where_only else {"api"}), True
+    for rule in rules:
+        variant = rule["variant"]
+        selectors = leaf_fields(variant.get("where"))
+        if not where_only:
+            selectors |= {sel.get("field") for sel in variant.get("select", [])}
+        for selector in selectors:
+            if not isinstance(selector, str):
+                complete = False
+                continue
+            found, known = _selector_names(selector)
+            names |= found
+            complete = complete and known
+    return frozenset(names), complete
+
+
+class MatchMemo:
+    """LRU map from entry keys to the first match of the rules, or None."""
+
+    def __init__(
+        self,
+        rules: list[dict],
+        size: int,
+        scope: Any = None,
+        where_only: bool = False,
+    ):
+        self.size = size
+        self.scope = scope
+        self.fields, self.complete = memo_fields(rules, where_only)
+        # Without a complete field list the key covers the whole entry
+        self.ignored = VOLATILE_FIELDS - self.fields
+        self.entries: OrderedDict = OrderedDict()
+
+    def key(self, entry: dict) -> Optional[bytes]:
+        """Canonical hash of the fields rules read, or None if not encodable."""
+        if self.complete:
+            subset = {k: entry[k] for k in self.fields if k in entry}
+        else:
+            subset = {k: v for k, v in entry.items() if k not in self.ignored}
+        try:
+            encoded = json.dumps(
+                subset, sort_keys=True, default=repr, separators=(",", ":")
+            )
+        except (TypeError, ValueError):
+            return None
+        return hashlib.blake2b(encoded.encode("utf-8"), digest_size=16).digest()
+
+    def get(self, key: Any) -> Any:
+        value = self.entries.get(key, MISS)
+        if value is not MISS:
+            self.entries.move_to_end(key)
+        return value
+
+    def put(self, key: Any, value: Any) -> None:
+        self.entries[key] = value
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+
+_memo: Optional[MatchMemo] = None
+
+
+def worker_memo(
+    rules: list[dict], size: int, scope: Any, where_only: bool = False
+) -> MatchMemo:
+    """
+    The memo of the current worker process, started afresh whenever `scope`
+    (what the cached matches depend on, e.g. the rules) or `size` changes.
+    """
+    global _memo
+    if _memo is None or _memo.scope != scope or _memo.size != size:
+        _memo = MatchMemo(rules, size, scope, where_only)
+    return _memo
+
+
+def with_source(match: dict[str, Any], source_file: str) -> dict[str, Any]:
+    """A cached match as found in `source_file`."""
+    return match | {"sources": match["sources"] | {"input": source_file}}
@@ -0,0 +1,186 @@
+"""
+Sampling profiler for rule evaluation (`analyze --profile-rules`).
+
+Evaluation and hit counts are exact. Timing is only taken for one in every
+`sample_every` evaluations of each variant; those sampled evaluations also time
+every selector, operator and transform they run. Totals are extrapolated from
+the sampled share, which keeps the overhead low enough to leave profiling on.
+
+Each worker fills its own `RuleProfiler` and ships `snapshot()` back with the
+chunk result; the parent `merge`s them and reports the combined figures.
+"""
+
+import json
+from collections import defaultdict
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Callable
+
+from common.logger import get_logger
+from rich.markup import escape
+
+logger = get_logger(__name__)
+
+DEFAULT_SAMPLE_EVERY = 16
+
+
+def _timing() -> list:
+    # [sampled calls, sampled seconds]
+    return [0, 0.0]
+
+
+class RuleProfiler:
+    def __init__(self, sample_every: int = DEFAULT_SAMPLE_EVERY):
+        self.sample_every = max(1, sample_every)
+        # rule id -> [evaluations, hits, sampled evaluations, sampled seconds]
+        self.variants: dict[str, list] = defaultdict(lambda: [0, 0, 0, 0.0])
+        self.selectors: dict[str, list] = defaultdict(_timing)
+        self.operators: dict[str, list] = defaultdict(_timing)
+        self.transforms: list = _timing()
+
+    def should_sample(self, rule_id: str) -> bool:
+        """Count an evaluation of `rule_id` and tell whether to time it."""
+        stats = self.variants[rule_id]
+        stats[0] += 1
+        return stats[0] % self.sample_every == 1 or self.sample_every == 1
+
+    def call(self, rule_id: str, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Run `fn` (`execute_rule` or `evaluate_steps`) for `rule_id`, timing it
+        and passing this profiler down when the evaluation is sampled.
+        """
+        if not self.should_sample(rule_id):
+            result = fn(*args, **kwargs)
+            self.record_variant(rule_id, None, bool(result))
+            return result
+        start = perf_counter()
+        result = fn(*args, profiler=self, **kwargs)
+        self.record_variant(rule_id, perf_counter() - start, bool(result))
+        return result
+
+    def record_variant(self, rule_id: str, elapsed: float | None, hit: bool) -> None:
+        stats = self.variants[rule_id]
+        if hit:
+            stats[1] += 1
+        if elapsed is not None:
+            stats[2] += 1
+            stats[3] += elapsed
+
+    def record_selector(self, selector: str, elapsed: float) -> None:
+        stats = self.selectors[selector]
+        stats[0] += 1
+        stats[1] += elapsed
+
+    def record_operator(self, op: str, elapsed: float) -> None:
+        stats = self.operators[op]
+        stats[0] += 1
+        stats[1] += elapsed
+
+    def record_transform(self, elapsed: float) -> None:
+        self.transforms[0] += 1
+        self.transforms[1] += elapsed
+
+    def snapshot(self) -> dict[str, Any]:
+        """Plain, picklable copy of the collected statistics."""
+        return {
+            "variants": dict(self.variants),
+            "selectors": dict(self.selectors),
+            "operators": dict(self.operators),
+            "transforms": list(self.transforms),
+        }
+
+    def merge(self, snapshot: dict[str, Any]) -> None:
+        for rule_id, stats in snapshot["variants"].items():
+            own = self.variants[rule_id]
+            for i, value in enumerate(stats):
+                own[i] += value
+        for name in ("selectors", "operators"):
+            table = getattr(self, name)
+            for key, (calls, seconds) in snapshot[name].items():
+                table[key][0] += calls
+                table[key][1] += seconds
+        self.transforms[0] += snapshot["transforms"][0]
+        self.transforms[1] += snapshot["transforms"][1]
+
+    def report(self, rules: list[dict]) -> dict[str, Any]:
+        """Build the sorted report; variant times are extrapolated from samples."""
+        by_id = {r["variant"]["__id__"]: r for r in rules}
+        variants = []
+        for rule_id, (evals, hits, sampled, seconds) in self.variants.items():
+            rule = by_id.get(rule_id, {"meta": {}, "variant": {}})
+            mean = seconds / sampled if sampled else 0.0
+            variants.append(
+                {
+                    "rule_id": rule_id,
+                    "rule": rule["meta"].get("name"),
+                    "variant": rule["variant"].get("name"),
+                    "source": rule["variant"].get("__source__"),
+                    "evaluations": evals,
+                    "hits": hits,
+                    "hit_rate": hits / evals if evals else 0.0,
+                    "mean_us": mean * 1e6,
+                    "estimated_seconds": mean * evals,
+                }
+            )
+        variants.sort(key=lambda v: v["estimated_seconds"], reverse=True)
+
+        def timings(table: dict[str, list]) -> list[dict[str, Any]]:
+            rows = [
+                {
+                    "name": key,
+                    "sampled_calls": calls,
+                    "sampled_seconds": seconds,
+                    "mean_us": seconds / calls * 1e6 if calls else 0.0,
+                }
+                for key, (calls, seconds) in table.items()
+            ]
+            return sorted(rows, key=lambda r: r["sampled_seconds"], reverse=True)
+
+        calls, seconds = self.transforms
+        return {
+            "sample_every": self.sample_every,
+            "variants": variants,
+            "operators": timings(self.operators),
+            "selectors": timings(self.selectors),
+            "transforms": {
+                "sampled_calls": calls,
+                "sampled_seconds": seconds,
+                "mean_us": seconds / calls * 1e6 if calls else 0.0,
+            },
+        }
+
+
+def log_profile_report(report: dict[str, Any], limit: int = 20) -> None:
+    """Log the most expensive variants, operators and selectors as tables."""
+    lines = [
+        "Rule profile (times extrapolated from 1 in "
+        f"{report['sample_every']} evaluations)",
+        f"{'est. time':>10}  {'mean µs':>9}  {'evals':>10}  {'hits':>8}  rule",
+    ]
+    for v in report["variants"][:limit]:
+        # Unnamed variants are told apart by their rule id (`<rule>:<index>`)
+        name = f"{v['rule']}::{v['variant']}" if v["variant"] else v["rule_id"]
+        lines.append(
+            f"{v['estimated_seconds']:>9.3f}s  {v['mean_us']:>9.1f}  "
+            f"{v['evaluations']:>10}  {v['hits']:>8}  {escape(name)}"
+        )
+    for title in ("operators", "selectors"):
+        lines += ["", f"{'sampled':>10}  {'mean µs':>9}  {'calls':>10}  {title[:-1]}"]
+        for row in report[title][:limit]:
+            lines.append(
+                f"{row['sampled_seconds']:>9.3f}s  {row['mean_us']:>9.1f}  "
+                f"{row['sampled_calls']:>10}  {escape(row['name'])}"
+            )
+    t = report["transforms"]
+    lines += [
+        "",
+        f"Transforms: {t['sampled_calls']} sampled calls, "
+        f"{t['sampled_seconds']:.3f}s, {t['mean_us']:.1f} µs mean",
+    ]
+    logger.info("\n".join(lines))
+
+
+def write_profile_report(report: dict[str, Any], path: Path) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Rule profile written to {path}")
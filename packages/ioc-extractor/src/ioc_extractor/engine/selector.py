@@ -1,3 +1,5 @@
+from time import perf_counter
+
 import jmespath
 from common.logger import get_logger
 from ioc_extractor.rules.modifiers import apply_modifiers
@@ -14,17 +16,23 @@ def resolve_selector(entry: dict, selector: str):
         return None
 
 
-def process_select(entry: dict, select_list: list[dict]) -> dict:
+def process_select(entry: dict, select_list: list[dict], profiler=None) -> dict:
     """
     Applies 'select' logic from a rule: extracts fields, applies transformations,
     and returns them with aliases for use in rule output.
+    When a `RuleProfiler` is given, selectors and transforms are timed into it.
     """
     fields = {}
     for sel in select_list:
         field = sel["field"]
         alias = sel.get("alias", field)
         transforms = sel.get("transform", [])
-        val = resolve_selector(entry, field)
+        if profiler is None:
+            val = resolve_selector(entry, field)
+        else:
+            start = perf_counter()
+            val = resolve_selector(entry, field)
+            profiler.record_selector(field, perf_counter() - start)
 
         if isinstance(val, list):
             if len(val) == 1:
@@ -33,7 +41,12 @@ def process_select(entry: dict, select_list: list[dict]) -> dict:
                 val = None
 
         if isinstance(val, str) and transforms:
-            val = apply_modifiers(val, transforms)
+            if profiler is None:
+                val = apply_modifiers(val, transforms)
+            else:
+                start = perf_counter()
+                val = apply_modifiers(val, transforms)
+                profiler.record_transform(perf_counter() - start)
         fields[alias] = val
 
     return {
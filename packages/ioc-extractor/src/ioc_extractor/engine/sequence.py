@@ -0,0 +1,256 @@
+"""
+Stateful sequence rules: ordered steps joined on shared fields within a window.
+
+A sequence variant is declared under `sequences:` in a rule file:
+
+  sequences:
+    - name: remote_thread
+      key: metadata.pid            # JMESPath; state is kept per key value
+      window:
+        events: 5000               # max entries between first and last step
+        seconds: 10                # optional, measured on `time_field`
+        time_field: rel_time
+      steps:
+        - name: open
+          where: { regex: ["api", "(?i)^OpenProcess$"] }
+          capture:                 # same syntax as `select`
+            - field: return_value
+              alias: handle
+        - name: write
+          where: { regex: ["api", "(?i)^WriteProcessMemory$"] }
+          join:                    # must equal the captured value of `alias`
+            - field: parameters[?name=='hProcess'].pre_value
+              alias: handle
+
+Evaluation is split in two. Workers run `evaluate_steps` on every entry of
+their chunk and return small `StepEvent` tuples for the steps it satisfies.
+The parent feeds those events, in input order, to a `SequenceTracker`: an
+incremental state machine holding the partial runs of each (rule, key), which
+are evicted as soon as they fall out of the window.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, NamedTuple
+
+from ioc_extractor.engine.executor import build_rule_header, expand_match
+from ioc_extractor.engine.matcher import evaluate_conditions
+from ioc_extractor.engine.selector import process_select, resolve_selector
+from ioc_extractor.rules.operators import parse_numeric
+
+DEFAULT_KEY = "metadata.pid"
+DEFAULT_TIME_FIELD = "rel_time"
+
+# Partial runs kept per (rule, key); the oldest is dropped beyond this
+MAX_RUNS_PER_KEY = 32
+
+# Entries between two sweeps of keys that stopped receiving events
+SWEEP_INTERVAL = 10000
+
+
+class StepEvent(NamedTuple):
+    index: int  # position of the entry inside its chunk
+    entry_id: Any
+    api: str
+    rule_id: str
+    step: int
+    key: str
+    time: float | None
+    captures: dict[str, Any]
+    joins: dict[str, Any]
+
+
+def is_sequence(rule: dict) -> bool:
+    return bool(rule["variant"].get("steps"))
+
+
+def split_rules(rules: list[dict]) -> tuple[list[dict], list[dict]]:
+    """Separate single-event rules from sequence rules, preserving order."""
+    single = [r for r in rules if not is_sequence(r)]
+    sequences = [r for r in rules if is_sequence(r)]
+    return single, sequences
+
+
+def parse_time(value: Any) -> float | None:
+    """Parse numeric seconds or `[H:]MM:SS[.fff]` strings into seconds."""
+    if value is None:
+        return None
+    number = parse_numeric(value)
+    if number is not None:
+        return number
+    try:
+        seconds = 0.0
+        for part in str(value).strip().split(":"):
+            seconds = seconds * 60 + float(part)
+        return seconds
+    except ValueError:
+        return None
+
+
+def _normalize(value: Any) -> Any:
+    """Join values compare numerically when possible, case-insensitively otherwise."""
+    number = parse_numeric(value)
+    if number is not None:
+        return number
+    return str(value).lower() if value is not None else None
+
+
+def evaluate_steps(
+    index: int, entry: dict, rule: dict, profiler=None
+) -> list[StepEvent]:
+    """Return one event per step of a sequence rule that `entry` satisfies."""
+    variant = rule["variant"]
+    events = []
+    key = None
+    for step_no, step in enumerate(variant["steps"]):
+        if not evaluate_conditions(entry, step.get("where", {}), profiler):
+            continue
+        if key is None:
+            key = str(resolve_selector(entry, variant.get("key") or DEFAULT_KEY))
+            window = variant.get("window") or {}
+            time_field = window.get("time_field", DEFAULT_TIME_FIELD)
+            timestamp = (
+                parse_time(entry.get(time_field)) if "seconds" in window else None
+            )
+            raw_api = entry.get("api", "?")
+            api = raw_api.split("(")[0].strip() if isinstance(raw_api, str) else "?"
+        captures = process_select(entry, step.get("capture", []), profiler)["fields"]
+        joins = process_select(entry, step.get("join", []), profiler)["fields"]
+        events.append(
+            StepEvent(
+                index,
+                entry.get("id"),
+                api,
+                variant["__id__"],
+                step_no,
+                key,
+                timestamp,
+                captures,
+                {alias: _normalize(v) for alias, v in joins.items()},
+            )
+        )
+    return events
+
+
+@dataclass
+class Run:
+    """A partially matched sequence waiting for its `next_step`."""
+
+    next_step: int
+    start_position: int
+    start_time: float | None
+    captures: dict[str, Any] = field(default_factory=dict)
+    steps: list[dict[str, Any]] = field(default_factory=list)
+
+
+class SequenceTracker:
+    """Advances sequence runs event by event, with state bounded by the window."""
+
+    def __init__(self, rules: list[dict]):
+        self.rules = {r["variant"]["__id__"]: r for r in rules}
+        self.runs: dict[tuple, list[Run]] = {}
+        self.last_sweep = 0
+        self.last_time: float | None = None
+
+    def _expired(self, rule: dict, run: Run, position: int, now) -> bool:
+        window = rule["variant"].get("window") or {}
+        events = window.get("events")
+        if events is not None and position - run.start_position > events:
+            return True
+        seconds = window.get("seconds")
+        return (
+            seconds is not None
+            and now is not None
+            and run.start_time is not None
+            and now - run.start_time > seconds
+        )
+
+    def _joins_match(self, run: Run, joins: dict[str, Any]) -> bool:
+        return all(
+            _normalize(run.captures.get(alias)) == value
+            for alias, value in joins.items()
+        )
+
+    def feed(
+        self, events: list[StepEvent], base: int, source_file: str
+    ) -> list[tuple[dict, Run]]:
+        """
+        Process the events of one chunk, whose first entry sits at absolute
+        position `base`. Returns the (rule, run) pairs completed by the chunk.
+        """
+        completed = []
+        for event in events:
+            position = base + event.index
+            if event.time is not None:
+                self.last_time = event.time
+            rule = self.rules[event.rule_id]
+            total_steps = len(rule["variant"]["steps"])
+            state_key = (event.rule_id, source_file, event.key)
+            runs = self.runs.setdefault(state_key, [])
+            runs[:] = [
+                r for r in runs if not self._expired(rule, r, position, event.time)
+            ]
+
+            step = {
+                "name": rule["variant"]["steps"][event.step].get("name"),
+                "id": event.entry_id,
+                "api": event.api,
+            }
+            if event.step == 0:
+                run = Run(1, position, event.time, dict(event.captures), [step])
+                if total_steps == 1:
+                    completed.append((rule, run))
+                else:
+                    runs.append(run)
+                    if len(runs) > MAX_RUNS_PER_KEY:
+                        runs.pop(0)
+            else:
+                for run in runs:
+                    if run.next_step == event.step and self._joins_match(
+                        run, event.joins
+                    ):
+                        run.next_step += 1
+                        run.captures.update(event.captures)
+                        run.steps.append(step)
+                        if run.next_step == total_steps:
+                            runs.remove(run)
+                            completed.append((rule, run))
+                        break
+            if not runs:
+                del self.runs[state_key]
+
+        if events and base - self.last_sweep >= SWEEP_INTERVAL:
+            self.sweep(base)
+        return completed
+
+    def sweep(self, position: int) -> None:
+        """Drop event-windowed runs that expired while their key went quiet."""
+        self.last_sweep = position
+        for state_key in list(self.runs):
+            rule = self.rules[state_key[0]]
+            alive = [
+                r
+                for r in self.runs[state_key]
+                if not self._expired(rule, r, position, self.last_time)
+            ]
+            if alive:
+                self.runs[state_key] = alive
+            else:
+                del self.runs[state_key]
+
+    def pending(self) -> int:
+        return sum(len(runs) for runs in self.runs.values())
+
+
+def build_sequence_match(
+    rule: dict, run: Run, source_file: str, compact: bool
+) -> dict[str, Any]:
+    """Shape a completed run like a regular match, adding the matched steps."""
+    match = {
+        "api": run.steps[-1]["api"],
+        "attributes": run.captures,
+        "sources": {"input": source_file},
+        "steps": run.steps,
+    }
+    if compact:
+        return {"rule_id": rule["variant"]["__id__"]} | match
+    return expand_match(match, build_rule_header(rule))
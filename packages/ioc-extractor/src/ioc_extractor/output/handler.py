@@ -0,0 +1,172 @@
+import json
+import os
+from pathlib import Path
+from typing import Any, Optional
+
+from common.logger import get_logger
+from ioc_extractor.engine.executor import expand_match
+from ioc_extractor.utils.io import json_default
+
+logger = get_logger(__name__)
+
+# Separator placed between encoded matches, both inside and across chunk blocks
+MATCH_SEPARATOR = b",\n"
+
+
+def encode_matches(matches: list[dict[str, Any]]) -> bytes:
+    """Encode matches as a block of JSON objects, one per line."""
+    return MATCH_SEPARATOR.join(
+        json.dumps(m, ensure_ascii=False, default=json_default).encode("utf-8")
+        for m in matches
+    )
+
+
+def decode_matches(block: bytes) -> list[dict[str, Any]]:
+    """Decode a block produced by `encode_matches` back into match dicts."""
+    if not block:
+        return []
+    return json.loads(b"[" + block + b"]")
+
+
+# Format marker of compact result files (see `CompactJSONHandler`)
+COMPACT_FORMAT = "ioc-extractor/compact"
+COMPACT_VERSION = 1
+
+
+def get_output_handler(
+    target: Optional[str], headers: Optional[dict[str, dict]] = None
+) -> "OutputHandler":
+    """
+    Picks the handler for `target`. Passing rule `headers` selects the compact
+    format, whose matches reference these headers by rule id. Targets named
+    `*.db`/`*.sqlite` are result stores, which need the headers.
+    """
+    if not target:
+        return MemoryHandler(headers)
+    from ioc_extractor.output.store import ResultStore, is_store
+
+    if is_store(target):
+        if headers is None:
+            raise ValueError("A result store needs the rule headers")
+        return ResultStore(Path(target), headers)
+    if headers is not None:
+        return CompactJSONHandler(Path(target), headers)
+    return JSONArrayHandler(Path(target))
+
+
+class OutputHandler:
+    def start(self):
+        pass
+
+    def write(self, block: bytes):
+        """Append a block of pre-encoded matches produced by a worker."""
+        raise NotImplementedError
+
+    def flush(self):
+        """Make written matches visible to readers of the output right away."""
+        pass
+
+    def checkpoint(self) -> dict[str, Any]:
+        """Make written data durable and return the state `resume` restores."""
+        raise NotImplementedError
+
+    def resume(self, state: dict[str, Any]):
+        """Continue an output left by an interrupted run (instead of `start`)."""
+        raise NotImplementedError
+
+    def finish(self):
+        pass
+
+    def results(self) -> list[dict[str, Any]]:
+        return []
+
+
+class MemoryHandler(OutputHandler):
+    """Keeps encoded blocks in memory and decodes them on demand."""
+
+    def __init__(self, headers: Optional[dict[str, dict]] = None):
+        self.blocks: list[bytes] = []
+        self.headers = headers
+
+    def write(self, block: bytes):
+        if block:
+            self.blocks.append(block)
+
+    def results(self) -> list[dict[str, Any]]:
+        matches = [m for block in self.blocks for m in decode_matches(block)]
+        if self.headers is None:
+            return matches
+        return [expand_match(m, self.headers[m["rule_id"]]) for m in matches]
+
+
+class JSONArrayHandler(OutputHandler):
+    """Streams encoded blocks into a JSON array file without re-encoding them."""
+
+    closing = b"]\n"
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.file = None
+        self.first = True
+
+    def preamble(self) -> bytes:
+        return b"["
+
+    def start(self):
+        self.file = self.path.open("wb")
+        self.file.write(self.preamble())
+        logger.info(f"Writing results to {self.path}")
+
+    def write(self, block: bytes):
+        if not block:
+            return
+        if not self.first:
+            self.file.write(MATCH_SEPARATOR)
+        self.file.write(block)
+        self.first = False
+
+    def flush(self):
+        if self.file:
+            self.file.flush()
+
+    def checkpoint(self) -> dict[str, Any]:
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return {"offset": self.file.tell(), "first": self.first}
+
+    def resume(self, state: dict[str, Any]):
+        # Anything past the checkpointed offset belongs to chunks redone now
+        self.file = self.path.open("r+b")
+        self.file.truncate(state["offset"])
+        self.file.seek(state["offset"])
+        self.first = state["first"]
+        logger.info(f"Resuming output in {self.path}")
+
+    def finish(self):
+        if self.file:
+            self.file.write(self.closing)
+            self.file.close()
+            self.file = None
+            logger.info(f"Finished writing output to {self.path}")
+
+
+class CompactJSONHandler(JSONArrayHandler):
+    """
+    Writes a JSON object holding every rule header once, followed by the matches
+    array. Matches only carry `rule_id`, `api`, `attributes` and `sources`.
+    """
+
+    closing = b"]}\n"
+
+    def __init__(self, path: Path, headers: dict[str, dict]):
+        super().__init__(path)
+        self.headers = headers
+
+    def preamble(self) -> bytes:
+        header = {
+            "format": COMPACT_FORMAT,
+            "version": COMPACT_VERSION,
+            "rules": self.headers,
+        }
+        head = json.dumps(header, ensure_ascii=False)[:-1]
+        return f'{head}, "matches": ['.encode()
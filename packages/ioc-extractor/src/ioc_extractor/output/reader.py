@@ -0,0 +1,32 @@
+import json
+from pathlib import Path
+from typing import Any, Optional
+
+from ioc_extractor.engine.executor import expand_match
+from ioc_extractor.output.handler import COMPACT_FORMAT
+from ioc_extractor.output.store import is_store, load_store_results
+
+
+def is_compact(data: Any) -> bool:
+    return isinstance(data, dict) and data.get("format") == COMPACT_FORMAT
+
+
+def expand_results(data: Any) -> list[dict[str, Any]]:
+    """Normalizes parsed output of either format into a list of full matches."""
+    if not is_compact(data):
+        return data
+    headers = data.get("rules", {})
+    return [expand_match(m, headers[m["rule_id"]]) for m in data.get("matches", [])]
+
+
+def load_results(path: str | Path, run: Optional[int] = None) -> list[dict[str, Any]]:
+    """
+    Loads an analysis output file, accepting both the full JSON array and the
+    compact format. Expanded matches share their header dicts, so reading a
+    compact file stays cheaper than reading the equivalent full one. A result
+    store yields the matches of `run`, by default its latest.
+    """
+    if is_store(path):
+        return load_store_results(path, run)
+    with open(path, encoding="utf-8") as f:
+        return expand_results(json.load(f))
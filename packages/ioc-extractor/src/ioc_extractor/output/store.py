@@ -0,0 +1,447 @@
+"""
+SQLite result store (`analyze -o results.db`, `ioc-extractor query`).
+
+Every run appends to the same database, so questions spanning runs ("which
+traces contacted this domain last month") are indexed lookups instead of
+loading every result file. Tables are normalized:
+
+    runs        one row per `analyze` run (start and end time, match count)
+    inputs      one row per input path
+    rules       one row per distinct rule header (name, variant, header JSON)
+    matches     run, input, rule and api of every match (plus `count` and any
+                other fields of summary and sequence records, as JSON)
+    attribute_values
+                one row per distinct attribute key and value; strings are
+                stored as-is and other values as JSON, flagged by `encoded`
+    attributes  one (match, value) row per match attribute
+
+Matches are inserted in batches, one transaction each, with the database in
+WAL mode so queries and `visualize` can read while a run is writing.
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any, Optional
+
+from common.logger import get_logger
+from ioc_extractor.engine.executor import expand_match
+from ioc_extractor.output.handler import OutputHandler, decode_matches
+
+logger = get_logger(__name__)
+
+STORE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+# Stored as the database's `user_version`; bumped whenever the schema changes
+STORE_VERSION = 1
+# Matches inserted per transaction
+BATCH_SIZE = 5000
+# Attribute value ids kept by a writer before its cache is reset
+VALUE_CACHE_SIZE = 100_000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started REAL NOT NULL,
+    finished REAL,
+    matches INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS inputs (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS rules (
+    id INTEGER PRIMARY KEY,
+    digest TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    variant TEXT,
+    header TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS matches (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    input_id INTEGER REFERENCES inputs(id),
+    rule_id INTEGER NOT NULL REFERENCES rules(id),
+    api TEXT,
+    count INTEGER,
+    extra TEXT
+);
+CREATE TABLE IF NOT EXISTS attribute_values (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    encoded INTEGER NOT NULL,
+    UNIQUE (key, value, encoded)
+);
+CREATE TABLE IF NOT EXISTS attributes (
+    match_id INTEGER NOT NULL REFERENCES matches(id),
+    value_id INTEGER NOT NULL REFERENCES attribute_values(id)
+);
+CREATE INDEX IF NOT EXISTS runs_started ON runs(started);
+CREATE INDEX IF NOT EXISTS rules_name ON rules(name);
+CREATE INDEX IF NOT EXISTS matches_run ON matches(run_id);
+CREATE INDEX IF NOT EXISTS matches_input ON matches(input_id);
+CREATE INDEX IF NOT EXISTS matches_rule ON matches(rule_id);
+CREATE INDEX IF NOT EXISTS matches_api ON matches(api);
+CREATE INDEX IF NOT EXISTS attributes_match ON attributes(match_id);
+CREATE INDEX IF NOT EXISTS attributes_value ON attributes(value_id);
+"""
+
+# Match fields with a column of their own; anything else goes to `extra`
+_COLUMN_FIELDS = frozenset({"rule_id", "api", "attributes", "count", "sources"})
+
+
+def is_store(path: Optional[str | Path]) -> bool:
+    return path is not None and Path(path).suffix.lower() in STORE_SUFFIXES
+
+
+def connect(path: str | Path, create: bool = False) -> sqlite3.Connection:
+    """
+    Open a result store in autocommit mode (transactions are explicit),
+    creating its schema if `create`. Raises ValueError for other databases.
+    """
+    if not create and not Path(path).is_file():
+        raise ValueError(f"No result store at {path}")
+    conn = sqlite3.connect(path, timeout=30.0, isolation_level=None)
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version == 0 and create:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            conn.execute(f"PRAGMA user_version={STORE_VERSION}")
+        elif version != STORE_VERSION:
+            raise ValueError(f"{path} is not a result store of version {STORE_VERSION}")
+    except (sqlite3.DatabaseError, ValueError) as e:
+        conn.close()
+        raise ValueError(f"Cannot use {path} as a result store: {e}")
+    # Commits are durable against crashes; WAL checkpoints sync them to disk
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+# JSON of the scalars attributes mostly hold, skipping `json.dumps`
+_SCALARS = {None: "null", True: "true", False: "false"}
+
+
+def _encode_value(value: Any) -> tuple[Any, int]:
+    if isinstance(value, str):
+        return value, 0
+    if value is None or isinstance(value, bool):
+        return _SCALARS[value], 1
+    if type(value) is int:
+        return str(value), 1
+    return json.dumps(value, ensure_ascii=False, default=str), 1
+
+
+def _decode_value(value: Any, encoded: int) -> Any:
+    return json.loads(value) if encoded else value
+
+
+class ResultStore(OutputHandler):
+    """
+    Writes the matches of a run into a result store. Matches arrive compact
+    (referencing `headers` by rule id); `run_pipeline` asks for them that way.
+    """
+
+    def __init__(self, path: Path, headers: dict[str, dict]):
+        self.path = path
+        self.headers = headers
+        self.conn: Optional[sqlite3.Connection] = None
+        self.run_id: Optional[int] = None
+        self.rule_ids: dict[str, int] = {}
+        self.input_ids: dict[str, int] = {}
+        self.value_ids: dict[tuple, int] = {}
+        self.pending: list[dict[str, Any]] = []
+        self.written = 0
+
+    def start(self):
+        self.conn = connect(self.path, create=True)
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.run_id = self.conn.execute(
+                "INSERT INTO runs (started) VALUES (?)", (time.time(),)
+            ).lastrowid
+            self._store_rules()
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        logger.info(f"Writing results to {self.path} (run {self.run_id})")
+
+    def _store_rules(self) -> None:
+        """Map the run's rule ids to rows of `rules`, adding unknown headers."""
+        for rule_id, header in self.headers.items():
+            canonical = json.dumps(header, sort_keys=True)
+            digest = hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+            encoded = json.dumps(header, ensure_ascii=False)
+            self.conn.execute(
+                "INSERT OR IGNORE INTO rules (digest, name, variant, header) "
+                "VALUES (?, ?, ?, ?)",
+                (digest, header["rule"]["name"], header["rule"]["variant"], encoded),
+            )
+            (self.rule_ids[rule_id],) = self.conn.execute(
+                "SELECT id FROM rules WHERE digest = ?", (digest,)
+            ).fetchone()
+
+    def _input_id(self, path: Optional[str]) -> Optional[int]:
+        if path is None:
+            return None
+        if path not in self.input_ids:
+            self.conn.execute("INSERT OR IGNORE INTO inputs (path) VALUES (?)", (path,))
+            (self.input_ids[path],) = self.conn.execute(
+                "SELECT id FROM inputs WHERE path = ?", (path,)
+            ).fetchone()
+        return self.input_ids[path]
+
+    def _value_id(self, key: str, value: Any) -> int:
+        entry = (key, *_encode_value(value))
+        value_id = self.value_ids.get(entry)
+        if value_id is None:
+            if len(self.value_ids) >= VALUE_CACHE_SIZE:
+                self.value_ids.clear()
+            self.conn.execute(
+                "INSERT OR IGNORE INTO attribute_values (key, value, encoded) "
+                "VALUES (?, ?, ?)",
+                entry,
+            )
+            (value_id,) = self.conn.execute(
+                "SELECT id FROM attribute_values "
+                "WHERE key = ? AND value = ? AND encoded = ?",
+                entry,
+            ).fetchone()
+            self.value_ids[entry] = value_id
+        return value_id
+
+    def write(self, block: bytes):
+        if not block:
+            return
+        self.pending.extend(decode_matches(block))
+        if len(self.pending) >= BATCH_SIZE:
+            self._insert_pending()
+
+    def _insert_pending(self) -> None:
+        """Insert buffered matches in one transaction."""
+        if not self.pending:
+            return
+        matches, self.pending = self.pending, []
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Ids are taken under the write lock: other runs may share the store
+            (first,) = self.conn.execute(
+                "SELECT coalesce(max(id), 0) + 1 FROM matches"
+            ).fetchone()
+            rows, attributes = [], []
+            for match_id, match in enumerate(matches, first):
+                extra = {k: v for k, v in match.items() if k not in _COLUMN_FIELDS}
+                sources = match.get("sources", {})
+                rows.append(
+                    (
+                        match_id,
+                        self.run_id,
+                        self._input_id(sources.get("input")),
+                        self.rule_ids[match["rule_id"]],
+                        match.get("api"),
+                        match.get("count"),
+                        json.dumps(extra, ensure_ascii=False) if extra else None,
+                    )
+                )
+                for key, value in match.get("attributes", {}).items():
+                    attributes.append((match_id, self._value_id(key, value)))
+            self.conn.executemany(
+                "INSERT INTO matches VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self.conn.executemany("INSERT INTO attributes VALUES (?, ?)", attributes)
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            # Ids cached during the transaction may have been rolled back
+            self.input_ids.clear()
+            self.value_ids.clear()
+            raise
+        self.written += len(matches)
+
+    def flush(self):
+        if self.conn:
+            self._insert_pending()
+
+    def checkpoint(self) -> dict[str, Any]:
+        self._insert_pending()
+        self.conn.execute("PRAGMA wal_checkpoint(FULL)")
+        (last,) = self.conn.execute(
+            "SELECT coalesce(max(id), 0) FROM matches WHERE run_id = ?",
+            (self.run_id,),
+        ).fetchone()
+        return {"run": self.run_id, "last_match": last, "written": self.written}
+
+    def resume(self, state: dict[str, Any]):
+        # Matches past the checkpoint belong to chunks redone now
+        self.conn = connect(self.path)
+        self.run_id = state["run"]
+        self.written = state["written"]
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.execute(
+                "DELETE FROM attributes WHERE match_id IN "
+                "(SELECT id FROM matches WHERE run_id = ? AND id > ?)",
+                (self.run_id, state["last_match"]),
+            )
+            self.conn.execute(
+                "DELETE FROM matches WHERE run_id = ? AND id > ?",
+                (self.run_id, state["last_match"]),
+            )
+            self.conn.execute(
+                "UPDATE runs SET finished = NULL WHERE id = ?", (self.run_id,)
+            )
+            self._store_rules()
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        logger.info(f"Resuming run {self.run_id} in {self.path}")
+
+    def finish(self):
+        if not self.conn:
+            return
+        try:
+            self._insert_pending()
+            self.conn.execute(
+                "UPDATE runs SET finished = ?, matches = ? WHERE id = ?",
+                (time.time(), self.written, self.run_id),
+            )
+        finally:
+            self.conn.close()
+            self.conn = None
+        logger.info(f"Finished writing {self.written} match(es) to {self.path}")
+
+
+def _escape_like(text: str) -> str:
+    """`text` as a literal inside a LIKE pattern using `ESCAPE '\\'`."""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class StoreQuery:
+    """Filters on stored matches, combined with AND (each list with OR)."""
+
+    def __init__(
+        self,
+        runs: Optional[list[int]] = None,
+        apis: Optional[list[str]] = None,
+        rules: Optional[list[str]] = None,
+        attributes: Optional[list[tuple[str, str]]] = None,
+        input_like: Optional[str] = None,
+        since: Optional[float] = None,
+    ):
+        self.clauses: list[str] = []
+        self.params: list[Any] = []
+        if runs:
+            self._any("m.run_id", runs)
+        if apis:
+            self._any("m.api", apis)
+        if rules:
+            self._any("r.name", rules)
+        for key, value in attributes or []:
+            self.clauses.append(
+                "m.id IN (SELECT a.match_id FROM attributes a "
+                "JOIN attribute_values v ON v.id = a.value_id "
+                "WHERE v.key = ? AND v.value = ?)"
+            )
+            self.params += [key, value]
+        if input_like:
+            self.clauses.append("i.path LIKE ? ESCAPE '\\'")
+            self.params.append(f"%{_escape_like(input_like)}%")
+        if since is not None:
+            self.clauses.append("u.started >= ?")
+            self.params.append(since)
+
+    def _any(self, column: str, values: list) -> None:
+        self.clauses.append(f"{column} IN ({', '.join('?' * len(values))})")
+        self.params += values
+
+    def where(self) -> str:
+        return f"WHERE {' AND '.join(self.clauses)}" if self.clauses else ""
+
+
+_FROM = """
+FROM matches m
+JOIN rules r ON r.id = m.rule_id
+JOIN runs u ON u.id = m.run_id
+LEFT JOIN inputs i ON i.id = m.input_id
+"""
+
+
+def query_matches(
+    conn: sqlite3.Connection, query: StoreQuery, limit: Optional[int] = None
+) -> Iterator[dict[str, Any]]:
+    """Yield matching records as full matches, in insertion order."""
+    sql = (
+        f"SELECT m.id, m.api, m.count, m.extra, i.path, r.id, r.header {_FROM} "
+        f"{query.where()} ORDER BY m.id"
+    )
+    params = list(query.params)
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    headers: dict[int, dict] = {}
+    cursor = conn.execute(sql, params)
+    while rows := cursor.fetchmany(1000):
+        attributes: dict[int, dict] = {row[0]: {} for row in rows}
+        marks = ", ".join("?" * len(rows))
+        for match_id, key, value, encoded in conn.execute(
+            "SELECT a.match_id, v.key, v.value, v.encoded FROM attributes a "
+            "JOIN attribute_values v ON v.id = a.value_id "
+            f"WHERE a.match_id IN ({marks}) ORDER BY a.rowid",
+            list(attributes),
+        ):
+            attributes[match_id][key] = _decode_value(value, encoded)
+        for match_id, api, count, extra, path, rule_id, header in rows:
+            if rule_id not in headers:
+                headers[rule_id] = json.loads(header)
+            match = {"api": api, "attributes": attributes[match_id]}
+            if path is not None:
+                match["sources"] = {"input": path}
+            if count is not None:
+                match["count"] = count
+            if extra:
+                match |= json.loads(extra)
+            yield expand_match(match, headers[rule_id])
+
+
+def count_by_input(
+    conn: sqlite3.Connection, query: StoreQuery
+) -> list[tuple[str, int, float]]:
+    """(input path, matches, latest run start) per input, most matches first."""
+    sql = (
+        f"SELECT i.path, count(*), max(u.started) {_FROM} {query.where()} "
+        "GROUP BY m.input_id ORDER BY count(*) DESC, i.path"
+    )
+    return conn.execute(sql, query.params).fetchall()
+
+
+def list_runs(conn: sqlite3.Connection) -> list[tuple]:
+    """(id, started, finished, matches, inputs) of every run, newest first."""
+    return conn.execute(
+        "SELECT u.id, u.started, u.finished, u.matches, "
+        "(SELECT count(DISTINCT input_id) FROM matches WHERE run_id = u.id) "
+        "FROM runs u ORDER BY u.id DESC"
+    ).fetchall()
+
+
+def latest_run(conn: sqlite3.Connection) -> Optional[int]:
+    row = conn.execute("SELECT max(id) FROM runs").fetchone()
+    return row[0]
+
+
+def load_store_results(
+    path: str | Path, run: Optional[int] = None
+) -> list[dict[str, Any]]:
+    """The matches of one run of a store (by default its latest) as full matches."""
+    conn = connect(path)
+    try:
+        run = run if run is not None else latest_run(conn)
+        if run is None:
+            return []
+        return list(query_matches(conn, StoreQuery(runs=[run])))
+    finally:
+        conn.close()
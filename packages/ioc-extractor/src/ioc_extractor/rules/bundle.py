@@ -0,0 +1,107 @@
+"""
+Precompiled rule bundles (`ioc-extractor compile-rules`) and the rule cache.
+
+A bundle is one JSON file holding rules already parsed, validated and
+normalized by the loader, so loading one skips YAML entirely. Rules given as
+a plain directory are cached the same way under the user cache directory
+(`$IOC_EXTRACTOR_CACHE_DIR`, else `$XDG_CACHE_HOME/ioc-extractor`), one file
+per directory, valid while every pattern file below it keeps its size and
+mtime and no file is added or removed.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Optional
+
+from common.logger import get_logger
+
+logger = get_logger(__name__)
+
+BUNDLE_FORMAT = "ioc-extractor-rules"
+# Bumped whenever the loader's normalized rule layout changes
+BUNDLE_VERSION = 1
+BUNDLE_SUFFIX = ".json"
+
+
+def file_stamp(files: list[Path], root: Optional[Path] = None) -> dict[str, list]:
+    """Size and mtime of every file, by path (relative to `root` if given)."""
+    stamp = {}
+    for file in files:
+        stat = file.stat()
+        name = file.relative_to(root).as_posix() if root else str(file)
+        stamp[name] = [stat.st_size, stat.st_mtime_ns]
+    return stamp
+
+
+def write_bundle(path: Path, rules: list[dict], sources: dict[str, list]) -> None:
+    """Write `rules` (loader records: meta, variant, source) atomically."""
+    bundle = {
+        "format": BUNDLE_FORMAT,
+        "version": BUNDLE_VERSION,
+        "sources": sources,
+        "rules": rules,
+    }
+    encoded = json.dumps(bundle, ensure_ascii=False, separators=(",", ":"))
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(encoded, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def read_bundle(path: Path) -> dict[str, Any]:
+    """Load a bundle, raising ValueError if it is not one of this version."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            bundle = json.load(f)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Not a rule bundle: {path} ({e})")
+    if not isinstance(bundle, dict) or bundle.get("format") != BUNDLE_FORMAT:
+        raise ValueError(f"Not a rule bundle: {path}")
+    if bundle.get("version") != BUNDLE_VERSION:
+        raise ValueError(
+            f"Rule bundle {path} has version {bundle.get('version')}, expected "
+            f"{BUNDLE_VERSION}; rebuild it with 'compile-rules'"
+        )
+    return bundle
+
+
+def is_bundle(path: Path) -> bool:
+    return path.is_file() and path.suffix == BUNDLE_SUFFIX
+
+
+def cache_dir() -> Path:
+    if configured := os.environ.get("IOC_EXTRACTOR_CACHE_DIR"):
+        return Path(configured)
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "ioc-extractor"
+
+
+def cache_path(directory: Path) -> Path:
+    digest = hashlib.sha256(str(directory.resolve()).encode("utf-8")).hexdigest()
+    return cache_dir() / "rules" / f"{digest[:16]}{BUNDLE_SUFFIX}"
+
+
+def load_cached(directory: Path, stamp: dict[str, list]) -> Optional[list[dict]]:
+    """The cached rules of `directory` if its files still match `stamp`."""
+    path = cache_path(directory)
+    if not path.exists():
+        return None
+    try:
+        bundle = read_bundle(path)
+    except (OSError, ValueError) as e:
+        logger.debug(f"Ignoring rule cache {path}: {e}")
+        return None
+    if bundle["sources"] != stamp:
+        return None
+    return bundle["rules"]
+
+
+def store_cached(directory: Path, rules: list[dict], stamp: dict[str, list]) -> None:
+    """Cache the rules of `directory`; failing to is not an error."""
+    path = cache_path(directory)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        write_bundle(path, rules, stamp)
+    except (OSError, TypeError, ValueError) as e:
+        logger.debug(f"Could not cache rules of {directory}: {e}")
@@ -1,3 +1,4 @@
+import threading
 from typing import Callable
 
 from common.logger import get_logger
@@ -6,6 +7,35 @@ logger = get_logger(__name__)
 
 _transform_registry: dict[str, Callable] = {}
 _operator_registry: dict[str, Callable] = {}
+_builtins_loaded = False
+_builtins_lock = threading.Lock()
+
+
+def _load_builtins() -> None:
+    """
+    Import operators.py and modifiers.py so that their @register_operator and
+    @register_transform decorators run. Done on the first lookup instead of on
+    import, which keeps importing the registry (and the CLI) cheap.
+    """
+    global _builtins_loaded
+    with _builtins_lock:
+        if _builtins_loaded:
+            return
+        try:
+            import ioc_extractor.rules.operators  # noqa: F401
+
+            logger.debug("Operators module loaded successfully.")
+        except ImportError as e:
+            logger.warning(f"Operators module could not be loaded: {e}")
+
+        try:
+            import ioc_extractor.rules.modifiers  # noqa: F401
+
+            logger.debug("Modifiers module loaded successfully.")
+        except ImportError as e:
+            logger.warning(f"Modifiers module could not be loaded: {e}")
+        # Only now, so concurrent lookups wait for every operator to register
+        _builtins_loaded = True
 
 
 def register_transform(name: str) -> Callable:
@@ -25,6 +55,8 @@ def get_transform(name: str) -> Callable | None:
     """
     Retrieves a registered transformation function by name.
     """
+    if not _builtins_loaded:
+        _load_builtins()
     return _transform_registry.get(name)
 
 
@@ -44,24 +76,6 @@ def get_operator(name: str) -> Callable | None:
     """
     Retrieves a registered logical operator by name.
     """
+    if not _builtins_loaded:
+        _load_builtins()
     return _operator_registry.get(name)
-
-
-# ---------------------------------------------------------------------
-# Auto-load of operators module:
-# Ensure that all @register_operator decorators in operators.py
-# are executed when this registry is imported.
-# ---------------------------------------------------------------------
-try:
-    from ioc_extractor.rules.operators import *  # noqa: F403
-
-    logger.info("Operators module loaded successfully.")
-except ImportError as e:
-    logger.warning(f"Operators module could not be loaded: {e}")
-
-try:
-    from ioc_extractor.rules.modifiers import *  # noqa: F403
-
-    logger.info("Modifiers module loaded successfully.")
-except ImportError as e:
-    logger.warning(f"Modifiers module could not be loaded: {e}")
@@ -3,11 +3,24 @@ from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any, Optional
 
+import jmespath
 import yaml
 from common.logger import get_logger
+from ioc_extractor.rules.bundle import (
+    file_stamp,
+    is_bundle,
+    load_cached,
+    read_bundle,
+    store_cached,
+)
+from ioc_extractor.rules.registry import get_operator
 
 logger = get_logger(__name__)
 
+RULE_SUFFIXES = (".yml", ".yaml")
+# libyaml's loader when PyYAML was built with it, several times faster
+_YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
 
 def compile_where(where: Any) -> Any:
     """
@@ -79,6 +92,10 @@ class Variant:
     attck: list[str] = field(default_factory=list)
     select: list[dict[str, Any]] = field(default_factory=list)
     where: Any = field(default_factory=dict)
+    # Sequence variants only (see engine.sequence)
+    steps: list[dict[str, Any]] = field(default_factory=list)
+    key: Optional[str] = None
+    window: dict[str, Any] = field(default_factory=dict)
 
     @staticmethod
     def from_dict(data: dict[str, Any]) -> "Variant":
@@ -93,56 +110,218 @@ class Variant:
             where=data.get("where", {}),
         )
 
+    @staticmethod
+    def from_sequence(data: dict[str, Any]) -> "Variant":
+        steps = data.get("steps")
+        if not isinstance(steps, list) or not steps:
+            raise ValueError(f"Sequence '{data.get('name')}' must define steps")
+        for step in steps:
+            if not isinstance(step, dict) or "where" not in step:
+                raise ValueError(
+                    f"Every step of sequence '{data.get('name')}' needs a 'where'"
+                )
+        window = data.get("window") or {}
+        if not {"events", "seconds"} & set(window):
+            raise ValueError(
+                f"Sequence '{data.get('name')}' needs a window in events or seconds"
+            )
+        variant = Variant.from_dict(data)
+        variant.steps = steps
+        variant.key = data.get("key")
+        variant.window = window
+        return variant
+
 
 @dataclass
 class RuleWrapper:
     meta: Meta
     variant: Variant
     source: Optional[str] = None
+    rule_id: Optional[str] = None
 
     def to_dict(self) -> dict[str, Any]:
         return {
             "meta": self.meta.__dict__,
-            "variant": self.variant.__dict__ | {"__source__": self.source},
+            "variant": self.variant.__dict__
+            | {"__source__": self.source, "__id__": self.rule_id},
         }
 
 
+def _assign_rule_ids(wrappers: list[RuleWrapper]) -> None:
+    """
+    Gives every rule-variant pair a stable id of the form `<rule name>:<index>`,
+    where index is the variant's position among those sharing the rule name.
+    Ids key the rule header in compact output, so they must be unique per run.
+    """
+    seen: dict[str, int] = {}
+    for wrapper in wrappers:
+        index = seen.get(wrapper.meta.name, 0)
+        seen[wrapper.meta.name] = index + 1
+        wrapper.rule_id = f"{wrapper.meta.name}:{index}"
+
+
+def _discover_rule_files(directory: Path) -> list[Path]:
+    """Pattern files anywhere below `directory`, in a stable order."""
+    return sorted(
+        p for p in directory.rglob("*") if p.suffix in RULE_SUFFIXES and p.is_file()
+    )
+
+
 def _resolve_rule_files(paths: list[Path]) -> list[Path]:
     files = []
     for path in paths:
         if path.is_dir():
-            files += list(path.glob("*.yml")) + list(path.glob("*.yaml"))
-        elif path.suffix in (".yml", ".yaml"):
+            files += _discover_rule_files(path)
+        elif path.suffix in RULE_SUFFIXES or is_bundle(path):
             files.append(path)
     return files
 
 
-def load_query_rules(paths: list[Path]) -> list[dict[str, Any]]:
+def _check_condition(where: Any, file: Path) -> None:
+    """Raise ValueError on unknown operators, bad selectors or bad regexes."""
+    if not where:
+        return
+    if not isinstance(where, dict):
+        raise ValueError(f"Invalid condition in {file}: {where!r}")
+    for logical in ("and", "or"):
+        if logical in where:
+            for cond in where[logical]:
+                _check_condition(cond, file)
+            return
+    if "not" in where:
+        _check_condition(where["not"], file)
+        return
+    if len(where) != 1:
+        raise ValueError(f"Invalid condition in {file}: {where!r}")
+    op, args = next(iter(where.items()))
+    if get_operator(op) is None:
+        raise ValueError(f"Unknown operator '{op}' in {file}")
+    if not isinstance(args, list) or not args:
+        raise ValueError(f"Operator '{op}' in {file} needs [selector, operand]")
+    _check_selector(args[0], file)
+    if op == "regex" and len(args) > 1 and isinstance(args[1], str):
+        try:
+            re.compile(args[1])
+        except re.error as e:
+            raise ValueError(f"Invalid regex '{args[1]}' in {file}: {e}")
+
+
+def _check_selector(selector: Any, file: Path) -> None:
+    try:
+        jmespath.compile(selector)
+    except Exception as e:
+        raise ValueError(f"Invalid selector {selector!r} in {file}: {e}")
+
+
+def _validate(variant: Variant, file: Path) -> None:
+    _check_condition(variant.where, file)
+    for sel in variant.select:
+        _check_selector(sel.get("field"), file)
+    for step in variant.steps:
+        _check_condition(step.get("where"), file)
+        for sel in (step.get("capture") or []) + (step.get("join") or []):
+            _check_selector(sel.get("field"), file)
+
+
+def _parse_rule_file(file: Path) -> list[RuleWrapper]:
+    """Parse and validate one pattern file."""
+    with open(file, encoding="utf-8") as f:
+        raw = yaml.load(f, Loader=_YamlLoader)
+
     results = []
+    if isinstance(raw, list):
+        for r in raw:
+            meta = Meta.from_dict(r.get("meta", {}))
+            variant = Variant.from_dict(r)
+            results.append(RuleWrapper(meta, variant, source=str(file)))
 
-    for file in _resolve_rule_files(paths):
-        with open(file, encoding="utf-8") as f:
-            raw = yaml.safe_load(f)
+    elif (
+        isinstance(raw, dict)
+        and "meta" in raw
+        and ("variants" in raw or "sequences" in raw)
+    ):
+        meta = Meta.from_dict(raw["meta"])
+        if meta.name is None:
+            # e.g. patterns/template.yaml, whose fields are all placeholders
+            logger.warning(f"Skipping {file}: the rule has no name")
+            return []
+        for v in raw.get("variants") or []:
+            variant = Variant.from_dict(v)
+            results.append(RuleWrapper(meta, variant, source=str(file)))
+        for s in raw.get("sequences") or []:
+            variant = Variant.from_sequence(s)
+            results.append(RuleWrapper(meta, variant, source=str(file)))
 
-        if isinstance(raw, list):
-            for r in raw:
-                meta = Meta.from_dict(r.get("meta", {}))
-                variant = Variant.from_dict(r)
-                results.append(RuleWrapper(meta, variant, source=str(file)).to_dict())
+    elif isinstance(raw, dict) and "select" in raw and "where" in raw:
+        meta = Meta.from_dict({})
+        variant = Variant.from_dict(raw)
+        results.append(RuleWrapper(meta, variant, source=str(file)))
 
-        elif isinstance(raw, dict) and "meta" in raw and "variants" in raw:
-            meta = Meta.from_dict(raw["meta"])
-            for v in raw["variants"]:
-                variant = Variant.from_dict(v)
-                results.append(RuleWrapper(meta, variant, source=str(file)).to_dict())
+    elif isinstance(raw, dict) and "meta" in raw:
+        # A rule described but not written yet
+        logger.warning(f"Skipping {file}: the rule has no variants or sequences")
 
-        elif isinstance(raw, dict) and "select" in raw and "where" in raw:
-            meta = Meta.from_dict({})
-            variant = Variant.from_dict(raw)
-            results.append(RuleWrapper(meta, variant, source=str(file)).to_dict())
+    else:
+        raise ValueError(f"Invalid rule format in {file}")
 
-        else:
-            raise ValueError(f"Invalid rule format in {file}")
+    for wrapper in results:
+        _validate(wrapper.variant, file)
+    return results
 
+
+def _to_record(wrapper: RuleWrapper) -> dict[str, Any]:
+    """Serializable form of a parsed rule, as stored in bundles and the cache."""
+    return {
+        "meta": wrapper.meta.__dict__,
+        "variant": wrapper.variant.__dict__,
+        "source": wrapper.source,
+    }
+
+
+def _from_record(record: dict[str, Any]) -> RuleWrapper:
+    return RuleWrapper(
+        Meta(**record["meta"]), Variant(**record["variant"]), record["source"]
+    )
+
+
+def parse_rule_files(files: list[Path]) -> list[dict[str, Any]]:
+    """Parse pattern files into bundle records."""
+    return [_to_record(w) for file in files for w in _parse_rule_file(file)]
+
+
+def _load_directory(directory: Path) -> list[RuleWrapper]:
+    """Rules below `directory`, through the rule cache."""
+    files = _discover_rule_files(directory)
+    stamp = file_stamp(files, directory)
+    records = load_cached(directory, stamp)
+    if records is None:
+        records = parse_rule_files(files)
+        # Sources relative to the directory, which may be given differently
+        for record in records:
+            record["source"] = Path(record["source"]).relative_to(directory).as_posix()
+        store_cached(directory, records, stamp)
+    else:
+        logger.debug(f"Loaded rules of {directory} from the rule cache")
+    wrappers = [_from_record(r) for r in records]
+    for wrapper in wrappers:
+        wrapper.source = str(directory / wrapper.source)
+    return wrappers
+
+
+def load_query_rules(paths: list[Path]) -> list[dict[str, Any]]:
+    """
+    Load rules from pattern files, directories (searched recursively and
+    cached, see `rules.bundle`) and bundles built by `compile-rules`.
+    """
+    results = []
+    for path in paths:
+        if path.is_dir():
+            results += _load_directory(path)
+        elif is_bundle(path):
+            results += [_from_record(r) for r in read_bundle(path)["rules"]]
+        elif path.suffix in RULE_SUFFIXES:
+            results += _parse_rule_file(path)
+
+    _assign_rule_ids(results)
     logger.info(f"Loaded {len(results)} rule(s)")
-    return results
+    return [r.to_dict() for r in results]
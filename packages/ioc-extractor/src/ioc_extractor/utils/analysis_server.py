@@ -0,0 +1,412 @@
+"""
+Long-lived analysis service (`ioc-extractor serve`).
+
+Rules are loaded once and reloaded when a pattern file changes; a process
+pool is kept warm across jobs. Workers do not keep the rules: like any
+pipeline run, each chunk is sent with the rule set of its job. Jobs are submitted over a local HTTP API:
+
+    POST /jobs                {"input": "/path/trace.json", "compact": false,
+                               "summarize": false, "chunk": 1000}
+                              or a multipart upload with a `trace` file field
+    GET  /jobs                list of jobs
+    GET  /jobs/<id>           status, counts and timings
+    GET  /jobs/<id>/results   results, streamed while the job is still running
+    DELETE /jobs/<id>         forget a finished job and its results
+    GET  /rules               loaded rule set
+    POST /rules/reload        reload rules now
+    GET  /health
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Optional
+
+from common.logger import get_logger
+from flask import Flask, Response, jsonify, request
+from ioc_extractor.rules.rule_loader import _resolve_rule_files, load_query_rules
+from ioc_extractor.utils.pipeline_executor import PipelineOptions, run_pipeline
+
+logger = get_logger(__name__)
+
+DEFAULT_CHUNK_SIZE = 1000
+# Finished jobs kept (with their results) before the oldest are forgotten
+MAX_FINISHED_JOBS = 500
+STREAM_POLL_SECONDS = 0.2
+
+
+JOB_FLAGS = ("compact", "ordered", "summarize")
+_TRUE = ("1", "true", "yes", "on")
+_FALSE = ("", "0", "false", "no", "off")
+
+
+def _flag(name: str, value: Any) -> bool:
+    """Boolean job option, given as JSON or as a multipart form string."""
+    if isinstance(value, str) and value.strip().lower() in _TRUE + _FALSE:
+        return value.strip().lower() in _TRUE
+    if isinstance(value, bool) or value in (0, 1, None):
+        return bool(value)
+    raise ValueError(f"Option '{name}' must be a boolean, got {value!r}")
+
+
+def parse_job_options(options: dict[str, Any]) -> dict[str, Any]:
+    """Validate and normalize the options of a job; raises ValueError."""
+    unknown = set(options) - {"chunk", *JOB_FLAGS}
+    if unknown:
+        raise ValueError(f"Unknown job option(s): {', '.join(sorted(unknown))}")
+    chunk = options.get("chunk") or DEFAULT_CHUNK_SIZE
+    if isinstance(chunk, str) and chunk.strip().isdigit():
+        chunk = int(chunk)
+    if isinstance(chunk, bool) or not isinstance(chunk, int) or chunk < 1:
+        raise ValueError(f"Option 'chunk' must be a positive integer, got {chunk!r}")
+    parsed = {"chunk": chunk}
+    for name in JOB_FLAGS:
+        parsed[name] = _flag(name, options.get(name))
+    return parsed
+
+
+@dataclass
+class Job:
+    id: str
+    input: str
+    options: dict[str, Any]
+    output: Path
+    rules_version: str
+    status: str = "queued"
+    submitted: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    counts: dict[str, int] = field(default_factory=dict)
+    error: Optional[str] = None
+    upload: bool = False
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "input": self.input,
+            "options": self.options,
+            "status": self.status,
+            "rules_version": self.rules_version,
+            "submitted": self.submitted,
+            "started": self.started,
+            "finished": self.finished,
+            "duration": (
+                self.finished - self.started if self.finished and self.started else None
+            ),
+            "matches": sum(self.counts.values()),
+            "counts": self.counts,
+            "error": self.error,
+        }
+
+
+class RuleSet:
+    """Compiled rules for `paths`, reloaded when a pattern file changes."""
+
+    def __init__(self, paths: list[Path], poll_seconds: float = 2.0):
+        self.paths = paths
+        self.poll_seconds = poll_seconds
+        self.rules: list[dict] = []
+        self.version = ""
+        self.loaded_at = 0.0
+        self._stamp: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.reload()
+
+    def _current_stamp(self) -> dict[str, float]:
+        return {str(f): f.stat().st_mtime for f in _resolve_rule_files(self.paths)}
+
+    def reload(self) -> bool:
+        """Load the rules again; the previous set is kept if loading fails."""
+        stamp = None
+        try:
+            stamp = self._current_stamp()
+            rules = load_query_rules(self.paths)
+        except Exception as e:
+            logger.error(f"Rule reload failed, keeping previous rules: {e}")
+            if stamp is not None:
+                # Not retried until the files change again
+                self._stamp = stamp
+            return False
+        digest = hashlib.sha256(
+            repr(sorted(stamp.items())).encode("utf-8")
+        ).hexdigest()[:12]
+        with self._lock:
+            self.rules, self.version = rules, digest
+            self.loaded_at = time.time()
+            self._stamp = stamp
+        logger.info(f"Loaded {len(rules)} rule(s), version {digest}")
+        return True
+
+    def snapshot(self) -> tuple[list[dict], str]:
+        with self._lock:
+            return self.rules, self.version
+
+    def watch(self, stop: threading.Event) -> None:
+        while not stop.wait(self.poll_seconds):
+            try:
+                if self._current_stamp() != self._stamp:
+                    logger.info("Pattern files changed, reloading rules")
+                    self.reload()
+            except OSError as e:
+                logger.warning(f"Failed to check pattern files: {e}")
+
+
+class AnalysisService:
+    """Runs submitted jobs through `run_pipeline` on a shared warm pool."""
+
+    def __init__(
+        self,
+        rules: RuleSet,
+        workers: int,
+        max_jobs: int = 2,
+        work_dir: Optional[Path] = None,
+    ):
+        self.rules = rules
+        self.workers = workers
+        self.pool = self._start_pool()
+        self.runner = ThreadPoolExecutor(max_workers=max_jobs)
+        self.work_dir = Path(work_dir or tempfile.mkdtemp(prefix="ioc-extractor-"))
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        self.jobs: dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher = threading.Thread(
+            target=rules.watch, args=(self._stop,), daemon=True
+        )
+
+    def _start_pool(self) -> ProcessPoolExecutor:
+        pool = ProcessPoolExecutor(max_workers=self.workers)
+        # Start the worker processes now rather than on the first job
+        for _ in range(self.workers):
+            pool.submit(os.getpid)
+        return pool
+
+    @staticmethod
+    def _pool_alive(pool: ProcessPoolExecutor) -> bool:
+        """Whether `pool` still takes work; a worker dying breaks it for good."""
+        try:
+            pool.submit(os.getpid)
+        except BrokenProcessPool:
+            return False
+        return True
+
+    def _replace_pool(self, broken: ProcessPoolExecutor) -> None:
+        """Swap a broken pool for a new one (once, whichever job notices first)."""
+        with self._lock:
+            if self.pool is broken:
+                logger.warning("Worker pool broke, starting a new one")
+                self.pool = self._start_pool()
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def start(self) -> "AnalysisService":
+        self._watcher.start()
+        return self
+
+    def close(self) -> None:
+        self._stop.set()
+        self.runner.shutdown(wait=True, cancel_futures=True)
+        self.pool.shutdown(wait=True)
+
+    def submit(self, input_path: str, options: dict[str, Any], upload: bool) -> Job:
+        _, version = self.rules.snapshot()
+        job_id = uuid.uuid4().hex[:16]
+        job = Job(
+            id=job_id,
+            input=input_path,
+            options=options,
+            output=self.work_dir / f"{job_id}.json",
+            rules_version=version,
+            upload=upload,
+        )
+        with self._lock:
+            self.jobs[job_id] = job
+            self._forget_old_jobs()
+        self.runner.submit(self._run, job)
+        return job
+
+    def _run(self, job: Job) -> None:
+        pool = self.pool
+        try:
+            rules, job.rules_version = self.rules.snapshot()
+            job.status, job.started = "running", time.time()
+            options = parse_job_options(job.options)
+            counts, _ = run_pipeline(
+                inputs=[job.input],
+                chunk_sizes={job.input: options["chunk"]},
+                workers=self.workers,
+                rules=rules,
+                options=PipelineOptions(
+                    output_path=str(job.output),
+                    compact=options["compact"],
+                    ordered=options["ordered"],
+                    summarize=options["summarize"],
+                    show_matches=False,
+                ),
+                executor=pool,
+            )
+            # Chunks lost with a dead worker are only logged by run_pipeline
+            if not self._pool_alive(pool):
+                raise BrokenProcessPool("A worker process died during the job")
+            job.counts = dict(counts)
+            job.status = "done"
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {e}", exc_info=True)
+            job.error, job.status = str(e), "failed"
+            if isinstance(e, BrokenProcessPool) or not self._pool_alive(pool):
+                self._replace_pool(pool)
+        finally:
+            job.finished = time.time()
+            if job.upload:
+                Path(job.input).unlink(missing_ok=True)
+
+    def _forget_old_jobs(self) -> None:
+        finished = [j for j in self.jobs.values() if j.done]
+        for job in sorted(finished, key=lambda j: j.finished)[
+            : max(0, len(finished) - MAX_FINISHED_JOBS)
+        ]:
+            self.forget(job.id)
+
+    def forget(self, job_id: str) -> None:
+        job = self.jobs.pop(job_id, None)
+        if job:
+            job.output.unlink(missing_ok=True)
+
+    def stream_results(self, job: Job):
+        """Yield the output file as it grows, until the job has finished."""
+        while not job.output.exists() and not job.done:
+            time.sleep(STREAM_POLL_SECONDS)
+        if not job.output.exists():
+            return
+        with open(job.output, "rb") as f:
+            while True:
+                finished = job.done
+                block = f.read(1 << 16)
+                if block:
+                    yield block
+                elif finished:
+                    return
+                else:
+                    time.sleep(STREAM_POLL_SECONDS)
+
+
+def create_app(service: AnalysisService) -> Flask:
+    app = Flask(__name__)
+
+    def job_or_404(job_id: str):
+        job = service.jobs.get(job_id)
+        if job is None:
+            return None, (jsonify({"error": f"Unknown job: {job_id}"}), 404)
+        return job, None
+
+    @app.post("/jobs")
+    def submit_job():
+        upload = request.files.get("trace")
+        if upload is not None:
+            options = request.form.to_dict()
+        else:
+            options = request.get_json(silent=True) or {}
+            if not isinstance(options, dict):
+                return jsonify({"error": "Expected a JSON object"}), 400
+            path = options.pop("input", None)
+            if not path or not Path(path).is_file():
+                return jsonify({"error": f"Input file not found: {path}"}), 400
+        try:
+            options = parse_job_options(options)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if upload is not None:
+            fd, path = tempfile.mkstemp(suffix=".json", dir=service.work_dir)
+            with os.fdopen(fd, "wb") as f:
+                shutil.copyfileobj(upload.stream, f)
+        job = service.submit(path, options, upload=upload is not None)
+        return jsonify(job.to_dict()), 202
+
+    @app.get("/jobs")
+    def list_jobs():
+        return jsonify([job.to_dict() for job in list(service.jobs.values())])
+
+    @app.get("/jobs/<job_id>")
+    def job_status(job_id: str):
+        job, error = job_or_404(job_id)
+        return error or jsonify(job.to_dict())
+
+    @app.get("/jobs/<job_id>/results")
+    def job_results(job_id: str):
+        job, error = job_or_404(job_id)
+        if error:
+            return error
+        return Response(service.stream_results(job), mimetype="application/json")
+
+    @app.delete("/jobs/<job_id>")
+    def delete_job(job_id: str):
+        job, error = job_or_404(job_id)
+        if error:
+            return error
+        if not job.done:
+            return jsonify({"error": "Job is still running"}), 409
+        service.forget(job_id)
+        return "", 204
+
+    @app.get("/rules")
+    def rules_info():
+        rules, version = service.rules.snapshot()
+        return jsonify(
+            {
+                "version": version,
+                "count": len(rules),
+                "loaded_at": service.rules.loaded_at,
+                "paths": [str(p) for p in service.rules.paths],
+            }
+        )
+
+    @app.post("/rules/reload")
+    def reload_rules():
+        ok = service.rules.reload()
+        _, version = service.rules.snapshot()
+        return jsonify({"reloaded": ok, "version": version}), 200 if ok else 500
+
+    @app.get("/health")
+    def health():
+        return jsonify(
+            {
+                "status": "ok",
+                "workers": service.workers,
+                "jobs": sum(not j.done for j in list(service.jobs.values())),
+            }
+        )
+
+    return app
+
+
+def serve_analysis(
+    patterns: list[Path],
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    workers: Optional[int] = None,
+    max_jobs: int = 2,
+    work_dir: Optional[Path] = None,
+) -> None:
+    """Load rules, warm up the worker pool and serve the job API until stopped."""
+    service = AnalysisService(
+        RuleSet(patterns),
+        workers or os.cpu_count() or 1,
+        max_jobs=max_jobs,
+        work_dir=work_dir,
+    ).start()
+    logger.info(f"Serving analysis jobs on http://{host}:{port}")
+    try:
+        create_app(service).run(host=host, port=port, debug=False, threaded=True)
+    finally:
+        service.close()
@@ -0,0 +1,112 @@
+"""
+Checkpoints of `run_pipeline` (`analyze --checkpoint-every` / `--resume`).
+
+Results are written in input order while checkpointing, so everything before
+the first chunk that has not been written yet is final: a checkpoint records
+that chunk's sequence number together with the output size and match counts
+at that point. Resuming truncates the output back to that size, skips the
+chunks already written and appends the rest, giving one valid output file.
+
+The checkpoint lives next to the output (`<output>.ckpt`), is replaced
+atomically and removed once the run completes.
+"""
+
+import hashlib
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+from common.logger import get_logger
+
+logger = get_logger(__name__)
+
+CHECKPOINT_VERSION = 1
+
+
+def checkpoint_path(output_path: str) -> Path:
+    return Path(f"{output_path}.ckpt")
+
+
+def input_fingerprint(inputs: list[str]) -> list[list]:
+    """Identify inputs by path, size and modification time (hashing is too slow)."""
+    fingerprint = []
+    for path in inputs:
+        stat = os.stat(path)
+        fingerprint.append([str(path), stat.st_size, stat.st_mtime_ns])
+    return fingerprint
+
+
+def rules_digest(rules: list[dict]) -> str:
+    encoded = json.dumps(rules, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+@dataclass
+class Checkpoint:
+    inputs: list[list]
+    rules: str
+    # Options that change what is written: resuming with others is refused
+    settings: dict[str, Any]
+    # Every chunk before this sequence number is in the output
+    next_seq: int = 0
+    output: dict[str, Any] = field(default_factory=dict)
+    counts: dict[str, int] = field(default_factory=dict)
+    position: int = 0
+    version: int = CHECKPOINT_VERSION
+    saved_at: float = 0.0
+
+    def save(self, path: Path) -> None:
+        self.saved_at = time.time()
+        tmp = path.with_name(f".{path.name}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(asdict(self), f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    @staticmethod
+    def load(path: Path) -> "Checkpoint":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version in {path}")
+        return Checkpoint(**data)
+
+    def check_compatible(self, other: "Checkpoint") -> None:
+        """Raise ValueError unless `other` describes the same run."""
+        if self.inputs != other.inputs:
+            raise ValueError("Inputs changed since the checkpoint was written")
+        if self.rules != other.rules:
+            raise ValueError("Rules changed since the checkpoint was written")
+        if self.settings != other.settings:
+            raise ValueError(
+                f"Options differ from the checkpointed run: {self.settings}"
+            )
+
+
+class Checkpointer:
+    """Saves the pipeline state every `interval` seconds as results are written."""
+
+    def __init__(self, path: Path, base: Checkpoint, interval: float):
+        self.path = path
+        self.base = base
+        self.interval = interval
+        self.last = time.monotonic()
+
+    def update(self, next_seq: int, output, counts: dict[str, int], position: int):
+        if time.monotonic() - self.last < self.interval:
+            return
+        # Output first, so the checkpoint never points past durable data
+        self.base.output = output.checkpoint()
+        self.base.next_seq = next_seq
+        self.base.counts = dict(counts)
+        self.base.position = position
+        self.base.save(self.path)
+        self.last = time.monotonic()
+        logger.debug(f"Checkpoint saved at chunk {next_seq}")
+
+    def complete(self) -> None:
+        self.path.unlink(missing_ok=True)
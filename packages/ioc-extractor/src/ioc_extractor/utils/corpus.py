@@ -0,0 +1,227 @@
+"""
+Corpus batch mode (`analyze --corpus DIR`).
+
+Traces found under a directory are analyzed with rules loaded once and one
+process pool shared by all of them; a few traces run at a time so small ones
+do not leave workers idle. Each trace gets its own output file, mirroring its
+path below the corpus, in the output directory.
+
+Progress is tracked in `manifest.jsonl` in the output directory, one record
+per finished trace (the latest record of a trace wins). A rerun skips traces
+whose last record is done for the same trace size/mtime, rule digest and
+output settings (compact, triage), so an interrupted corpus continues where it
+stopped and traces whose output would differ are analyzed again. `corpus-summary.json` aggregates the whole manifest.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import (
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+)
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, Optional
+
+from common.logger import get_logger
+from ioc_extractor.utils.checkpoint import input_fingerprint, rules_digest
+from ioc_extractor.utils.pipeline_executor import PipelineOptions, run_pipeline
+
+logger = get_logger(__name__)
+
+MANIFEST_NAME = "manifest.jsonl"
+SUMMARY_NAME = "corpus-summary.json"
+
+
+def discover_traces(root: Path, exclude: Optional[Path] = None) -> list[Path]:
+    """Trace files below `root`, sorted, leaving out anything below `exclude`."""
+    exclude = exclude.resolve() if exclude else None
+    traces = []
+    for path in sorted(root.rglob("*.json")):
+        if not path.is_file():
+            continue
+        if exclude and path.resolve().is_relative_to(exclude):
+            continue
+        traces.append(path)
+    return traces
+
+
+class CorpusManifest:
+    """Append-only JSON lines record of every trace analyzed in a corpus."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.records: dict[str, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        if path.exists():
+            self._load()
+
+    def _load(self) -> None:
+        with open(self.path, encoding="utf-8") as f:
+            for number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A record cut short by a crash; that trace is simply redone
+                    logger.warning(f"Ignoring corrupt line {number} of {self.path}")
+                    continue
+                self.records[record["trace"]] = record
+
+    def is_current(
+        self, trace: str, fingerprint: list, rules: str, settings: dict[str, Any]
+    ) -> bool:
+        record = self.records.get(trace)
+        return bool(
+            record
+            and record["status"] == "done"
+            and record["fingerprint"] == fingerprint
+            and record["rules"] == rules
+            and record.get("settings") == settings
+        )
+
+    def record(self, record: dict[str, Any]) -> None:
+        with self._lock:
+            self.records[record["trace"]] = record
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def summary(self, traces: list[str]) -> dict[str, Any]:
+        """Aggregate the latest records of `traces` (those still in the corpus)."""
+        records = {t: self.records[t] for t in traces if t in self.records}
+        counts: dict[str, int] = defaultdict(int)
+        traces_per_rule: dict[str, int] = defaultdict(int)
+        status: dict[str, int] = defaultdict(int)
+        duration = 0.0
+        for record in records.values():
+            status[record["status"]] += 1
+            duration += record.get("duration") or 0.0
+            for rule, count in record.get("counts", {}).items():
+                counts[rule] += count
+                traces_per_rule[rule] += 1
+        return {
+            "traces": len(traces),
+            "pending": len(traces) - len(records),
+            "status": dict(status),
+            "matches": sum(counts.values()),
+            "counts": dict(sorted(counts.items(), key=lambda kv: -kv[1])),
+            "traces_per_rule": dict(
+                sorted(traces_per_rule.items(), key=lambda kv: -kv[1])
+            ),
+            "duration": duration,
+            "failed": sorted(t for t, r in records.items() if r["status"] == "failed"),
+        }
+
+
+def run_corpus(
+    root: Path,
+    output_dir: Path,
+    rules: list[dict],
+    workers: int,
+    chunk_size: int,
+    jobs: int = 2,
+    compact: bool = False,
+    ordered: bool = False,
+    executor: Optional[Executor] = None,
+    triage: bool = False,
+    triage_examples: int = 3,
+) -> dict[str, Any]:
+    """
+    Analyze every pending trace below `root` and return the corpus summary.
+    Chunks run on `executor` if given, else on a pool of `workers` processes.
+    With `triage`, each trace gets triage output (see `PipelineOptions`).
+    """
+    if output_dir.resolve() == root.resolve():
+        raise ValueError("The output directory must differ from the corpus")
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest = CorpusManifest(output_dir / MANIFEST_NAME)
+    digest = rules_digest(rules)
+    # Everything besides the rules that changes what a trace's output holds
+    settings = {"compact": compact, "triage": triage}
+    if triage:
+        settings["triage_examples"] = triage_examples
+
+    pending, names = [], []
+    traces = discover_traces(root, exclude=output_dir)
+    for trace in traces:
+        name = trace.relative_to(root).as_posix()
+        names.append(name)
+        fingerprint = [name, *input_fingerprint([str(trace)])[0][1:]]
+        if manifest.is_current(name, fingerprint, digest, settings):
+            continue
+        pending.append((trace, name, fingerprint))
+    logger.info(
+        f"Corpus: {len(traces)} trace(s), {len(traces) - len(pending)} up to date, "
+        f"{len(pending)} to analyze"
+    )
+
+    def analyze_trace(trace: Path, name: str, fingerprint: list) -> dict[str, Any]:
+        output = output_dir / name
+        output.parent.mkdir(parents=True, exist_ok=True)
+        record = {
+            "trace": name,
+            "fingerprint": fingerprint,
+            "rules": digest,
+            "settings": settings,
+            "output": str(output.relative_to(output_dir)),
+        }
+        started = time.time()
+        try:
+            counts, _ = run_pipeline(
+                inputs=[str(trace)],
+                chunk_sizes={str(trace): chunk_size},
+                workers=workers,
+                rules=rules,
+                options=PipelineOptions(
+                    output_path=str(output),
+                    compact=compact,
+                    ordered=ordered,
+                    show_matches=False,
+                    strict=True,
+                    triage=triage,
+                    triage_examples=triage_examples,
+                ),
+                executor=pool,
+            )
+            record.update(status="done", counts=dict(counts))
+        except Exception as e:
+            logger.error(f"Failed to analyze {name}: {e}")
+            record.update(status="failed", error=str(e))
+        record.update(
+            duration=time.time() - started,
+            matches=sum(record.get("counts", {}).values()),
+            finished=time.time(),
+        )
+        manifest.record(record)
+        return record
+
+    with (
+        (
+            nullcontext(executor)
+            if executor is not None
+            else ProcessPoolExecutor(max_workers=workers)
+        ) as pool,
+        ThreadPoolExecutor(max_workers=max(1, jobs)) as runner,
+    ):
+        futures = [runner.submit(analyze_trace, *item) for item in pending]
+        for done, future in enumerate(as_completed(futures), 1):
+            record = future.result()
+            logger.info(
+                f"[{done}/{len(pending)}] {record['trace']}: {record['status']}, "
+                f"{record['matches']} match(es) in {record['duration']:.1f}s"
+            )
+
+    summary = manifest.summary(names)
+    (output_dir / SUMMARY_NAME).write_text(
+        json.dumps(summary, indent=2), encoding="utf-8"
+    )
+    return summary
@@ -0,0 +1,297 @@
+"""
+Distributed analysis over TCP (`ioc-extractor worker` and `analyze -w HOST:PORT`).
+
+`ioc-extractor worker` listens for a coordinator and evaluates chunks on a
+local process pool. The coordinator (`analyze` with one `-w` per worker)
+wraps the connections in `RemoteExecutor`, a `concurrent.futures.Executor`
+handed to `run_pipeline`: inputs are still parsed, ordered and written by the
+coordinator, so results and output format are exactly those of a local run.
+
+The protocol is `multiprocessing.connection` (length-prefixed pickles,
+authenticated with a shared key by HMAC challenge):
+
+    worker -> coordinator   ("hello", processes)
+    coordinator -> worker   ("rules", rules)              once per connection
+    coordinator -> worker   ("task", task_id, fn, batch, source_file, options)
+    worker -> coordinator   ("result", task_id, result) | ("error", task_id, msg)
+    worker -> coordinator   ("ping", None, None)          every HEARTBEAT_INTERVAL
+
+Chunks in flight on a worker whose connection drops, or that sends nothing
+for HEARTBEAT_TIMEOUT seconds (hung or cut off), are reassigned to the
+remaining workers. A chunk failing on a worker is retried on the others; once
+it has failed on every worker left, its future fails and so does the run. Traffic is not encrypted and pickles are trusted once the
+key is verified: only run workers on networks you trust, with a secret key.
+"""
+
+import itertools
+import os
+import threading
+from concurrent.futures import Executor, Future
+from dataclasses import dataclass, field
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Callable, Optional
+
+from common.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_PORT = 8766
+# Seconds between heartbeats of a worker, and of silence before it is lost
+HEARTBEAT_INTERVAL = 5.0
+HEARTBEAT_TIMEOUT = 30.0
+
+
+def parse_address(address: str) -> tuple[str, int]:
+    """Split `HOST:PORT` (the port defaults to DEFAULT_PORT)."""
+    host, sep, port = address.rpartition(":")
+    if not sep:
+        return address, DEFAULT_PORT
+    return host.strip("[]"), int(port)
+
+
+def task_functions() -> tuple[Callable, ...]:
+    """Functions a coordinator may run on a worker."""
+    from ioc_extractor.utils.pipeline_executor import timed_worker_task, worker_task
+
+    return (worker_task, timed_worker_task)
+
+
+def _serve_coordinator(
+    conn: Connection,
+    pool: Executor,
+    processes: int,
+    heartbeat_interval: float = HEARTBEAT_INTERVAL,
+):
+    allowed = task_functions()
+    send_lock = threading.Lock()
+    running: set[Future] = set()
+    rules: Optional[list[dict]] = None
+    stop = threading.Event()
+
+    def send(message: tuple) -> None:
+        try:
+            with send_lock:
+                conn.send(message)
+        except OSError:
+            pass  # coordinator gone, the receive loop notices
+
+    def reply(task_id: int, future: Future) -> None:
+        running.discard(future)
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            send(("error", task_id, f"{type(error).__name__}: {error}"))
+        else:
+            send(("result", task_id, future.result()))
+
+    def heartbeat() -> None:
+        # Sent even while chunks run, so the coordinator can tell slow from hung
+        while not stop.wait(heartbeat_interval):
+            send(("ping", None, None))
+
+    send(("hello", processes))
+    threading.Thread(target=heartbeat, daemon=True).start()
+    try:
+        while True:
+            message = conn.recv()
+            if message[0] == "rules":
+                rules = message[1]
+                logger.info(f"Received {len(rules)} rule(s) from coordinator")
+            elif message[0] == "task":
+                _, task_id, fn, batch, source_file, options = message
+                if fn not in allowed or rules is None:
+                    send(("error", task_id, "Unexpected task"))
+                    continue
+                future = pool.submit(fn, batch, rules, source_file, options)
+                running.add(future)
+                future.add_done_callback(lambda f, task_id=task_id: reply(task_id, f))
+    except (EOFError, OSError):
+        logger.info("Coordinator disconnected")
+    finally:
+        stop.set()
+        for future in list(running):
+            future.cancel()
+        conn.close()
+
+
+def serve_worker(
+    host: str, port: int, authkey: bytes, processes: Optional[int] = None
+) -> None:
+    """Evaluate chunks for coordinators connecting to `host:port` until stopped."""
+    from concurrent.futures import ProcessPoolExecutor
+
+    processes = processes or os.cpu_count() or 1
+    with (
+        ProcessPoolExecutor(max_workers=processes) as pool,
+        Listener((host, port), authkey=authkey) as listener,
+    ):
+        # Start the worker processes now rather than on the first chunk
+        for _ in range(processes):
+            pool.submit(os.getpid)
+        logger.info(f"Worker listening on {host}:{port} with {processes} process(es)")
+        while True:
+            try:
+                conn = listener.accept()
+            except (AuthenticationError, EOFError, OSError) as e:
+                logger.warning(f"Rejected connection: {e}")
+                continue
+            logger.info(f"Coordinator connected from {listener.last_accepted}")
+            threading.Thread(
+                target=_serve_coordinator,
+                args=(conn, pool, processes),
+                daemon=True,
+            ).start()
+
+
+@dataclass
+class _RemoteTask:
+    id: int
+    fn: Callable
+    args: tuple
+    future: Future = field(default_factory=Future)
+    # Workers the task failed on, and the last error it failed with
+    failed_on: set[tuple[str, int]] = field(default_factory=set)
+    error: str = ""
+
+
+@dataclass
+class _RemoteWorker:
+    address: tuple[str, int]
+    conn: Connection
+    capacity: int
+    inflight: dict[int, _RemoteTask] = field(default_factory=dict)
+    alive: bool = True
+    send_lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+class RemoteExecutor(Executor):
+    """
+    Executor running `run_pipeline` tasks on remote workers. Tasks are
+    submitted as `submit(fn, batch, rules, source_file, options)` with the
+    `rules` given here, which are sent to each worker once. A worker silent
+    for `heartbeat_timeout` seconds is dropped like a disconnected one.
+    """
+
+    def __init__(
+        self,
+        addresses: list[tuple[str, int]],
+        rules: list[dict],
+        authkey: bytes,
+        heartbeat_timeout: float = HEARTBEAT_TIMEOUT,
+    ):
+        self.rules = rules
+        self.heartbeat_timeout = heartbeat_timeout
+        self.workers: list[_RemoteWorker] = []
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        for address in addresses:
+            try:
+                conn = Client(address, authkey=authkey)
+                kind, capacity = conn.recv()
+                if kind != "hello":
+                    raise OSError(f"unexpected handshake {kind!r}")
+                conn.send(("rules", rules))
+            except (AuthenticationError, EOFError, OSError) as e:
+                logger.error(f"Cannot connect to worker {address}: {e}")
+                continue
+            worker = _RemoteWorker(address, conn, capacity)
+            self.workers.append(worker)
+            threading.Thread(target=self._receive, args=(worker,), daemon=True).start()
+            logger.info(f"Connected to worker {address} ({capacity} process(es))")
+        if not self.workers:
+            raise ConnectionError("No remote workers available")
+
+    @property
+    def capacity(self) -> int:
+        return sum(w.capacity for w in self.workers if w.alive)
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        batch, rules, source_file, options = args
+        if rules is not self.rules:
+            raise ValueError("RemoteExecutor only runs tasks with its own rules")
+        task = _RemoteTask(next(self._ids), fn, (batch, source_file, options))
+        task.future.set_running_or_notify_cancel()
+        self._dispatch(task)
+        return task.future
+
+    def _dispatch(self, task: _RemoteTask) -> None:
+        with self._lock:
+            alive = [w for w in self.workers if w.alive]
+            if not alive:
+                task.future.set_exception(RuntimeError("All remote workers were lost"))
+                return
+            untried = [w for w in alive if w.address not in task.failed_on]
+            if not untried:
+                task.future.set_exception(
+                    RuntimeError(
+                        f"Chunk failed on {len(task.failed_on)} worker(s): {task.error}"
+                    )
+                )
+                return
+            worker = min(untried, key=lambda w: len(w.inflight) / w.capacity)
+            worker.inflight[task.id] = task
+        try:
+            with worker.send_lock:
+                worker.conn.send(("task", task.id, task.fn, *task.args))
+        except OSError:
+            # Reassigns this task, with the others in flight there, elsewhere
+            self._lost(worker)
+
+    def _receive(self, worker: _RemoteWorker) -> None:
+        try:
+            while True:
+                if not worker.conn.poll(self.heartbeat_timeout):
+                    raise TimeoutError(
+                        f"no heartbeat for {self.heartbeat_timeout:.0f}s"
+                    )
+                kind, task_id, value = worker.conn.recv()
+                if kind == "ping":
+                    continue
+                with self._lock:
+                    task = worker.inflight.pop(task_id, None)
+                if task is None:
+                    continue
+                if kind == "result":
+                    task.future.set_result(value)
+                else:
+                    task.failed_on.add(worker.address)
+                    task.error = f"{worker.address}: {value}"
+                    logger.warning(f"Chunk failed on worker {task.error}")
+                    self._dispatch(task)
+        except (EOFError, OSError) as e:
+            self._lost(worker, e)
+
+    def _lost(self, worker: _RemoteWorker, reason: Exception | None = None) -> None:
+        with self._lock:
+            if not worker.alive:
+                return
+            worker.alive = False
+            tasks = list(worker.inflight.values())
+            worker.inflight.clear()
+        logger.warning(
+            f"Lost worker {worker.address}{f' ({reason})' if reason else ''}, "
+            f"reassigning {len(tasks)} chunk(s)"
+        )
+        worker.conn.close()
+        for task in tasks:
+            self._dispatch(task)
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        """Disconnect from the workers, failing any task still in flight."""
+        for worker in self.workers:
+            with self._lock:
+                worker.alive = False
+                tasks = list(worker.inflight.values())
+                worker.inflight.clear()
+            worker.conn.close()
+            for task in tasks:
+                task.future.set_exception(RuntimeError("Executor shut down"))
+
+
+def connect_workers(
+    addresses: list[str], rules: list[dict], authkey: bytes
+) -> RemoteExecutor:
+    """A `RemoteExecutor` over the workers at `addresses` (`HOST:PORT` each)."""
+    return RemoteExecutor([parse_address(a) for a in addresses], rules, authkey)
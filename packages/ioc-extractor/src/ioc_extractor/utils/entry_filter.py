@@ -0,0 +1,105 @@
+"""
+Entry filters of `analyze` (`--pid`, `--module`, `--api-regex`, `--id-range`).
+
+Filters are applied by the reader, before entries reach the workers: through
+the sidecar index when the input has one, otherwise on the raw bytes of each
+entry first (`may_contain`), parsing only the entries that may pass.
+"""
+
+import re
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Any, Optional
+
+# Index rows with a non-integer entry id (see `TraceIndex`)
+NO_ID = -(2**63)
+# Module names JSON writes verbatim, so they can be searched for in raw bytes
+_RAW_SAFE = re.compile(r"[A-Za-z0-9_.\- ]+")
+
+
+def parse_id_range(text: str) -> tuple[Optional[int], Optional[int]]:
+    """Parse `START:END` (inclusive, either side optional) into bounds."""
+    start, sep, end = text.partition(":")
+    if not sep:
+        raise ValueError(f"Expected START:END, got '{text}'")
+    return (int(start) if start else None, int(end) if end else None)
+
+
+@dataclass(frozen=True)
+class EntryFilter:
+    pids: frozenset[str] = frozenset()
+    # Lowercase: module names are compared case-insensitively
+    modules: frozenset[str] = frozenset()
+    api_regex: Optional[re.Pattern] = None
+    id_range: Optional[tuple[Optional[int], Optional[int]]] = None
+
+    @staticmethod
+    def from_options(
+        pids: Optional[list[int]] = None,
+        modules: Optional[list[str]] = None,
+        api_regex: Optional[str] = None,
+        id_range: Optional[str] = None,
+    ) -> Optional["EntryFilter"]:
+        """Build the filter of the CLI options, or None if none is set."""
+        if not (pids or modules or api_regex or id_range):
+            return None
+        return EntryFilter(
+            pids=frozenset(str(pid) for pid in pids or ()),
+            modules=frozenset(m.lower() for m in modules or ()),
+            api_regex=re.compile(api_regex) if api_regex else None,
+            id_range=parse_id_range(id_range) if id_range else None,
+        )
+
+    def describe(self) -> dict[str, Any]:
+        return {
+            "pids": sorted(self.pids),
+            "modules": sorted(self.modules),
+            "api_regex": self.api_regex.pattern if self.api_regex else None,
+            "id_range": list(self.id_range) if self.id_range else None,
+        }
+
+    def in_id_range(self, entry_id: Any) -> bool:
+        if self.id_range is None:
+            return True
+        if not isinstance(entry_id, int):
+            return False
+        start, end = self.id_range
+        return (start is None or entry_id >= start) and (end is None or entry_id <= end)
+
+    def matches(self, entry: dict[str, Any], partial: bool = False) -> bool:
+        """
+        Whether an entry passes. With `partial`, `entry` holds only the indexed
+        fields and a missing `id` is left to be checked once parsed.
+        """
+        if self.pids:
+            metadata = entry.get("metadata")
+            pid = metadata.get("pid") if isinstance(metadata, dict) else None
+            if str(pid) not in self.pids:
+                return False
+        if self.modules:
+            module = entry.get("module")
+            if not isinstance(module, str) or module.lower() not in self.modules:
+                return False
+        if self.api_regex is not None:
+            api = entry.get("api")
+            if not isinstance(api, str) or not self.api_regex.search(api):
+                return False
+        if partial and "id" not in entry:
+            return True
+        return self.in_id_range(entry.get("id"))
+
+    @cached_property
+    def _raw_modules(self) -> list[bytes]:
+        if all(_RAW_SAFE.fullmatch(module) for module in self.modules):
+            return [module.encode("ascii") for module in self.modules]
+        return []
+
+    def may_contain(self, raw: bytes) -> bool:
+        """Cheap necessary condition on an entry's raw JSON bytes."""
+        if self.pids and not any(pid.encode() in raw for pid in self.pids):
+            return False
+        if self._raw_modules:
+            lowered = raw.lower()
+            if not any(module in lowered for module in self._raw_modules):
+                return False
+        return True
@@ -1,3 +1,7 @@
+import logging
+import threading
+import time
+from queue import Full, Queue
 from typing import Any
 
 from common.logger import get_logger
@@ -21,6 +25,16 @@ def build_rule_name(meta: dict, variant: str | None) -> str:
     return f"{rule_base}::{variant}"
 
 
+def match_preview(rule: dict, match: dict[str, Any]) -> tuple:
+    """Reduce a rule and its match to the positional arguments of `print_match`."""
+    return (
+        build_rule_name(rule["meta"], rule["variant"].get("name")),
+        match.get("api", "?"),
+        match.get("sources", {}).get("input", "?"),
+        match.get("attributes", {}),
+    )
+
+
 def print_match(
     match_type: str,
     api: str,
@@ -48,3 +62,60 @@ def print_match(
         logger.info("\n".join(lines))
     except Exception as e:
         logger.error(f"Failed to print match (type={match_type}): {e}", exc_info=True)
+
+
+class MatchConsole:
+    """
+    Renders match previews on a background thread, at most `max_rate` per second.
+
+    Previews that arrive while the console is saturated are dropped and reported
+    as a single summary line, so console output never slows down the pipeline.
+    """
+
+    def __init__(self, max_rate: float = 20.0, backlog: int = 256):
+        self.max_rate = max_rate
+        self.queue: Queue = Queue(maxsize=backlog)
+        self.suppressed = 0
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._render, daemon=True)
+
+    @staticmethod
+    def enabled() -> bool:
+        return logger.isEnabledFor(logging.INFO)
+
+    def start(self) -> "MatchConsole":
+        self._thread.start()
+        return self
+
+    def submit(self, previews: list[tuple], total: int) -> None:
+        """Queue previews for rendering; `total` includes matches not previewed."""
+        shown = 0
+        for preview in previews:
+            try:
+                self.queue.put_nowait(preview)
+                shown += 1
+            except Full:
+                break
+        with self._lock:
+            self.suppressed += total - shown
+
+    def close(self) -> None:
+        self.queue.put(None)
+        self._thread.join()
+        self._report_suppressed()
+
+    def _render(self) -> None:
+        interval = 1.0 / self.max_rate if self.max_rate > 0 else 0.0
+        last_report = time.monotonic()
+        while (preview := self.queue.get()) is not None:
+            print_match(*preview)
+            if time.monotonic() - last_report >= 5.0:
+                self._report_suppressed()
+                last_report = time.monotonic()
+            time.sleep(interval)
+
+    def _report_suppressed(self) -> None:
+        with self._lock:
+            count, self.suppressed = self.suppressed, 0
+        if count:
+            logger.info(f"[dim]{count} match(es) not shown on console[/dim]")
@@ -5,6 +5,7 @@ from pathlib import Path
 
 import networkx as nx
 from flask import Flask, jsonify, render_template
+from ioc_extractor.output.reader import load_results
 
 # Initialize Flask app with custom template and static folder paths
 app = Flask(
@@ -50,9 +51,11 @@ def safe_set_count(graph: nx.DiGraph):
             graph.nodes[node]["count"] = graph.out_degree(node)
 
 
-def load_graph(input_file: str):
+def load_graph(input_file: str, run: int | None = None):
     """
-    Build a hierarchical graph from a JSON file.
+    Build a hierarchical graph from a JSON file (full or compact format, with
+    individual matches or `--summarize` records carrying a `count`) or from
+    `run` of a result store.
 
     Nodes:
     - root
@@ -66,8 +69,7 @@ def load_graph(input_file: str):
     root → category → rule_group → rule_variant? → api → api_detail
     """
     global G
-    with open(input_file) as f:
-        events = json.load(f)
+    events = load_results(input_file, run)
 
     G = nx.DiGraph()
     G.add_node("root", label="Root", type="root")
@@ -93,8 +95,8 @@ def load_graph(input_file: str):
             f"api::{category_name}::{rule_name}::{variant_name or 'direct'}::{api_name}"
         )
 
-        # Register API call attributes for grouping later
-        api_instance_map[api_id].append(ev.get("attributes", {}))
+        # Register API call attributes (and summarized hit counts) for grouping
+        api_instance_map[api_id].append((ev.get("attributes", {}), ev.get("count", 1)))
 
         # Create hierarchy: root → category → rule → (variant) → api
         if not G.has_node(cat_id):
@@ -138,21 +140,24 @@ def load_graph(input_file: str):
 
     # Add api_detail nodes grouped by identical attributes
     for api_id, calls in api_instance_map.items():
-        grouped = defaultdict(list)
-        for call in calls:
+        grouped = {}
+        for call, count in calls:
             key = json.dumps(call, sort_keys=True)
             hash_key = hashlib.md5(key.encode()).hexdigest()
-            grouped[hash_key].append(call)
+            if hash_key in grouped:
+                grouped[hash_key][1] += count
+            else:
+                grouped[hash_key] = [call, count]
 
-        for hash_key, group in grouped.items():
+        for hash_key, (call, count) in grouped.items():
             detail_id = f"detail::{api_id}::{hash_key}"
             label = "Call"
             G.add_node(
                 detail_id,
                 label=label,
                 type="api_detail",
-                arguments=group[0],  # representative example
-                count=len(group),
+                arguments=call,  # representative example
+                count=count,
             )
             G.add_edge(api_id, detail_id)
 
@@ -160,9 +165,9 @@ def load_graph(input_file: str):
     safe_set_count(G)
 
 
-def serve_graph(input_file: str):
+def serve_graph(input_file: str, run: int | None = None):
     """
     Load the graph from file and start the Flask server.
     """
-    load_graph(input_file)
+    load_graph(input_file, run)
     app.run(host="0.0.0.0", port=8080, debug=False)
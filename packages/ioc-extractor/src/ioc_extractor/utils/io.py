@@ -1,17 +1,110 @@
 import hashlib
+import json
+import mmap
+import os
+import re
+import time
+from collections.abc import Iterator
+from decimal import Decimal
+from typing import Callable, Optional
 
 import ijson
 
+# Strings (with escapes) or brackets: enough to find top-level entry bounds
+_TOKEN = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"|[\[\]{}]', re.S)
 
-def read_json_chunks(path, chunk_size):
+
+def read_json_chunks(path, chunk_size, on_read: Optional[Callable[[int], None]] = None):
+    """
+    Yield lists of up to `chunk_size` items of the JSON array in `path`. If
+    given, `on_read` is called before each chunk with the bytes consumed so far.
+    """
     with open(path, encoding="latin-1") as f:
         parser = ijson.items(f, "item")
         chunk = []
         for item in parser:
             chunk.append(item)
             if len(chunk) >= chunk_size:
+                if on_read:
+                    on_read(f.buffer.tell())
                 yield chunk
                 chunk = []
+        if on_read:
+            on_read(f.buffer.tell())
+        if chunk:
+            yield chunk
+
+
+def scan_entries(data) -> Iterator[tuple[int, int]]:
+    """Yield (offset, length) of each object in the top-level JSON array."""
+    depth = 0
+    start = 0
+    for match in _TOKEN.finditer(data):
+        token = match.group()[0]
+        if token in b"[{":
+            depth += 1
+            if depth == 2:
+                start = match.start()
+        elif token in b"]}":
+            depth -= 1
+            if depth == 1:
+                yield start, match.end() - start
+
+
+def load_entry(raw: bytes) -> dict:
+    """Parse one entry's bytes with the types and decoding of `read_json_chunks`."""
+    return json.loads(raw.decode("latin-1"), parse_float=Decimal)
+
+
+def json_default(value):
+    """`json.dumps` default writing back the Decimal numbers entries are read with."""
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def read_filtered_chunks(
+    path,
+    chunk_size,
+    keep_raw: Callable[[bytes], bool],
+    keep: Callable[[dict], bool],
+    on_read: Optional[Callable[[int], None]] = None,
+):
+    """
+    Like `read_json_chunks`, yielding only entries that pass `keep`. Entry
+    bounds are found by scanning the raw bytes, and entries whose bytes fail
+    `keep_raw` (a cheap necessary condition) are skipped without parsing.
+    """
+    if os.path.getsize(path) == 0:
+        return
+    with (
+        open(path, "rb") as f,
+        mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data,
+    ):
+        chunk = []
+        for offset, length in scan_entries(data):
+            raw = data[offset : offset + length]
+            if not keep_raw(raw):
+                continue
+            entry = load_entry(raw)
+            if not keep(entry):
+                continue
+            chunk.append(entry)
+            if len(chunk) >= chunk_size:
+                if on_read:
+                    on_read(offset + length)
+                yield chunk
+                chunk = []
+        if on_read:
+            on_read(len(data))
+        if chunk:
+            yield chunk
+
+
+def filter_chunks(chunks, keep: Callable[[dict], bool]):
+    """Drop entries failing `keep` from `chunks`, and chunks left empty."""
+    for chunk in chunks:
+        chunk = [entry for entry in chunk if keep(entry)]
         if chunk:
             yield chunk
 
@@ -22,3 +115,80 @@ def file_sha256(path: str) -> str:
         while chunk := f.read(8192):
             hasher.update(chunk)
     return hasher.hexdigest()
+
+
+def _follow_entries(
+    path, poll_interval: float, idle_timeout: Optional[float]
+) -> Iterator[Optional[dict]]:
+    """
+    Yield entries of a JSON array or NDJSON file as they are appended, and None
+    whenever no complete entry is available yet. Stops when the array is closed
+    or nothing was appended for `idle_timeout` seconds.
+    """
+    # Floats as Decimal, like read_json_chunks and load_entry
+    decoder = json.JSONDecoder(parse_float=Decimal)
+    buffer = ""
+    pos = 0
+    in_array = None
+    last_data = time.monotonic()
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(1 << 16)
+            if data:
+                last_data = time.monotonic()
+                # Same decoding as read_json_chunks; keeps partial reads valid
+                buffer = buffer[pos:] + data.decode("latin-1")
+                pos = 0
+            while True:
+                while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                    pos += 1
+                if pos == len(buffer):
+                    break
+                if in_array is None:
+                    in_array = buffer[pos] == "["
+                    if in_array:
+                        pos += 1
+                    continue
+                if in_array and buffer[pos] == "]":
+                    return
+                try:
+                    entry, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    # Incomplete entry: wait for the writer to append the rest
+                    break
+                pos = end
+                yield entry
+            if not data:
+                if idle_timeout and time.monotonic() - last_data > idle_timeout:
+                    return
+                yield None
+                time.sleep(poll_interval)
+
+
+def follow_json_chunks(
+    path,
+    chunk_size,
+    flush_interval: float = 1.0,
+    poll_interval: float = 0.2,
+    idle_timeout: Optional[float] = None,
+):
+    """
+    Like `read_json_chunks` for a file that is still being written: a chunk is
+    yielded once full, or as soon as entries have waited `flush_interval`
+    seconds, so detections on slowly growing traces are not held back.
+    """
+    chunk = []
+    first = 0.0
+    for entry in _follow_entries(path, poll_interval, idle_timeout):
+        if entry is not None:
+            if not chunk:
+                first = time.monotonic()
+            chunk.append(entry)
+        if chunk and (
+            len(chunk) >= chunk_size
+            or (entry is None and time.monotonic() - first >= flush_interval)
+        ):
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
@@ -1,20 +1,88 @@
 import json
+import math
+import os
+import pickle
 import time
 from collections import defaultdict
-from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
-from queue import Queue
+from concurrent.futures import FIRST_COMPLETED, Executor, ProcessPoolExecutor, wait
+from contextlib import nullcontext
+from dataclasses import dataclass, field, replace
+from itertools import chain, islice
+from pathlib import Path
+from queue import Empty, Queue
 from threading import Thread
-from typing import Any
+from typing import Any, Callable
 
 import ijson
 import psutil
 from common.logger import get_logger
-from ioc_extractor.engine.executor import execute_rule
-from ioc_extractor.utils.formatter import print_match
-from ioc_extractor.utils.io import file_sha256, read_json_chunks
+from ioc_extractor.engine.batch import BatchPlan
+from ioc_extractor.engine.executor import (
+    build_rule_header,
+    execute_rule,
+    expand_match,
+    triage_rule,
+)
+from ioc_extractor.engine.memo import MISS, with_source, worker_memo
+from ioc_extractor.engine.profiler import (
+    DEFAULT_SAMPLE_EVERY,
+    RuleProfiler,
+    log_profile_report,
+    write_profile_report,
+)
+from ioc_extractor.engine.sequence import (
+    SequenceTracker,
+    StepEvent,
+    build_sequence_match,
+    evaluate_steps,
+    split_rules,
+)
+from ioc_extractor.output.handler import (
+    MATCH_SEPARATOR,
+    OutputHandler,
+    encode_matches,
+    get_output_handler,
+)
+from ioc_extractor.output.store import is_store
+from ioc_extractor.utils.checkpoint import (
+    Checkpoint,
+    Checkpointer,
+    checkpoint_path,
+    input_fingerprint,
+    rules_digest,
+)
+from ioc_extractor.utils.entry_filter import EntryFilter
+from ioc_extractor.utils.formatter import MatchConsole, match_preview
+from ioc_extractor.utils.io import (
+    file_sha256,
+    filter_chunks,
+    follow_json_chunks,
+    read_filtered_chunks,
+    read_json_chunks,
+)
+from ioc_extractor.utils.pipeline_stats import PipelineStats
+from ioc_extractor.utils.process_profiler import (
+    ProcessProfiler,
+    merge_profiles,
+    start_worker_profiler,
+)
+from ioc_extractor.utils.progress import PipelineProgress
+from ioc_extractor.utils.resource_monitor import record_entries
+from ioc_extractor.utils.summary import Partial, SummaryAggregator, summarize_chunk
+from ioc_extractor.utils.trace_index import (
+    has_current_index,
+    load_current_index,
+    rule_filter,
+)
+from ioc_extractor.utils.triage import TriageAggregator
 
 logger = get_logger(__name__)
 
+# Matches per chunk sent back for console rendering; the rest are only counted
+CONSOLE_PREVIEWS_PER_CHUNK = 5
+# Fewer rules per shard than this are not worth evaluating a chunk again for
+MIN_RULES_PER_SHARD = 16
+
 
 def compute_chunk_size(
     path: str,
@@ -62,75 +130,648 @@ def sample_entries(path: str, count: int = 50) -> list[dict[str, Any]]:
     return batch
 
 
+@dataclass(frozen=True)
+class WorkerOptions:
+    """Per-run settings shipped to workers alongside every chunk."""
+
+    preview_limit: int = 0
+    compact: bool = False
+    summarize: bool = False
+    max_examples: int = 3
+    # Profile one in every N rule evaluations; 0 disables rule profiling
+    profile_every: int = 0
+    # Report compute and format timings with the result (`--stage-stats`)
+    timings: bool = False
+    # (index, count): evaluate only this contiguous slice of the rules
+    shard: tuple[int, int] | None = None
+    # Pre-filter rules per chunk on scalar fields (`engine.batch`)
+    batch: bool = False
+    # Entries whose matches each worker keeps (`engine.memo`); 0 disables it
+    memo_size: int = 0
+    # Identifies the rules, so workers know when cached matches are stale
+    rules_digest: str = ""
+    # Evaluate `where` clauses only, reporting counts and example ids
+    triage: bool = False
+
+
+@dataclass(frozen=True)
+class PipelineOptions:
+    """
+    Settings of a `run_pipeline` run.
+    With `compact`, rule headers are written once and matches reference them.
+    With `ordered`, results are written in input order; at most `reorder_window`
+    chunks (default: 4 per worker) are in flight or waiting to be written.
+    With `summarize`, one record per distinct (rule, api, attributes) is written
+    with its count and a few examples; aggregation spills to disk beyond
+    `summary_budget_mb`.
+    With `profile_rules`, workers profile rule evaluation (sampling one in every
+    `profile_every` evaluations); the merged report is logged and written there.
+    With `stage_stats`, per-stage timings are logged at the end and, with
+    `stage_stats_file`, appended as JSON lines every `stage_stats_interval` seconds.
+    With `profile_dir`, the parent and every worker run cProfile (and tracemalloc
+    with `trace_malloc`), writing their profiles there to be merged at the end.
+    Workers write their profile when they exit, so this needs the pool started
+    by `run_pipeline`: it cannot be combined with an executor.
+    With `progress`, throughput and ETA are printed periodically; with
+    `metrics_file`, counters and gauges are exported there in OpenMetrics format.
+    `show_matches` set to False keeps matches off the console.
+    With `follow`, inputs still being written are tailed until their array is
+    closed (or nothing is appended for `follow_timeout` seconds); partial chunks
+    are processed after `flush_interval` seconds and output is flushed per chunk.
+    With `checkpoint_every`, results are written in input order and progress is
+    checkpointed next to the output at that interval (seconds); `resume`
+    continues from that checkpoint, appending to the same output.
+    With `strict`, an input that cannot be read or a chunk whose task fails
+    fails the run instead of being logged and cut short or left out; with
+    checkpoints, failed chunks always fail the run, never to be marked done.
+    With `rule_shards` above 1, every chunk is evaluated by that many tasks,
+    each applying a contiguous slice of the rules, and their matches are
+    merged keeping first-match precedence. Unless `use_index` is False,
+    inputs with a current sidecar index (`ioc-extractor index`) only have the
+    entries some rule may match read and evaluated. Entries failing
+    `entry_filter` are dropped by the reader and never reach the workers.
+    With `batch`, workers rule out rules per chunk from scalar fields first
+    (see `engine.batch`). With `memo_size`, each worker caches the matches of
+    up to that many distinct entries and reuses them for repeated calls (see
+    `engine.memo`); the hit rate is logged at the end. With `triage`, only
+    `where` clauses are evaluated and one record per rule is written with its
+    hit count and the ids of its first `triage_examples` hits per input; chunks
+    are then collected in input order so those examples do not depend on which
+    worker finishes first.
+    An `output_path` named `*.db`/`*.sqlite` appends the run to a result store
+    (see `output.store`).
+    """
+
+    output_path: str | None = None
+    compact: bool = False
+    ordered: bool = False
+    reorder_window: int | None = None
+    summarize: bool = False
+    summary_budget_mb: int = 256
+    profile_rules: str | None = None
+    profile_every: int = DEFAULT_SAMPLE_EVERY
+    stage_stats: bool = False
+    stage_stats_file: str | None = None
+    stage_stats_interval: float = 5.0
+    profile_dir: str | None = None
+    trace_malloc: bool = False
+    progress: bool = False
+    metrics_file: str | None = None
+    show_matches: bool = True
+    follow: bool = False
+    follow_timeout: float | None = None
+    flush_interval: float = 1.0
+    checkpoint_every: float | None = None
+    resume: bool = False
+    strict: bool = False
+    rule_shards: int = 1
+    use_index: bool = True
+    entry_filter: EntryFilter | None = None
+    batch: bool = False
+    memo_size: int = 0
+    triage: bool = False
+    triage_examples: int = 3
+
+
+@dataclass
+class ChunkResult:
+    """Outcome of a worker task, shaped to keep the parent's per-match work minimal."""
+
+    counts: dict[str, int] = field(default_factory=dict)
+    payload: bytes = b""
+    matches: int = 0
+    previews: list[tuple] = field(default_factory=list)
+    summary: Partial | None = None
+    source_file: str = ""
+    entries: int = 0
+    events: list[StepEvent] = field(default_factory=list)
+    profile: dict[str, Any] | None = None
+    # Wall-clock start and per-stage seconds, when `WorkerOptions.timings` is set
+    timings: dict[str, float] | None = None
+    # With `WorkerOptions.shard`, the first match of the shard per entry as
+    # (entry index, rule name, encoded match, preview), merged by `merge_shards`
+    hits: list[tuple] = field(default_factory=list)
+    # (hits, lookups) of the worker's match memo, when `memo_size` is set
+    memo: tuple[int, int] | None = None
+    # With `WorkerOptions.triage`, the first entry ids matched per rule name
+    examples: dict[str, list] | None = None
+
+
+def shard_slice(rules: list[dict], index: int, count: int) -> list[dict]:
+    """Contiguous shard `index` of `count`, so shard order keeps rule order."""
+    return rules[len(rules) * index // count : len(rules) * (index + 1) // count]
+
+
 def worker_task(
-    batch: list[dict], rules: list[dict], source_file: str
-) -> tuple[dict[str, int], list[dict]]:
-    """Apply all rules to a batch and return match counts and results."""
+    batch: list[dict],
+    rules: list[dict],
+    source_file: str,
+    options: WorkerOptions = WorkerOptions(),
+) -> ChunkResult:
+    """
+    Apply all rules to a batch and return match counts and encoded results, or
+    a partial summary of the matches when summarizing. Sequence rules only
+    yield step events here; the parent completes them in input order. With
+    `options.shard`, only that slice of the rules is applied and its matches
+    are returned as `hits`. With `options.memo_size`, entries already seen by
+    this worker process get their cached first match (see `engine.memo`).
+    With `options.triage`, only `where` clauses are evaluated and each rule's
+    first `max_examples` entry ids are returned as `examples`.
+    """
+    started = time.time()
+    compute_start = time.perf_counter()
+    compact = options.compact or options.summarize
+    single_rules, sequence_rules = split_rules(rules)
+    if options.shard:
+        single_rules = shard_slice(single_rules, *options.shard)
+        sequence_rules = shard_slice(sequence_rules, *options.shard)
+    profiler = RuleProfiler(options.profile_every) if options.profile_every else None
+    masks = (
+        BatchPlan(single_rules).candidates(batch)
+        if options.batch
+        else [None] * len(single_rules)
+    )
+    memo = (
+        worker_memo(
+            rules,
+            options.memo_size,
+            (options.rules_digest, compact, options.triage),
+            where_only=options.triage,
+        )
+        if options.memo_size
+        else None
+    )
+    memo_hits = 0
     local_counts = defaultdict(int)
     local_matches = []
-    for entry in batch:
-        for rule in rules:
-            result = execute_rule(entry, rule, source_file)
-            if result:
-                rule_name = result["rule"]["name"]
-                local_counts[rule_name] += 1
-                local_matches.append(result)
-                break
-    return local_counts, local_matches
+    previews = []
+    events = []
+    hits = []
+    examples = defaultdict(list)
+    for index, entry in enumerate(batch):
+        key = memo.key(entry) if memo else None
+        first = memo.get((options.shard, key)) if key is not None else MISS
+        if first is MISS:
+            first = None
+            for position, (rule, mask) in enumerate(zip(single_rules, masks)):
+                if mask is not None and not mask[index]:
+                    continue
+                if options.triage:
+                    result = (
+                        triage_rule(entry, rule)
+                        if profiler is None
+                        else profiler.call(
+                            rule["variant"]["__id__"], triage_rule, entry, rule
+                        )
+                    )
+                elif profiler is None:
+                    result = execute_rule(entry, rule, source_file, compact=compact)
+                else:
+                    result = profiler.call(
+                        rule["variant"]["__id__"],
+                        execute_rule,
+                        entry,
+                        rule,
+                        source_file,
+                        compact=compact,
+                    )
+                if result:
+                    first = (position, result)
+                    break
+            if key is not None:
+                memo.put((options.shard, key), first)
+        else:
+            memo_hits += 1
+            if first is not None and not options.triage:
+                first = (first[0], with_source(first[1], source_file))
+        if first is not None:
+            rule, result = single_rules[first[0]], first[1]
+            name = rule["meta"].get("name", "?")
+            local_counts[name] += 1
+            if options.triage:
+                if options.shard:
+                    hits.append((index, name, entry.get("id"), None))
+                elif len(examples[name]) < options.max_examples:
+                    examples[name].append(entry.get("id"))
+            else:
+                match = (entry.get("id"), result) if options.summarize else result
+                preview = None
+                if len(previews) < options.preview_limit:
+                    preview = match_preview(rule, result)
+                    previews.append(preview)
+                if options.shard:
+                    if not options.summarize:
+                        match = encode_matches([match])
+                    hits.append((index, name, match, preview))
+                else:
+                    local_matches.append(match)
+        for rule in sequence_rules:
+            if profiler is None:
+                events.extend(evaluate_steps(index, entry, rule))
+            else:
+                rule_id = rule["variant"]["__id__"]
+                events.extend(
+                    profiler.call(rule_id, evaluate_steps, index, entry, rule)
+                )
+
+    compute = time.perf_counter() - compute_start
+    format_start = time.perf_counter()
+    result = ChunkResult(
+        counts=dict(local_counts),
+        matches=len(local_matches),
+        previews=previews,
+        source_file=source_file,
+        entries=len(batch),
+        events=events,
+        profile=profiler.snapshot() if profiler else None,
+        memo=(memo_hits, len(batch)) if memo else None,
+    )
+    if options.shard:
+        result.hits = hits
+    elif options.triage:
+        result.examples = dict(examples)
+    elif options.summarize:
+        result.summary = summarize_chunk(local_matches, options.max_examples)
+    else:
+        result.payload = encode_matches(local_matches)
+    if options.timings:
+        result.timings = {
+            "started": started,
+            "compute": compute,
+            "format": time.perf_counter() - format_start,
+        }
+    return result
+
+
+def merge_shards(results: list[ChunkResult], options: WorkerOptions) -> ChunkResult:
+    """
+    Combine the results of every rule shard for one chunk, given in shard
+    order: per entry the hit of the lowest shard wins, as the first matching
+    rule does when all rules are evaluated together.
+    """
+    winners: dict[int, tuple] = {}
+    for shard in results:
+        for hit in shard.hits:
+            winners.setdefault(hit[0], hit)
+    hits = [winners[index] for index in sorted(winners)]
+    counts = defaultdict(int)
+    for _, name, _, _ in hits:
+        counts[name] += 1
+    merged = ChunkResult(
+        counts=dict(counts),
+        matches=len(hits),
+        previews=[hit[3] for hit in hits if hit[3]][: options.preview_limit],
+        source_file=results[0].source_file,
+        entries=max(r.entries for r in results),
+        # Stable sort: per entry, events stay in rule (shard) order
+        events=sorted(chain.from_iterable(r.events for r in results), key=_index),
+    )
+    memos = [r.memo for r in results if r.memo]
+    if memos:
+        merged.memo = (sum(m[0] for m in memos), sum(m[1] for m in memos))
+    if options.triage:
+        examples = defaultdict(list)
+        for _, name, entry_id, _ in hits:
+            if len(examples[name]) < options.max_examples:
+                examples[name].append(entry_id)
+        merged.examples = dict(examples)
+    elif options.summarize:
+        merged.summary = summarize_chunk([hit[2] for hit in hits], options.max_examples)
+    else:
+        merged.payload = MATCH_SEPARATOR.join(hit[2] for hit in hits)
+    profiles = [r.profile for r in results if r.profile]
+    if profiles:
+        profiler = RuleProfiler(options.profile_every)
+        for profile in profiles:
+            profiler.merge(profile)
+        merged.profile = profiler.snapshot()
+    return merged
+
+
+def _index(event: StepEvent) -> int:
+    return event.index
+
+
+def resolve_rule_shards(
+    partition: str,
+    inputs: list[str],
+    chunk_sizes: dict[str, int],
+    workers: int,
+    rules: list[dict],
+) -> int:
+    """
+    Number of rule shards for `partition` ("entries", "rules" or "auto").
+    "auto" shards rules only when the inputs make too few chunks to keep the
+    workers busy, estimating entry counts from a sample of each input.
+    """
+    most_rules = max(len(r) for r in split_rules(rules))
+    if partition == "entries" or workers < 2 or most_rules < 2:
+        return 1
+    if partition == "rules":
+        return min(workers, most_rules)
+    chunks = 0
+    for path in inputs:
+        sample = sample_entries(path)
+        if not sample:
+            continue
+        entry_size = len(json.dumps(sample, default=str)) / len(sample)
+        entries = os.path.getsize(path) / entry_size
+        chunks += math.ceil(entries / chunk_sizes[path])
+    if chunks >= workers:
+        return 1
+    shards = min(workers // max(chunks, 1), most_rules // MIN_RULES_PER_SHARD)
+    return max(1, shards)
+
+
+def timed_worker_task(*args) -> bytes:
+    """
+    Run `worker_task` and pickle its result here, so the parent can time the
+    matching unpickle in `collect_result` instead of inside the executor.
+    """
+    return pickle.dumps(worker_task(*args), protocol=pickle.HIGHEST_PROTOCOL)
+
+
+@dataclass
+class ChunkTask:
+    """A chunk of entries tagged with its position in the overall input order."""
+
+    seq: int
+    source_file: str
+    file_hash: str
+    batch: list[dict]
+
+
+class ReorderBuffer:
+    """
+    Releases chunk results in sequence order. At most `window` chunks may be
+    outstanding (running or held) at once; callers stop submitting work while
+    `has_room` is False, which in turn stalls the producer on the task queue.
+    A `window` of None disables reordering and releases results immediately.
+    """
+
+    def __init__(self, window: int | None = None, start: int = 0):
+        self.window = window
+        self.next_seq = start
+        self.held: dict[int, ChunkResult] = {}
+
+    def has_room(self, seq: int) -> bool:
+        return self.window is None or seq - self.next_seq < self.window
+
+    def push(self, seq: int, result: ChunkResult) -> list[ChunkResult]:
+        if self.window is None:
+            return [result]
+        self.held[seq] = result
+        ready = []
+        while self.next_seq in self.held:
+            ready.append(self.held.pop(self.next_seq))
+            self.next_seq += 1
+        return ready
 
 
 def start_producer(
-    inputs: list[str], chunk_sizes: dict[str, int], task_queue: Queue, workers: int
-) -> None:
-    """Start a background thread to feed chunks to the processing queue."""
+    inputs: list[str],
+    chunk_sizes: dict[str, int],
+    task_queue: Queue,
+    stats: PipelineStats | None = None,
+    progress: PipelineProgress | None = None,
+    follow: bool = False,
+    flush_interval: float = 1.0,
+    idle_timeout: float | None = None,
+    skip_chunks: int = 0,
+    index_filter: Callable[[dict], bool] | None = None,
+    entry_filter: EntryFilter | None = None,
+    use_index: bool = True,
+) -> list[Exception]:
+    """
+    Start a background thread to feed sequence-numbered chunks to the queue.
+    A single None is queued once all inputs are exhausted (or on failure); the
+    returned list receives the exception that stopped the producer, if any.
+    With `stats`, hashing, parsing and queue-full stalls are timed; with
+    `progress`, consumed input bytes are reported. With `follow`, inputs are
+    tailed as they grow (see `follow_json_chunks`). The first `skip_chunks`
+    chunks are parsed but not queued (resuming from a checkpoint). Entries
+    failing `entry_filter` are dropped while reading. Inputs with a current
+    sidecar index are read through it when there is a filter (and `use_index`),
+    skipping entries whose indexed fields fail `index_filter` or `entry_filter`.
+    """
+
+    def index_keep(fields: dict) -> bool:
+        return (index_filter is None or index_filter(fields)) and (
+            entry_filter is None or entry_filter.matches(fields, partial=True)
+        )
+
+    errors: list[Exception] = []
 
     def producer():
+        seq = 0
         try:
             for infile in inputs:
-                file_hash = file_sha256(infile)
+                consumed = 0
+
+                def on_read(position: int) -> None:
+                    nonlocal consumed
+                    progress.add_bytes(position - consumed)
+                    consumed = position
+
                 cs = chunk_sizes[infile]
-                logger.debug(f"Producing chunks from {infile} with chunk size {cs}")
-                for batch in read_json_chunks(infile, cs):
-                    task_queue.put((infile, file_hash, batch, infile))
-            for _ in range(workers):
-                task_queue.put(None)
+                if follow:
+                    # A growing file has no final hash
+                    file_hash = ""
+                    logger.info(f"Following {infile} with chunk size {cs}")
+                    chunks = follow_json_chunks(
+                        infile, cs, flush_interval, idle_timeout=idle_timeout
+                    )
+                    if entry_filter:
+                        chunks = filter_chunks(chunks, entry_filter.matches)
+                else:
+                    start = time.perf_counter()
+                    file_hash = file_sha256(infile)
+                    if stats:
+                        stats.record("hash", time.perf_counter() - start)
+                    logger.debug(f"Producing chunks from {infile} with chunk size {cs}")
+                    index = (
+                        load_current_index(infile)
+                        if use_index and (index_filter or entry_filter)
+                        else None
+                    )
+                    if index is not None:
+                        rows = index.select(
+                            index_keep,
+                            entry_filter.in_id_range if entry_filter else None,
+                        )
+                        logger.info(
+                            f"Index of {infile}: reading {len(rows)} "
+                            f"of {len(index)} entries"
+                        )
+                        if progress:
+                            progress.add_bytes(os.path.getsize(infile))
+                        chunks = index.read_chunks(infile, rows, cs)
+                        if entry_filter:
+                            chunks = filter_chunks(chunks, entry_filter.matches)
+                    elif entry_filter:
+                        chunks = read_filtered_chunks(
+                            infile,
+                            cs,
+                            entry_filter.may_contain,
+                            entry_filter.matches,
+                            on_read if progress else None,
+                        )
+                    else:
+                        chunks = read_json_chunks(
+                            infile, cs, on_read if progress else None
+                        )
+                while True:
+                    start = time.perf_counter()
+                    batch = next(chunks, None)
+                    if batch is None:
+                        break
+                    if seq < skip_chunks:
+                        seq += 1
+                        continue
+                    if stats:
+                        stats.record("parse", time.perf_counter() - start)
+                        start = time.perf_counter()
+                    task_queue.put(ChunkTask(seq, infile, file_hash, batch))
+                    if stats:
+                        stats.record("queue_stall", time.perf_counter() - start)
+                    seq += 1
         except Exception as e:
             logger.error(f"Error in producer thread: {e}", exc_info=True)
+            errors.append(e)
+        finally:
+            task_queue.put(None)
 
     Thread(target=producer, daemon=True).start()
+    return errors
 
 
-def handle_completed_task(
-    future, source_file, agg_counts, matches, temp_output, first_written
-) -> bool:
-    """Process the result of a completed worker task."""
+def collect_result(
+    future,
+    source_file: str,
+    entries: int,
+    stats: PipelineStats | None = None,
+    submitted: float = 0.0,
+    strict: bool = False,
+) -> ChunkResult:
+    """
+    Return the result of a worker task, or an empty one if it failed (raising
+    RuntimeError instead with `strict`). With `stats`, the task ran
+    `timed_worker_task`: the result is unpickled here and its stage timings
+    are recorded.
+    """
     try:
-        counts, chunk_matches = future.result()
+        result = future.result()
+        if stats is None:
+            return result
+        start = time.perf_counter()
+        result = pickle.loads(result)
+        stats.record("unpickle", time.perf_counter() - start)
+        if result.timings:
+            stats.record("submit_to_start", result.timings["started"] - submitted)
+            stats.record("compute", result.timings["compute"])
+            stats.record("format", result.timings["format"])
+        return result
     except Exception as e:
+        if strict:
+            raise RuntimeError(f"A chunk of {source_file} failed: {e}") from e
         logger.warning(f"Worker task failed: {e}", exc_info=True)
-        return first_written
-
-    for rule_name, cnt in counts.items():
-        agg_counts[rule_name] += cnt
-
-    for match in chunk_matches:
-        print_match(
-            match_type=match["rule"].get("name", "unnamed")
-            + ("::" + match["rule"]["variant"] if match["rule"].get("variant") else ""),
-            api=match.get("api", "?"),
-            source_file=match.get("sources", {}).get("input", "?"),
-            selected_fields=match.get("attributes", {}),
-        )
+        return ChunkResult(source_file=source_file, entries=entries)
 
-        if temp_output:
-            if first_written:
-                temp_output.write(",\n")
-            temp_output.write(json.dumps(match, ensure_ascii=False))
-            first_written = True
-        else:
-            matches.append(match)
 
-    return first_written
+class ResultCollector:
+    """Folds worker results into counts, output, console and aggregates."""
+
+    def __init__(
+        self,
+        output: OutputHandler,
+        headers: dict[str, dict],
+        compact: bool = False,
+        console: MatchConsole | None = None,
+        summary: SummaryAggregator | None = None,
+        triage: TriageAggregator | None = None,
+        sequences: SequenceTracker | None = None,
+        profiler: RuleProfiler | None = None,
+        progress: PipelineProgress | None = None,
+        flush: bool = False,
+    ):
+        self.output = output
+        self.headers = headers
+        self.compact = compact
+        self.console = console
+        self.summary = summary
+        self.triage = triage
+        self.sequences = sequences
+        self.profiler = profiler
+        self.progress = progress
+        self.flush = flush
+        self.agg_counts: dict[str, int] = defaultdict(int)
+        self.position = 0
+        # (hits, lookups) of the workers' match memos
+        self.memo = [0, 0]
+
+    def handle_completed_task(self, result: ChunkResult) -> None:
+        """Merge counts of a completed worker task and append its encoded matches."""
+        for rule_name, cnt in result.counts.items():
+            self.agg_counts[rule_name] += cnt
+
+        if self.profiler is not None and result.profile:
+            self.profiler.merge(result.profile)
+        if self.summary is not None and result.summary:
+            self.summary.merge(result.summary)
+        if self.triage is not None and result.examples:
+            self.triage.add(result.examples, result.source_file)
+        if result.memo:
+            self.memo[0] += result.memo[0]
+            self.memo[1] += result.memo[1]
+        self.output.write(result.payload)
+        if self.console and result.matches:
+            self.console.submit(result.previews, result.matches)
+
+        if self.sequences is not None:
+            completed = self.sequences.feed(
+                result.events, self.position, result.source_file
+            )
+            self._handle_sequences(completed, result.source_file)
+        self.position += result.entries
+        if self.flush:
+            self.output.flush()
+        record_entries(result.entries)
+        if self.progress is not None:
+            self.progress.add_results(result.entries, result.counts)
+
+    def _handle_sequences(self, completed: list, source_file: str) -> None:
+        matches = []
+        for rule, run in completed:
+            name = rule["meta"].get("name", "?")
+            self.agg_counts[name] += 1
+            if self.triage is not None:
+                self.triage.add({name: [run.steps[0]["id"]]}, source_file)
+                continue
+            match = build_sequence_match(rule, run, source_file, compact=True)
+            if self.summary is not None:
+                entry_id = run.steps[0]["id"]
+                self.summary.merge(
+                    summarize_chunk([(entry_id, match)], self.summary.max_examples)
+                )
+                continue
+            matches.append(match if self.compact else self._expand(match))
+            if self.console:
+                self.console.submit([match_preview(rule, match)], 1)
+        self.output.write(encode_matches(matches))
+
+    def _expand(self, match: dict[str, Any]) -> dict[str, Any]:
+        return expand_match(match, self.headers[match["rule_id"]])
+
+    def write_summary(self, batch_size: int = 1000) -> None:
+        """Encode summary records in batches and append them to the output."""
+        records = iter(self.summary)
+        while batch := list(islice(records, batch_size)):
+            if not self.compact:
+                batch = [self._expand(r) for r in batch]
+            self.output.write(encode_matches(batch))
+
+    def write_triage(self) -> None:
+        self.output.write(encode_matches(self.triage.records(self.agg_counts)))
 
 
 def run_pipeline(
@@ -138,65 +779,317 @@ def run_pipeline(
     chunk_sizes: dict[str, int],
     workers: int,
     rules: list[dict[str, Any]],
-    output_path: str = None,
-    verbose: bool = False,
+    options: PipelineOptions | None = None,
+    executor: Executor | None = None,
 ) -> tuple[dict[str, int], list[dict[str, Any]]]:
-    """Orchestrates rule execution across inputs with multiprocessing."""
+    """
+    Orchestrates rule execution across inputs with multiprocessing, as set up
+    by `options` (see `PipelineOptions`). An `executor` (a warm pool shared
+    across runs) is used instead of starting and shutting down a pool of
+    `workers` processes.
+    """
+    options = options or PipelineOptions()
     logger.debug("Starting pipeline execution...")
+    if is_store(options.output_path):
+        if options.triage:
+            raise ValueError("Triage output cannot be written to a result store")
+        # The store keeps rule headers in a table of their own
+        options = replace(options, compact=True)
+    if options.triage:
+        # Examples are the first hits per input, so chunks are folded in order
+        options = replace(options, ordered=True)
+    if options.profile_dir and executor is not None:
+        # Workers of a shared or remote pool outlive the run and never dump
+        raise ValueError(
+            "Process profiles need a pool of their own; they cannot be "
+            "collected from a shared or remote executor"
+        )
+    index_filter = (
+        rule_filter(rules) if options.use_index and not options.follow else None
+    )
+    checkpointer, restored = None, None
+    if options.checkpoint_every is not None or options.resume:
+        if not options.output_path:
+            raise ValueError("Checkpoints need an output file")
+        if options.summarize or options.triage or options.follow:
+            raise ValueError(
+                "Checkpoints cannot be used with summaries, triage or --follow"
+            )
+        options = replace(options, ordered=True)
+        ck_path = checkpoint_path(options.output_path)
+        settings = {"compact": options.compact, "chunk_sizes": chunk_sizes}
+        if options.entry_filter:
+            settings["filter"] = options.entry_filter.describe()
+        # Index reads skip entries, so chunk numbers depend on which inputs
+        # have a current index; one built or removed meanwhile shifts them
+        settings["indexed"] = [
+            f
+            for f in inputs
+            if options.use_index
+            and (index_filter or options.entry_filter)
+            and has_current_index(f)
+        ]
+        base = Checkpoint(
+            inputs=input_fingerprint(inputs),
+            rules=rules_digest(rules),
+            settings=settings,
+        )
+        if options.resume:
+            if not ck_path.exists():
+                raise ValueError(f"No checkpoint to resume from: {ck_path}")
+            restored = Checkpoint.load(ck_path)
+            base.check_compatible(restored)
+            logger.info(
+                f"Resuming after {restored.next_seq} chunk(s), "
+                f"{sum(restored.counts.values())} match(es) already written"
+            )
+        checkpointer = Checkpointer(ck_path, base, options.checkpoint_every or 60.0)
+    skip_chunks = restored.next_seq if restored else 0
+    # A chunk left out would otherwise be checkpointed as written
+    fail_chunks = options.strict or checkpointer is not None
+    process_profiler = (
+        ProcessProfiler(
+            options.profile_dir, f"parent-{os.getpid()}", options.trace_malloc
+        ).start()
+        if options.profile_dir
+        else None
+    )
+    pool_options = (
+        {
+            "initializer": start_worker_profiler,
+            "initargs": (options.profile_dir, options.trace_malloc),
+        }
+        if options.profile_dir
+        else {}
+    )
+    stats = PipelineStats() if options.stage_stats or options.stage_stats_file else None
+    stop_reporter = (
+        stats.start_reporter(options.stage_stats_file, options.stage_stats_interval)
+        if options.stage_stats_file
+        else None
+    )
     task_queue: Queue = Queue(maxsize=workers * 2)
-    start_producer(inputs, chunk_sizes, task_queue, workers)
+    tracker = (
+        PipelineProgress(
+            sum(os.path.getsize(f) for f in inputs),
+            queue_depth=task_queue.qsize,
+            show=options.progress,
+            metrics_path=options.metrics_file,
+        ).start()
+        if options.progress or options.metrics_file
+        else None
+    )
+    producer_errors = start_producer(
+        inputs,
+        chunk_sizes,
+        task_queue,
+        stats,
+        tracker,
+        follow=options.follow,
+        flush_interval=options.flush_interval,
+        idle_timeout=options.follow_timeout,
+        skip_chunks=skip_chunks,
+        index_filter=index_filter,
+        entry_filter=options.entry_filter,
+        use_index=options.use_index,
+    )
+
+    headers = {r["variant"]["__id__"]: build_rule_header(r) for r in rules}
+    output_headers = headers if options.compact and not options.triage else None
+    output = get_output_handler(options.output_path, output_headers)
+    try:
+        if restored:
+            output.resume(restored.output)
+        else:
+            output.start()
+    except Exception as e:
+        if checkpointer:
+            raise
+        logger.error(
+            f"Failed to open output file '{options.output_path}': {e}", exc_info=True
+        )
+        output = get_output_handler(None, output_headers)
 
-    agg_counts = defaultdict(int)
-    matches = []
-    temp_output = None
-    first_written = False
+    console = (
+        MatchConsole().start()
+        if options.show_matches and MatchConsole.enabled()
+        else None
+    )
+    summary = (
+        SummaryAggregator(options.summary_budget_mb) if options.summarize else None
+    )
+    worker_options = WorkerOptions(
+        preview_limit=CONSOLE_PREVIEWS_PER_CHUNK
+        if console and not options.triage
+        else 0,
+        compact=options.compact,
+        summarize=options.summarize,
+        profile_every=options.profile_every if options.profile_rules else 0,
+        timings=stats is not None,
+        memo_size=options.memo_size,
+        rules_digest=rules_digest(rules) if options.memo_size else "",
+        triage=options.triage,
+        # Triage is all condition evaluation: always pre-filter it
+        batch=options.batch or options.triage,
+        max_examples=options.triage_examples
+        if options.triage
+        else WorkerOptions.max_examples,
+    )
+    task_fn = timed_worker_task if stats else worker_task
+    shard_options = (
+        [
+            replace(worker_options, shard=(i, options.rule_shards))
+            for i in range(options.rule_shards)
+        ]
+        if options.rule_shards > 1
+        else [worker_options]
+    )
+    if options.rule_shards > 1:
+        logger.info(f"Evaluating every chunk in {options.rule_shards} rule shards")
+    _, sequence_rules = split_rules(rules)
+    if sequence_rules and not options.ordered:
+        logger.info("Sequence rules present: processing results in input order")
+        options = replace(options, ordered=True)
+    reorder = ReorderBuffer(
+        max(workers, options.reorder_window or workers * 4)
+        if options.ordered
+        else None,
+        start=skip_chunks,
+    )
+    collector = ResultCollector(
+        output,
+        headers,
+        compact=options.compact,
+        console=console,
+        summary=summary,
+        triage=TriageAggregator(options.triage_examples) if options.triage else None,
+        sequences=SequenceTracker(sequence_rules) if sequence_rules else None,
+        profiler=RuleProfiler(options.profile_every) if options.profile_rules else None,
+        progress=tracker,
+        flush=options.follow,
+    )
+    if restored:
+        collector.agg_counts.update(restored.counts)
+        collector.position = restored.position
+        if collector.sequences is not None:
+            logger.warning("Partial sequence matches before the checkpoint are lost")
 
-    if output_path:
-        try:
-            temp_output = open(output_path, "w", encoding="utf-8")
-            temp_output.write("[")
-            logger.info(f"Writing results to {output_path}")
-        except Exception as e:
-            logger.error(
-                f"Failed to open output file '{output_path}': {e}", exc_info=True
-            )
-            temp_output = None
-
-    with ProcessPoolExecutor(max_workers=workers) as executor:
-        pending = []
-
-        # Initial task submission
-        for _ in range(workers):
-            task = task_queue.get()
-            if task is None:
-                break
-            infile, file_hash, batch, source_file = task
-            future = executor.submit(worker_task, batch, rules, source_file)
-            pending.append((future, source_file))
-
-        # Process task results and refill queue
-        while pending:
-            done_set, _ = wait([f[0] for f in pending], return_when=FIRST_COMPLETED)
-            for future_obj in list(done_set):
-                future_tuple = next(p for p in pending if p[0] == future_obj)
-                pending.remove(future_tuple)
-                future, source_file = future_tuple
-                first_written = handle_completed_task(
-                    future, source_file, agg_counts, matches, temp_output, first_written
+    try:
+        pool = (
+            nullcontext(executor)
+            if executor is not None
+            else ProcessPoolExecutor(max_workers=workers, **pool_options)
+        )
+        with pool as executor:
+            pending: dict = {}
+            # Results of rule shards by chunk, until all shards have finished
+            shard_results: dict[int, list] = {}
+            next_seq = skip_chunks
+            exhausted = False
+
+            def refill() -> None:
+                nonlocal next_seq, exhausted
+                while (
+                    not exhausted
+                    and len(pending) < workers
+                    and reorder.has_room(next_seq)
+                ):
+                    # When following, never block on new input while results
+                    # of submitted chunks are waiting to be written
+                    try:
+                        task = task_queue.get(block=not (options.follow and pending))
+                    except Empty:
+                        break
+                    if task is None:
+                        exhausted = True
+                        break
+                    submitted = time.time()
+                    for shard, shard_opts in enumerate(shard_options):
+                        future = executor.submit(
+                            task_fn, task.batch, rules, task.source_file, shard_opts
+                        )
+                        pending[future] = (
+                            task.seq,
+                            task.source_file,
+                            len(task.batch),
+                            submitted,
+                            shard,
+                        )
+                    next_seq = task.seq + 1
+
+            # Process task results and refill queue
+            refill()
+            while pending:
+                done_set, _ = wait(
+                    pending,
+                    timeout=options.flush_interval if options.follow else None,
+                    return_when=FIRST_COMPLETED,
                 )
+                for future in done_set:
+                    seq, source_file, entries, submitted, shard = pending.pop(future)
+                    result = collect_result(
+                        future, source_file, entries, stats, submitted, fail_chunks
+                    )
+                    if options.rule_shards > 1:
+                        parts = shard_results.setdefault(
+                            seq, [None] * options.rule_shards
+                        )
+                        parts[shard] = result
+                        if any(part is None for part in parts):
+                            continue
+                        result = merge_shards(shard_results.pop(seq), worker_options)
+                    for ready in reorder.push(seq, result):
+                        start = time.perf_counter()
+                        collector.handle_completed_task(ready)
+                        if stats:
+                            stats.record("write", time.perf_counter() - start)
+                if checkpointer:
+                    checkpointer.update(
+                        reorder.next_seq,
+                        output,
+                        collector.agg_counts,
+                        collector.position,
+                    )
+                refill()
 
-                task = task_queue.get()
-                if task is None:
-                    continue
-                infile, file_hash, batch, source_file = task
-                future = executor.submit(worker_task, batch, rules, source_file)
-                pending.append((future, source_file))
+        if summary is not None:
+            collector.write_summary()
+        if collector.triage is not None:
+            collector.write_triage()
+    finally:
+        if summary is not None:
+            summary.close()
+        output.finish()
+        if console:
+            console.close()
+        if stop_reporter:
+            stop_reporter()
+        if tracker:
+            tracker.close()
+        if process_profiler:
+            process_profiler.stop()
+            merge_profiles(options.profile_dir)
+
+    if options.strict and producer_errors:
+        raise RuntimeError(f"Failed to read input: {producer_errors[0]}")
 
-    if temp_output:
-        temp_output.write("]\n")
-        temp_output.close()
-        logger.info(f"Finished writing output to {output_path}")
-        return agg_counts, []
+    if checkpointer:
+        checkpointer.complete()
+
+    if collector.profiler is not None:
+        report = collector.profiler.report(rules)
+        log_profile_report(report)
+        write_profile_report(report, Path(options.profile_rules))
+
+    if stats is not None:
+        stats.log_summary()
+
+    memo_hits, memo_lookups = collector.memo
+    if memo_lookups:
+        logger.info(
+            f"Match cache: {memo_hits} of {memo_lookups} entries served from cache "
+            f"({memo_hits / memo_lookups:.1%} hit rate)"
+        )
 
     logger.info("Pipeline execution completed")
-    return agg_counts, matches
+    return collector.agg_counts, output.results()
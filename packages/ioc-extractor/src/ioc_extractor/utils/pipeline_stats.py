@@ -0,0 +1,144 @@
+"""
+Per-stage timings of `run_pipeline` (`analyze --stage-stats`).
+
+Stages, in the order a chunk goes through them:
+- hash: hashing an input file before it is read
+- parse: producer time spent reading and decoding a chunk
+- queue_stall: producer time blocked because the task queue was full
+- submit_to_start: latency between submitting a chunk and a worker picking it up
+- compute: worker time evaluating rules
+- format: worker time encoding matches
+- unpickle: parent time decoding a worker result
+- write: parent time appending results to the output (and console)
+
+Each stage keeps a total and a log2-bucketed histogram, so the overhead is a
+few additions per chunk regardless of how long the run is.
+"""
+
+import json
+import math
+import threading
+import time
+from typing import Any, Callable
+
+from common.logger import get_logger
+
+logger = get_logger(__name__)
+
+STAGES = (
+    "hash",
+    "parse",
+    "queue_stall",
+    "submit_to_start",
+    "compute",
+    "format",
+    "unpickle",
+    "write",
+)
+
+# Bucket i holds durations in [2^(i-1), 2^i) microseconds; bucket 0 is < 1 µs
+BUCKETS = 40
+
+
+class Histogram:
+    __slots__ = ("count", "total", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * BUCKETS
+
+    def add(self, seconds: float) -> None:
+        seconds = max(0.0, seconds)
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        micros = seconds * 1e6
+        index = 0 if micros < 1 else min(BUCKETS - 1, int(math.log2(micros)) + 1)
+        self.buckets[index] += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile, in seconds."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for index, n in enumerate(self.buckets):
+            seen += n
+            if seen >= target:
+                return min(self.max, (2**index) / 1e6)
+        return self.max
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "max": self.max,
+            "buckets_us_log2": self.buckets,
+        }
+
+
+class PipelineStats:
+    """Thread-safe stage timings shared by the producer and the result loop."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.stages = {name: Histogram() for name in STAGES}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.stages[stage].add(seconds)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "timestamp": time.time(),
+                "elapsed": time.time() - self.started,
+                "stages": {name: h.to_dict() for name, h in self.stages.items()},
+            }
+
+    def log_summary(self) -> None:
+        snap = self.snapshot()
+        lines = [
+            f"Pipeline stages over {snap['elapsed']:.1f}s",
+            f"{'stage':<16}{'count':>9}{'total s':>10}{'mean ms':>10}"
+            f"{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}",
+        ]
+        for name, h in snap["stages"].items():
+            if not h["count"]:
+                continue
+            lines.append(
+                f"{name:<16}{h['count']:>9}{h['total']:>10.2f}{h['mean'] * 1e3:>10.2f}"
+                f"{h['p50'] * 1e3:>9.2f}{h['p90'] * 1e3:>9.2f}"
+                f"{h['p99'] * 1e3:>9.2f}{h['max'] * 1e3:>9.2f}"
+            )
+        logger.info("\n".join(lines))
+
+    def start_reporter(self, path: str, interval: float = 5.0) -> Callable[[], None]:
+        """
+        Append a JSON snapshot to `path` every `interval` seconds. Returns a
+        function that stops the reporter after writing a final snapshot.
+        """
+        stop = threading.Event()
+
+        def report():
+            with open(path, "a", encoding="utf-8") as f:
+                while not stop.wait(interval):
+                    f.write(json.dumps(self.snapshot()) + "\n")
+                    f.flush()
+                f.write(json.dumps(self.snapshot()) + "\n")
+
+        thread = threading.Thread(target=report, daemon=True)
+        thread.start()
+
+        def stop_reporter() -> None:
+            stop.set()
+            thread.join()
+
+        return stop_reporter
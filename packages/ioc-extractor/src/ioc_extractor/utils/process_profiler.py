@@ -0,0 +1,108 @@
+"""
+cProfile and tracemalloc capture for every pipeline process (`analyze --profile-dir`).
+
+Each process writes `<name>.pstats` and, with tracemalloc, `<name>.tracemalloc`
+(raw snapshot) plus `<name>.allocations.txt` (top allocation sites):
+- parent-<pid>: the parent process; since Python 3.12 cProfile hooks every
+  thread, so this includes the producer thread (look for `producer`)
+- worker-<pid>: each pool worker, written when the worker exits
+
+`merge_profiles` combines the `.pstats` files into `combined.pstats`, which can
+be browsed with `python -m pstats` or snakeviz.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import tracemalloc
+from multiprocessing import util
+from pathlib import Path
+
+from common.logger import get_logger
+
+logger = get_logger(__name__)
+
+COMBINED_NAME = "combined.pstats"
+TOP_ALLOCATIONS = 50
+
+# Profiler active in this process; forked workers inherit it and must stop it
+_active: "ProcessProfiler | None" = None
+
+
+class ProcessProfiler:
+    def __init__(self, directory: Path, name: str, trace_malloc: bool = False):
+        self.directory = Path(directory)
+        self.name = name
+        self.trace_malloc = trace_malloc
+        self.profile = cProfile.Profile()
+
+    def start(self) -> "ProcessProfiler":
+        global _active
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if self.trace_malloc and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.profile.enable()
+        _active = self
+        return self
+
+    def stop(self) -> None:
+        global _active
+        self.profile.disable()
+        _active = None
+        self.profile.dump_stats(self.directory / f"{self.name}.pstats")
+        if self.trace_malloc and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            write_allocations(snapshot, self.directory / self.name, peak)
+
+
+def write_allocations(snapshot: tracemalloc.Snapshot, base: Path, peak: int) -> None:
+    """Dump the raw snapshot and a readable list of its top allocation sites."""
+    snapshot.dump(str(base.with_suffix(".tracemalloc")))
+    stats = snapshot.statistics("lineno")
+    total = sum(stat.size for stat in stats)
+    lines = [
+        f"Traced at exit: {total / 1024**2:.1f} MiB in {len(stats)} sites, "
+        f"peak {peak / 1024**2:.1f} MiB"
+    ]
+    lines += [str(stat) for stat in stats[:TOP_ALLOCATIONS]]
+    base.with_suffix(".allocations.txt").write_text(
+        "\n".join(lines) + "\n", encoding="utf-8"
+    )
+
+
+def start_worker_profiler(directory: str, trace_malloc: bool = False) -> None:
+    """Pool initializer: profile this worker until it exits."""
+    if _active is not None:
+        # Forked from the profiled parent: drop its profiler and traces
+        _active.profile.disable()
+        tracemalloc.stop()
+    profiler = ProcessProfiler(
+        Path(directory), f"worker-{os.getpid()}", trace_malloc
+    ).start()
+    # Pool workers skip atexit; multiprocessing finalizers still run on exit
+    util.Finalize(None, profiler.stop, exitpriority=10)
+
+
+def merge_profiles(directory: str, limit: int = 25) -> Path | None:
+    """Combine every `.pstats` file under `directory` and log the top functions."""
+    root = Path(directory)
+    files = sorted(str(p) for p in root.glob("*.pstats") if p.name != COMBINED_NAME)
+    if not files:
+        logger.warning(f"No profiles found in {root}")
+        return None
+    stats = pstats.Stats(files[0])
+    for path in files[1:]:
+        stats.add(path)
+    combined = root / COMBINED_NAME
+    stats.dump_stats(combined)
+
+    stream = io.StringIO()
+    pstats.Stats(str(combined), stream=stream).sort_stats("cumulative").print_stats(
+        limit
+    )
+    logger.debug(stream.getvalue())
+    logger.info(f"Merged {len(files)} profiles into {combined}")
+    return combined
@@ -0,0 +1,203 @@
+"""
+Live progress (`analyze --progress`) and OpenMetrics textfile export
+(`analyze --metrics-file`) for long pipeline runs.
+
+Progress is measured in input bytes consumed by the producer, so the ETA holds
+for traces of any size without counting their entries first. The metrics file
+is rewritten atomically every few seconds, as expected by the node exporter
+textfile collector.
+"""
+
+import os
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable, Optional
+
+import humanfriendly
+import psutil
+from rich.console import Console
+
+METRIC_PREFIX = "ioc_extractor"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class PipelineProgress:
+    """
+    Counters fed by the producer (`add_bytes`) and the result loop
+    (`add_results`), reported by a background thread every `interval` seconds.
+    """
+
+    def __init__(
+        self,
+        total_bytes: int,
+        queue_depth: Callable[[], int] = lambda: 0,
+        show: bool = True,
+        metrics_path: Optional[Path] = None,
+        interval: float = 5.0,
+    ):
+        self.total_bytes = total_bytes
+        self.queue_depth = queue_depth
+        self.show = show
+        self.metrics_path = Path(metrics_path) if metrics_path else None
+        self.interval = interval
+        self.bytes_read = 0
+        self.entries = 0
+        self.matches = 0
+        self.rule_matches: dict[str, int] = defaultdict(int)
+        self.started = time.time()
+        self.console = Console(stderr=True)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._report, daemon=True)
+        self._last = (self.started, 0, 0)
+
+    def start(self) -> "PipelineProgress":
+        self._thread.start()
+        return self
+
+    def add_bytes(self, count: int) -> None:
+        with self._lock:
+            self.bytes_read += count
+
+    def add_results(self, entries: int, counts: dict[str, int]) -> None:
+        with self._lock:
+            self.entries += entries
+            for rule, count in counts.items():
+                self.rule_matches[rule] += count
+                self.matches += count
+
+    def close(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _report(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.update()
+        self.update(final=True)
+
+    def update(self, final: bool = False) -> None:
+        with self._lock:
+            bytes_read, entries, matches = self.bytes_read, self.entries, self.matches
+            rule_matches = dict(self.rule_matches)
+        now = time.time()
+        last_time, last_entries, last_matches = self._last
+        elapsed = max(now - last_time, 1e-9)
+        entry_rate = (entries - last_entries) / elapsed
+        match_rate = (matches - last_matches) / elapsed
+        self._last = (now, entries, matches)
+
+        ratio = min(1.0, bytes_read / self.total_bytes) if self.total_bytes else 1.0
+        runtime = now - self.started
+        eta = runtime * (1 - ratio) / ratio if ratio > 0 else None
+        workers_rss = self._workers_rss()
+
+        if self.show:
+            if final:
+                line = (
+                    f"[dim]Done: {entries} entries, {matches} matches in "
+                    f"{humanfriendly.format_timespan(runtime)}[/dim]"
+                )
+            else:
+                eta_text = (
+                    humanfriendly.format_timespan(eta) if eta is not None else "?"
+                )
+                line = (
+                    f"[dim]{ratio:6.1%} "
+                    f"{humanfriendly.format_size(bytes_read)}"
+                    f"/{humanfriendly.format_size(self.total_bytes)} | "
+                    f"{entry_rate:,.0f} entries/s | {match_rate:,.0f} matches/s | "
+                    f"ETA {eta_text}[/dim]"
+                )
+            self.console.print(line, highlight=False)
+
+        if self.metrics_path:
+            self._write_metrics(
+                bytes_read, entries, rule_matches, ratio, eta, workers_rss, now
+            )
+
+    def _workers_rss(self) -> dict[int, int]:
+        rss = {}
+        try:
+            children = psutil.Process().children(recursive=True)
+        except psutil.Error:
+            return rss
+        for child in children:
+            try:
+                rss[child.pid] = child.memory_info().rss
+            except psutil.Error:
+                continue
+        return rss
+
+    def _write_metrics(
+        self,
+        bytes_read: int,
+        entries: int,
+        rule_matches: dict[str, int],
+        ratio: float,
+        eta: float | None,
+        workers_rss: dict[int, int],
+        now: float,
+    ) -> None:
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            full = f"{METRIC_PREFIX}_{name}"
+            lines.append(f"# HELP {full} {help_text}")
+            lines.append(f"# TYPE {full} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels)
+                suffix = f"{{{label_text}}}" if label_text else ""
+                lines.append(f"{full}{suffix} {value}")
+
+        metric(
+            "entries_processed_total",
+            "counter",
+            "Trace entries evaluated",
+            [((), entries)],
+        )
+        metric(
+            "matches_total",
+            "counter",
+            "Matches per rule",
+            [
+                ((("rule", rule),), count)
+                for rule, count in sorted(rule_matches.items())
+            ],
+        )
+        metric(
+            "input_read_bytes_total",
+            "counter",
+            "Input bytes parsed",
+            [((), bytes_read)],
+        )
+        metric("input_bytes", "gauge", "Total input bytes", [((), self.total_bytes)])
+        metric("progress_ratio", "gauge", "Share of input parsed", [((), ratio)])
+        if eta is not None:
+            metric("eta_seconds", "gauge", "Estimated seconds left", [((), eta)])
+        metric(
+            "queue_depth",
+            "gauge",
+            "Chunks waiting in the task queue",
+            [((), self.queue_depth())],
+        )
+        metric(
+            "worker_rss_bytes",
+            "gauge",
+            "Resident memory per worker process",
+            [((("pid", pid),), rss) for pid, rss in sorted(workers_rss.items())],
+        )
+        metric(
+            "last_update_timestamp_seconds",
+            "gauge",
+            "Time of the last update",
+            [((), round(now, 3))],
+        )
+
+        tmp = self.metrics_path.with_name(f".{self.metrics_path.name}.tmp")
+        tmp.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        os.replace(tmp, self.metrics_path)
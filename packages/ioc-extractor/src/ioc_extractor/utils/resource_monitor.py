@@ -1,8 +1,10 @@
-import statistics
+import csv
+import json
 import threading
 import time
 from functools import wraps
-from typing import Any, Callable
+from pathlib import Path
+from typing import Any, Callable, Optional
 
 import humanfriendly
 import psutil
@@ -10,57 +12,232 @@ from common.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Entries processed in this process so far, reported by the pipeline through
+# `record_entries`; monitors report the difference from when they started
+_entries = 0
+_entries_lock = threading.Lock()
+
+TIMESERIES_FIELDS = (
+    "timestamp",
+    "elapsed",
+    "cpu",
+    "rss_mb",
+    "workers",
+    "worker_rss_mb",
+    "read_mb",
+    "read_mb_s",
+    "entries",
+    "entries_s",
+)
+
+
+def record_entries(count: int) -> None:
+    """Add `count` processed entries to the throughput shown by diagnostics."""
+    global _entries
+    with _entries_lock:
+        _entries += count
+
+
+def processed_entries() -> int:
+    return _entries
+
+
+class RunningStat:
+    """Mean and maximum of a series without keeping its samples."""
+
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+class ResourceStats:
+    """Streaming statistics of the process tree (parent and pool workers)."""
+
+    def __init__(self):
+        self.cpu = RunningStat()
+        self.mem = RunningStat()
+        self.per_core: list[RunningStat] = []
+        self.workers: dict[int, dict[str, RunningStat]] = {}
+        self.read_bytes = 0
+        self.read_rate = RunningStat()
+        self.entries = 0
+        self.entry_rate = RunningStat()
+
+
+class TimeSeriesWriter:
+    """Writes one sample per row, as CSV or JSON lines depending on the suffix."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.file = path.open("w", encoding="utf-8", newline="")
+        self.csv = None
+        if path.suffix.lower() == ".csv":
+            self.csv = csv.DictWriter(self.file, fieldnames=TIMESERIES_FIELDS)
+            self.csv.writeheader()
+
+    def write(self, sample: dict[str, Any]) -> None:
+        if self.csv:
+            self.csv.writerow(sample)
+        else:
+            self.file.write(json.dumps(sample) + "\n")
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
+        logger.info(f"Resource time series written to {self.path}")
+
+
+def _read_bytes(proc: psutil.Process) -> int:
+    try:
+        counters = proc.io_counters()
+        # read_chars (Linux) also counts reads served from the page cache
+        return getattr(counters, "read_chars", counters.read_bytes)
+    except (AttributeError, psutil.Error):
+        # Not available on every platform (e.g. macOS)
+        return 0
+
 
 def _monitor(
-    stats: dict[str, Any], stop: threading.Event, interval: float = 0.5
+    stats: ResourceStats,
+    stop: threading.Event,
+    interval: float = 0.5,
+    timeseries: Optional[TimeSeriesWriter] = None,
+    entries_base: int = 0,
 ) -> None:
-    """Collect CPU and memory usage statistics in background."""
-    proc = psutil.Process()
+    """
+    Collect CPU, memory and I/O usage of the process tree in background.
+    Entries are counted from `entries_base`, the count when monitoring began.
+    """
+    root = psutil.Process()
     num_cores = psutil.cpu_count(logical=True)
-    while not stop.is_set():
-        total_cpu = proc.cpu_percent(interval=None) / num_cores
-        stats.setdefault("cpu", []).append(total_cpu)
-        stats.setdefault("per_core", []).append(
-            psutil.cpu_percent(interval=None, percpu=True)
-        )
-        stats.setdefault("mem", []).append(proc.memory_info().rss / 1024**2)
-        time.sleep(interval)
+    # Process objects are kept across samples: cpu_percent measures since last call
+    tracked: dict[int, psutil.Process] = {root.pid: root}
+    root.cpu_percent(interval=None)
+    start = last = time.time()
+    # Bytes read by workers that already exited stay counted
+    read_by_pid: dict[int, int] = {}
+    last_read = 0
+    last_entries = processed_entries() - entries_base
+
+    while not stop.wait(interval):
+        try:
+            children = root.children(recursive=True)
+        except psutil.Error:
+            children = []
+        for child in children:
+            if child.pid not in tracked:
+                tracked[child.pid] = child
+                child.cpu_percent(interval=None)
+
+        cpu = rss = worker_rss = 0.0
+        alive = 0
+        for pid, proc in list(tracked.items()):
+            try:
+                with proc.oneshot():
+                    proc_cpu = proc.cpu_percent(interval=None)
+                    proc_rss = proc.memory_info().rss / 1024**2
+                    read_by_pid[pid] = _read_bytes(proc)
+            except psutil.Error:
+                del tracked[pid]
+                continue
+            cpu += proc_cpu
+            rss += proc_rss
+            if pid != root.pid:
+                alive += 1
+                worker_rss += proc_rss
+                worker = stats.workers.setdefault(
+                    pid, {"cpu": RunningStat(), "mem": RunningStat()}
+                )
+                worker["cpu"].add(proc_cpu)
+                worker["mem"].add(proc_rss)
+
+        now = time.time()
+        elapsed = max(now - last, 1e-9)
+        read = sum(read_by_pid.values())
+        entries = processed_entries() - entries_base
+        read_rate = (read - last_read) / 1024**2 / elapsed
+        entry_rate = (entries - last_entries) / elapsed
+        last, last_read, last_entries = now, read, entries
+
+        stats.cpu.add(cpu / num_cores)
+        stats.mem.add(rss)
+        per_core = psutil.cpu_percent(interval=None, percpu=True)
+        if not stats.per_core:
+            stats.per_core = [RunningStat() for _ in per_core]
+        for core, usage in zip(stats.per_core, per_core):
+            core.add(usage)
+        stats.read_bytes = read
+        stats.read_rate.add(read_rate)
+        stats.entries = entries
+        stats.entry_rate.add(entry_rate)
+
+        if timeseries:
+            timeseries.write(
+                {
+                    "timestamp": round(now, 3),
+                    "elapsed": round(now - start, 3),
+                    "cpu": round(cpu / num_cores, 2),
+                    "rss_mb": round(rss, 2),
+                    "workers": alive,
+                    "worker_rss_mb": round(worker_rss, 2),
+                    "read_mb": round(read / 1024**2, 2),
+                    "read_mb_s": round(read_rate, 2),
+                    "entries": entries,
+                    "entries_s": round(entry_rate, 1),
+                }
+            )
 
 
-def _summarize(stats: dict[str, Any], duration: float) -> None:
+def _summarize(stats: ResourceStats, duration: float) -> None:
     """Log formatted performance metrics after execution."""
-    avg_cpu = statistics.mean(stats.get("cpu", [])) if stats.get("cpu") else 0
-    max_cpu = max(stats.get("cpu", [])) if stats.get("cpu") else 0
-    per_core_stats = stats.get("per_core", [])
-    per_core_avg = (
-        [
-            statistics.mean([core[i] for core in per_core_stats])
-            for i in range(len(per_core_stats[0]))
-        ]
-        if per_core_stats
-        else []
-    )
-    avg_mem = statistics.mean(stats.get("mem", [])) if stats.get("mem") else 0
-    max_mem = max(stats.get("mem", [])) if stats.get("mem") else 0
+    avg_cpu, max_cpu = stats.cpu.mean, stats.cpu.max
+    avg_mem, max_mem = stats.mem.mean, stats.mem.max
     num_cores = psutil.cpu_count(logical=True)
     total_ram = psutil.virtual_memory().total / (1024**2)
     avg_cores_used = (avg_cpu / 100) * num_cores
     max_cores_used = (max_cpu / 100) * num_cores
+    avg_entries = stats.entries / duration if duration else 0
 
     lines = [
-        "Resource usage summary",
+        "Resource usage summary (parent and workers)",
         f"Duration           : {humanfriendly.format_timespan(duration)}",
         f"CPU usage          : {avg_cpu:.2f}% avg / {max_cpu:.2f}% max",
         f"Logical cores used : {avg_cores_used:.2f} / {max_cores_used:.2f} of {num_cores}",
         f"RAM usage          : {avg_mem:.2f} MB avg / {max_mem:.2f} MB max of {total_ram:.0f} MB",
+        f"Read               : {humanfriendly.format_size(stats.read_bytes)}, "
+        f"{stats.read_rate.mean:.2f} MB/s avg / {stats.read_rate.max:.2f} MB/s max",
+        f"Throughput         : {stats.entries} entries, "
+        f"{avg_entries:.0f}/s avg / {stats.entry_rate.max:.0f}/s max",
     ]
 
-    if per_core_avg:
+    if stats.workers:
+        lines.append("")
+        lines.append(f"Workers ({len(stats.workers)}):")
+        for pid, worker in sorted(stats.workers.items()):
+            lines.append(
+                f"  pid {pid:<8} CPU {worker['cpu'].mean:>6.1f}% avg / "
+                f"{worker['cpu'].max:>6.1f}% max   RSS {worker['mem'].mean:>8.1f} MB "
+                f"avg / {worker['mem'].max:>8.1f} MB max"
+            )
+
+    if stats.per_core:
         lines.append("")
         lines.append("Per-core average usage (%):")
         row = ""
-        for i, usage in enumerate(per_core_avg):
-            row += f"C{i:02}:{usage:>5.1f}%  "
+        for i, core in enumerate(stats.per_core):
+            row += f"C{i:02}:{core.mean:>5.1f}%  "
             if (i + 1) % 4 == 0:
                 lines.append(row.rstrip())
                 row = ""
@@ -70,8 +247,11 @@ def _summarize(stats: dict[str, Any], duration: float) -> None:
     logger.info("\n".join(lines))
 
 
-def with_resource_monitoring(enabled: bool = False):
-    """Decorator to report CPU and RAM usage if diagnostics are enabled."""
+def with_resource_monitoring(enabled: bool = False, timeseries: Optional[Path] = None):
+    """
+    Decorator to report CPU, RAM and I/O usage of the process tree if
+    diagnostics are enabled, optionally writing every sample to `timeseries`.
+    """
 
     def decorator(func: Callable):
         @wraps(func)
@@ -80,10 +260,16 @@ def with_resource_monitoring(enabled: bool = False):
                 return func(*args, **kwargs)
 
             logger.debug("Diagnostics enabled: monitoring system resources.")
-            stats: dict[str, Any] = {}
+            stats = ResourceStats()
+            writer = TimeSeriesWriter(timeseries) if timeseries else None
             stop_event = threading.Event()
+            # Earlier runs of a long-lived process must not count towards this one
+            entries_base = processed_entries()
             thread = threading.Thread(
-                target=_monitor, args=(stats, stop_event), daemon=True
+                target=_monitor,
+                args=(stats, stop_event),
+                kwargs={"timeseries": writer, "entries_base": entries_base},
+                daemon=True,
             )
             start = time.time()
             thread.start()
@@ -92,6 +278,9 @@ def with_resource_monitoring(enabled: bool = False):
             finally:
                 stop_event.set()
                 thread.join()
+                if writer:
+                    writer.close()
+                stats.entries = processed_entries() - entries_base
                 _summarize(stats, time.time() - start)
 
         return wrapper
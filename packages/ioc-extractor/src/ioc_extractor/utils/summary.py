@@ -0,0 +1,149 @@
+"""
+Streaming aggregation of matches for `analyze --summarize`.
+
+Instead of one record per match, the summary holds one record per distinct
+behavior: a (rule id, api, normalized attributes) key with its hit count and a
+few example entries. Workers pre-aggregate each chunk with `summarize_chunk`,
+and the parent folds those partials into a `SummaryAggregator`, which spills
+sorted runs to disk whenever its estimated size exceeds the memory budget and
+merges them back when the summary is written.
+"""
+
+import hashlib
+import heapq
+import json
+import os
+import shutil
+import tempfile
+from collections.abc import Iterator
+from typing import Any
+
+from common.logger import get_logger
+from ioc_extractor.utils.io import json_default
+
+logger = get_logger(__name__)
+
+# Rough per-key overhead (dict slot, key string, lists) used by the size estimate
+KEY_OVERHEAD_BYTES = 256
+
+# A partial summary maps key -> [count, rule_id, api, attributes, examples]
+Partial = dict[str, list]
+
+
+def summary_key(rule_id: str, api: str, attributes: dict[str, Any]) -> str:
+    """Builds the aggregation key; attributes are normalized by sorting keys."""
+    normalized = json.dumps(
+        attributes, sort_keys=True, ensure_ascii=False, default=json_default
+    )
+    digest = hashlib.md5(normalized.encode()).hexdigest()
+    return f"{rule_id}\x1f{api}\x1f{digest}"
+
+
+def summarize_chunk(
+    matches: list[tuple[Any, dict[str, Any]]], max_examples: int
+) -> Partial:
+    """Aggregates (entry id, compact match) pairs of a single chunk."""
+    partial: Partial = {}
+    for entry_id, match in matches:
+        key = summary_key(match["rule_id"], match["api"], match["attributes"])
+        record = partial.get(key)
+        if record is None:
+            record = partial[key] = [
+                0,
+                match["rule_id"],
+                match["api"],
+                match["attributes"],
+                [],
+            ]
+        record[0] += 1
+        if len(record[4]) < max_examples:
+            record[4].append({"input": match["sources"]["input"], "id": entry_id})
+    return partial
+
+
+def _merge_record(into: list, other: list, max_examples: int) -> None:
+    """Adds `other` into `into`; both are [count, rule_id, api, attrs, examples]."""
+    into[0] += other[0]
+    room = max_examples - len(into[4])
+    if room > 0:
+        into[4].extend(other[4][:room])
+
+
+class SummaryAggregator:
+    """Merges partial summaries within a memory budget, spilling to disk beyond it."""
+
+    def __init__(self, budget_mb: int = 256, max_examples: int = 3):
+        self.budget = budget_mb * 1024**2
+        self.max_examples = max_examples
+        self.records: Partial = {}
+        self.size = 0
+        self.runs: list[str] = []
+        self.spill_dir: str | None = None
+
+    def merge(self, partial: Partial) -> None:
+        for key, record in partial.items():
+            current = self.records.get(key)
+            if current is None:
+                self.records[key] = record
+                self.size += KEY_OVERHEAD_BYTES + len(key) + len(str(record[3]))
+            else:
+                _merge_record(current, record, self.max_examples)
+        if self.size > self.budget:
+            self._spill()
+
+    def _spill(self) -> None:
+        """Write the in-memory records as a sorted run and start afresh."""
+        if self.spill_dir is None:
+            self.spill_dir = tempfile.mkdtemp(prefix="ioc-summary-")
+        path = os.path.join(self.spill_dir, f"run-{len(self.runs):05}.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            for key in sorted(self.records):
+                f.write(
+                    json.dumps(
+                        [key, *self.records[key]],
+                        ensure_ascii=False,
+                        default=json_default,
+                    )
+                )
+                f.write("\n")
+        logger.debug(f"Spilled {len(self.records)} summary keys to {path}")
+        self.runs.append(path)
+        self.records = {}
+        self.size = 0
+
+    @staticmethod
+    def _read_run(path: str) -> Iterator[list]:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        """Yield compact summary records ordered by key, merging spilled runs."""
+        in_memory = ([key, *self.records[key]] for key in sorted(self.records))
+        runs = [self._read_run(path) for path in self.runs]
+        current_key, current = None, None
+        for key, *record in heapq.merge(in_memory, *runs, key=lambda r: r[0]):
+            if key == current_key:
+                _merge_record(current, record, self.max_examples)
+                continue
+            if current is not None:
+                yield self._to_match(current)
+            current_key, current = key, record
+        if current is not None:
+            yield self._to_match(current)
+
+    @staticmethod
+    def _to_match(record: list) -> dict[str, Any]:
+        count, rule_id, api, attributes, examples = record
+        return {
+            "rule_id": rule_id,
+            "api": api,
+            "attributes": attributes,
+            "count": count,
+            "examples": examples,
+        }
+
+    def close(self) -> None:
+        if self.spill_dir:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+            self.spill_dir = None
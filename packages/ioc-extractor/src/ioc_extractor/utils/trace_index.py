@@ -0,0 +1,256 @@
+"""
+Sidecar trace index (`ioc-extractor index`), stored next to the trace as
+`<trace>.idx`.
+
+For every entry of the trace's JSON array the index holds its byte range, its
+`id` and the fields rules most often filter on (`api`, `module`,
+`metadata.pid`).
+`analyze` uses a valid index to decide, without parsing the trace, which
+entries no rule can match, and reads only the others by seeking to them.
+
+Layout: the magic, a 4-byte little-endian header length, a JSON header (trace
+size, mtime and SHA-256, string tables and column layout), then the columns as
+raw `array` buffers. An index is stale once the trace size changes, or its
+mtime changes and the content hash no longer matches.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from common.logger import get_logger
+from ioc_extractor.engine.matcher import may_match
+from ioc_extractor.engine.sequence import split_rules
+from ioc_extractor.utils.entry_filter import NO_ID
+from ioc_extractor.utils.io import file_sha256, load_entry, scan_entries
+
+logger = get_logger(__name__)
+
+INDEX_MAGIC = b"IOCIDX\x01\n"
+INDEX_VERSION = 2
+# Selectors answered by the index, as rules write them
+INDEXED_FIELDS = frozenset({"api", "module", "metadata.pid"})
+
+
+def index_path(trace: str) -> Path:
+    return Path(f"{trace}.idx")
+
+
+class _StringTable:
+    def __init__(self):
+        self.values: list = []
+        self.ids: dict = {}
+
+    def id(self, value) -> int:
+        key = json.dumps(value, default=str)
+        if key not in self.ids:
+            self.ids[key] = len(self.values)
+            self.values.append(value)
+        return self.ids[key]
+
+
+class TraceIndex:
+    """Columns of a trace index, one row per entry in trace order."""
+
+    def __init__(self, header: dict[str, Any], columns: dict[str, array]):
+        self.header = header
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.columns["offset"])
+
+    @staticmethod
+    def build(trace: str) -> "TraceIndex":
+        stat = os.stat(trace)
+        columns = {
+            "offset": array("Q"),
+            "length": array("I"),
+            "api": array("I"),
+            "module": array("I"),
+            "pid": array("I"),
+            "id": array("q"),
+        }
+        tables = {name: _StringTable() for name in ("api", "module", "pid")}
+        with (
+            open(trace, "rb") as f,
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data,
+        ):
+            for offset, length in scan_entries(data):
+                entry = load_entry(data[offset : offset + length])
+                metadata = entry.get("metadata")
+                pid = metadata.get("pid") if isinstance(metadata, dict) else None
+                columns["offset"].append(offset)
+                columns["length"].append(length)
+                columns["api"].append(tables["api"].id(entry.get("api")))
+                columns["module"].append(tables["module"].id(entry.get("module")))
+                columns["pid"].append(tables["pid"].id(pid))
+                entry_id = entry.get("id")
+                columns["id"].append(
+                    entry_id
+                    if isinstance(entry_id, int) and NO_ID < entry_id < 2**63
+                    else NO_ID
+                )
+        header = {
+            "version": INDEX_VERSION,
+            "trace": {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "sha256": file_sha256(trace),
+            },
+            "entries": len(columns["offset"]),
+            "tables": {name: table.values for name, table in tables.items()},
+            "byteorder": sys.byteorder,
+            "columns": [
+                [name, col.typecode, len(col)] for name, col in columns.items()
+            ],
+        }
+        return TraceIndex(header, columns)
+
+    def save(self, path: Path) -> None:
+        header = json.dumps(self.header, default=str).encode("utf-8")
+        tmp = path.with_name(f".{path.name}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(INDEX_MAGIC)
+            f.write(struct.pack("<I", len(header)))
+            f.write(header)
+            for column in self.columns.values():
+                column.tofile(f)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _read_header(f, path: Path) -> dict[str, Any]:
+        if f.read(len(INDEX_MAGIC)) != INDEX_MAGIC:
+            raise ValueError(f"Not a trace index: {path}")
+        (size,) = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(size))
+        if header.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported index version in {path}")
+        return header
+
+    @staticmethod
+    def load(path: Path) -> "TraceIndex":
+        with open(path, "rb") as f:
+            header = TraceIndex._read_header(f, path)
+            columns = {}
+            for name, typecode, count in header["columns"]:
+                column = array(typecode)
+                column.fromfile(f, count)
+                if header["byteorder"] != sys.byteorder:
+                    column.byteswap()
+                columns[name] = column
+        return TraceIndex(header, columns)
+
+    def is_current(self, trace: str) -> bool:
+        """Whether the index still describes `trace` (hashing only on mtime change)."""
+        return _describes(self.header, trace)
+
+    def fields(self, row: int) -> dict[str, Any]:
+        """The indexed fields of an entry, shaped like the entry itself."""
+        tables = self.header["tables"]
+        return {
+            "api": tables["api"][self.columns["api"][row]],
+            "module": tables["module"][self.columns["module"][row]],
+            "metadata": {"pid": tables["pid"][self.columns["pid"][row]]},
+        }
+
+    def select(
+        self,
+        keep: Callable[[dict[str, Any]], bool],
+        keep_id: Optional[Callable[[int], bool]] = None,
+    ) -> list[int]:
+        """
+        Rows whose indexed fields pass `keep` (evaluated once per distinct set)
+        and whose id passes `keep_id`; rows without an integer id are kept.
+        """
+        verdicts: dict[tuple, bool] = {}
+        api, module, pid = (self.columns[c] for c in ("api", "module", "pid"))
+        ids = self.columns["id"]
+        rows = []
+        for row in range(len(self)):
+            if keep_id is not None and ids[row] != NO_ID and not keep_id(ids[row]):
+                continue
+            key = (api[row], module[row], pid[row])
+            verdict = verdicts.get(key)
+            if verdict is None:
+                verdict = verdicts[key] = keep(self.fields(row))
+            if verdict:
+                rows.append(row)
+        return rows
+
+    def read_chunks(
+        self, trace: str, rows: list[int], chunk_size: int
+    ) -> Iterator[list[dict]]:
+        """Yield chunks of the entries at `rows`, read by seeking to each one."""
+        offsets, lengths = self.columns["offset"], self.columns["length"]
+        chunk = []
+        with open(trace, "rb") as f:
+            for row in rows:
+                f.seek(offsets[row])
+                chunk.append(load_entry(f.read(lengths[row])))
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+        if chunk:
+            yield chunk
+
+
+def _describes(header: dict[str, Any], trace: str) -> bool:
+    stat = os.stat(trace)
+    info = header["trace"]
+    if stat.st_size != info["size"]:
+        return False
+    if stat.st_mtime_ns == info["mtime_ns"]:
+        return True
+    return file_sha256(trace) == info["sha256"]
+
+
+def has_current_index(trace: str) -> bool:
+    """Whether `load_current_index` would return an index, reading only its header."""
+    path = index_path(trace)
+    if not path.exists():
+        return False
+    try:
+        with open(path, "rb") as f:
+            header = TraceIndex._read_header(f, path)
+    except (OSError, ValueError):
+        return False
+    return _describes(header, trace)
+
+
+def load_current_index(trace: str) -> Optional[TraceIndex]:
+    """The index of `trace` if there is one and it is not stale."""
+    path = index_path(trace)
+    if not path.exists():
+        return None
+    try:
+        index = TraceIndex.load(path)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable index {path}: {e}")
+        return None
+    if not index.is_current(trace):
+        logger.warning(f"Ignoring stale index {path}; rebuild it with 'index'")
+        return None
+    return index
+
+
+def rule_filter(rules: list[dict]) -> Optional[Callable[[dict[str, Any]], bool]]:
+    """
+    Predicate telling from an entry's indexed fields whether any rule may
+    match it, or None when entries cannot be skipped: sequence rules count
+    every entry towards their windows.
+    """
+    single_rules, sequence_rules = split_rules(rules)
+    if sequence_rules:
+        return None
+    wheres = [rule["variant"].get("where") for rule in single_rules]
+
+    def keep(fields: dict[str, Any]) -> bool:
+        return any(may_match(fields, where, INDEXED_FIELDS) for where in wheres)
+
+    return keep
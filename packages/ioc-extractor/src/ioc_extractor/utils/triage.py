@@ -0,0 +1,40 @@
+"""
+Triage output of `analyze --triage`.
+
+Triage answers "which behaviors are in this trace" without extracting
+anything: workers evaluate only the `where` clause of each rule (no
+selectors, transforms or match encoding) and report per-rule hit counts with
+the ids of a few hits. The output holds one record per rule that hit, with its
+count and the ids of its first hits in each input.
+"""
+
+from collections import defaultdict
+from typing import Any
+
+
+class TriageAggregator:
+    """
+    Collects example entry ids per rule, up to `max_examples` per input. Chunks
+    must be added in input order for these to be the first hits.
+    """
+
+    def __init__(self, max_examples: int = 3):
+        self.max_examples = max_examples
+        self.examples: dict[str, list[dict[str, Any]]] = defaultdict(list)
+        self.kept: dict[tuple[str, str], int] = defaultdict(int)
+
+    def add(self, examples: dict[str, list], source_file: str) -> None:
+        """Fold the example ids of a chunk of `source_file` in."""
+        for rule, ids in examples.items():
+            room = self.max_examples - self.kept[rule, source_file]
+            for entry_id in ids[: max(room, 0)]:
+                self.examples[rule].append({"input": source_file, "id": entry_id})
+                self.kept[rule, source_file] += 1
+
+    def records(self, counts: dict[str, int]) -> list[dict[str, Any]]:
+        """One record per rule with hits, most frequent first."""
+        return [
+            {"rule": rule, "count": count, "examples": self.examples.get(rule, [])}
+            for rule, count in sorted(counts.items(), key=lambda kv: -kv[1])
+            if count
+        ]
@@ -0,0 +1,91 @@
+import json
+import random
+from pathlib import Path
+
+import pytest
+from ioc_extractor.rules.rule_loader import load_query_rules
+from ioc_extractor.utils import checkpoint
+
+RULES = {
+    "read-file.yaml": """
+meta:
+  name: read_file
+  categories: [filesystem]
+variants:
+  - select:
+      - field: duration
+        alias: duration
+    where:
+      regex: ["api", "(?i)^ReadFile"]
+""",
+    "open-key.yaml": """
+meta:
+  name: open_key
+  categories: [registry]
+variants:
+  - select:
+      - field: parameters[?name=='hKey'].pre_value
+        alias: key
+    where:
+      regex: ["api", "(?i)^RegOpenKey"]
+""",
+}
+APIS = ["ReadFile", "RegOpenKeyExW", "CloseHandle", "HeapAlloc"]
+
+
+def write_trace(path: Path, entries: int, seed: int = 0) -> Path:
+    """A synthetic API Monitor trace; durations are non-integral numbers."""
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[\n")
+        for i in range(entries):
+            entry = {
+                "id": i + 1,
+                "module": "kernel32.dll",
+                "api": f"{rng.choice(APIS)} ( 0x1 )",
+                "return_value": "0x0",
+                "duration": round(rng.random() / 7, 6),
+                "parameters": [
+                    {"name": "hKey", "pre_value": f"0x{rng.randint(1, 5):x}"}
+                ],
+                "metadata": {"pid": rng.choice([100, 200])},
+            }
+            f.write(("," if i else "") + json.dumps(entry) + "\n")
+        f.write("]\n")
+    return path
+
+
+class Killed(Exception):
+    """Stands in for the process being killed mid-run."""
+
+
+def kill_after(monkeypatch, chunks: int) -> None:
+    """Make runs stop right after checkpointing `chunks` chunks."""
+    update = checkpoint.Checkpointer.update
+
+    def killing_update(self, next_seq, *args):
+        update(self, next_seq, *args)
+        if next_seq >= chunks:
+            raise Killed
+
+    monkeypatch.setattr(checkpoint.Checkpointer, "update", killing_update)
+
+
+@pytest.fixture
+def patterns(tmp_path: Path) -> Path:
+    directory = tmp_path / "patterns"
+    directory.mkdir()
+    for name, text in RULES.items():
+        (directory / name).write_text(text, encoding="utf-8")
+    return directory
+
+
+@pytest.fixture
+def rules(patterns: Path, tmp_path: Path, monkeypatch) -> list[dict]:
+    monkeypatch.setenv("IOC_EXTRACTOR_CACHE_DIR", str(tmp_path / "cache"))
+    return load_query_rules([patterns])
+
+
+@pytest.fixture
+def trace(tmp_path: Path) -> Path:
+    return write_trace(tmp_path / "trace.json", 3000)
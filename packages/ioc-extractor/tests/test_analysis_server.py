@@ -0,0 +1,89 @@
+import os
+import time
+
+import pytest
+from ioc_extractor.utils.analysis_server import (
+    AnalysisService,
+    RuleSet,
+    create_app,
+    parse_job_options,
+)
+
+
+@pytest.fixture
+def service(patterns, tmp_path, monkeypatch):
+    monkeypatch.setenv("IOC_EXTRACTOR_CACHE_DIR", str(tmp_path / "cache"))
+    service = AnalysisService(RuleSet([patterns]), 1, work_dir=tmp_path / "jobs")
+    yield service
+    service.close()
+
+
+def wait_done(service, job_id, timeout=60.0):
+    deadline = time.time() + timeout
+    while not service.jobs[job_id].done:
+        assert time.time() < deadline, "job did not finish"
+        time.sleep(0.05)
+    return service.jobs[job_id]
+
+
+def test_parse_job_options_coerces_form_strings():
+    options = parse_job_options({"chunk": "200", "compact": "true", "ordered": "0"})
+    assert options == {
+        "chunk": 200,
+        "compact": True,
+        "ordered": False,
+        "summarize": False,
+    }
+
+
+@pytest.mark.parametrize(
+    "options",
+    [{"chunk": "abc"}, {"chunk": -1}, {"chunk": True}, {"compact": "maybe"}, {"x": 1}],
+)
+def test_invalid_options_are_rejected(service, trace, options):
+    client = create_app(service).test_client()
+    response = client.post("/jobs", json={"input": str(trace), **options})
+    assert response.status_code == 400
+    assert service.jobs == {}
+
+
+def test_invalid_upload_options_leave_no_file(service, trace):
+    client = create_app(service).test_client()
+    with open(trace, "rb") as f:
+        response = client.post("/jobs", data={"trace": f, "chunk": "abc"})
+    assert response.status_code == 400
+    assert list(service.work_dir.iterdir()) == []
+
+
+def test_bad_options_submitted_directly_fail_the_job(service, trace):
+    job = service.submit(str(trace), {"chunk": "abc"}, upload=False)
+    job = wait_done(service, job.id)
+    assert job.status == "failed"
+    assert "chunk" in job.error
+
+
+def test_broken_pool_is_replaced(service, trace):
+    broken = service.pool
+    broken.submit(os._exit, 1)
+    failed = wait_done(service, service.submit(str(trace), {}, upload=False).id)
+    assert failed.status == "failed"
+    assert service.pool is not broken
+
+    done = wait_done(service, service.submit(str(trace), {}, upload=False).id)
+    assert done.status == "done"
+    assert done.counts
+
+
+def test_reload_keeps_rules_when_a_pattern_file_vanishes(
+    patterns, tmp_path, monkeypatch
+):
+    monkeypatch.setenv("IOC_EXTRACTOR_CACHE_DIR", str(tmp_path / "cache"))
+    rules = RuleSet([patterns])
+    loaded = rules.snapshot()
+
+    def vanished():
+        raise FileNotFoundError(patterns / "open-key.yaml")
+
+    monkeypatch.setattr(rules, "_current_stamp", vanished)
+    assert rules.reload() is False
+    assert rules.snapshot() == loaded
@@ -0,0 +1,76 @@
+import pytest
+from ioc_extractor.rules.rule_loader import load_query_rules
+from ioc_extractor.utils.pipeline_executor import PipelineOptions, run_pipeline
+
+# Scalar conditions combined with and/or/not and with non-scalar ones
+MIXED_RULES = {
+    "reads-of-200.yaml": """
+meta: {name: reads_of_200, categories: [test]}
+variants:
+  - select: [{field: id, alias: id}]
+    where:
+      and:
+        - regex: ["api", "(?i)^ReadFile"]
+        - eq: ["metadata.pid", 200]
+""",
+    "heap-outside-kernelbase.yaml": """
+meta: {name: heap_outside_kernelbase, categories: [test]}
+variants:
+  - where:
+      and:
+        - regex: ["api", "(?i)^Heap"]
+        - not: {eq: ["module", "KERNELBASE.dll"]}
+""",
+    "close-or-registry.yaml": """
+meta: {name: close_or_registry, categories: [test]}
+variants:
+  - select: [{field: "parameters[?name=='hKey'].pre_value", alias: key}]
+    where:
+      or:
+        - regex: ["api", "(?i)^CloseHandle"]
+        - and:
+            - eq: ["return_value", "0x0"]
+            - regex: ["api", "(?i)^RegOpenKey"]
+""",
+    "pid-100.yaml": """
+meta: {name: pid_100, categories: [test]}
+variants:
+  - where:
+      eq: ["metadata.pid", 100]
+""",
+}
+
+
+@pytest.fixture
+def mixed_rules(tmp_path, monkeypatch):
+    monkeypatch.setenv("IOC_EXTRACTOR_CACHE_DIR", str(tmp_path / "cache"))
+    directory = tmp_path / "mixed"
+    directory.mkdir()
+    for name, text in MIXED_RULES.items():
+        (directory / name).write_text(text, encoding="utf-8")
+    return load_query_rules([directory])
+
+
+@pytest.mark.parametrize(
+    "options", [{}, {"compact": True}, {"summarize": True}, {"triage": True}]
+)
+def test_batch_prefilter_does_not_change_results(trace, mixed_rules, tmp_path, options):
+    outputs = {}
+    for batch in (False, True):
+        output = tmp_path / f"batch-{batch}.json"
+        counts, _ = run_pipeline(
+            [str(trace)],
+            {str(trace): 300},
+            2,
+            mixed_rules,
+            PipelineOptions(
+                output_path=str(output),
+                ordered=True,
+                show_matches=False,
+                batch=batch,
+                **options,
+            ),
+        )
+        outputs[batch] = (dict(counts), output.read_bytes())
+    assert len(outputs[False][0]) == 4
+    assert outputs[True] == outputs[False]
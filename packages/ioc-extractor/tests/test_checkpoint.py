@@ -0,0 +1,51 @@
+import json
+
+import pytest
+from conftest import Killed, kill_after
+from ioc_extractor.utils.pipeline_executor import PipelineOptions, run_pipeline
+from ioc_extractor.utils.trace_index import TraceIndex, index_path
+
+
+def analyze(trace, rules, output, **options):
+    run_pipeline(
+        [str(trace)],
+        {str(trace): 100},
+        2,
+        rules,
+        PipelineOptions(
+            output_path=str(output),
+            show_matches=False,
+            strict=True,
+            **options,
+        ),
+    )
+    return json.loads(output.read_text(encoding="utf-8"))
+
+
+def test_resume_refuses_an_index_built_after_the_checkpoint(
+    trace, rules, tmp_path, monkeypatch
+):
+    expected = analyze(trace, rules, tmp_path / "expected.json", ordered=True)
+    output = tmp_path / "out.json"
+
+    with monkeypatch.context() as patch:
+        kill_after(patch, 5)
+        with pytest.raises(Killed):
+            analyze(trace, rules, output, checkpoint_every=1e-6)
+    TraceIndex.build(str(trace)).save(index_path(str(trace)))
+
+    with pytest.raises(ValueError, match="Options differ"):
+        analyze(trace, rules, output, resume=True)
+    assert analyze(trace, rules, output, resume=True, use_index=False) == expected
+
+
+def test_resume_keeps_reading_through_the_index(trace, rules, tmp_path, monkeypatch):
+    expected = analyze(trace, rules, tmp_path / "expected.json", ordered=True)
+    TraceIndex.build(str(trace)).save(index_path(str(trace)))
+    output = tmp_path / "out.json"
+
+    with monkeypatch.context() as patch:
+        kill_after(patch, 5)
+        with pytest.raises(Killed):
+            analyze(trace, rules, output, checkpoint_every=1e-6)
+    assert analyze(trace, rules, output, resume=True) == expected
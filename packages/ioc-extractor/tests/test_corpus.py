@@ -0,0 +1,32 @@
+from conftest import write_trace
+from ioc_extractor.output.handler import COMPACT_FORMAT
+from ioc_extractor.utils.corpus import MANIFEST_NAME, run_corpus
+
+
+def analyzed(output_dir):
+    return len((output_dir / MANIFEST_NAME).read_text(encoding="utf-8").splitlines())
+
+
+def test_output_option_changes_reanalyze_traces(rules, tmp_path):
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    for seed in range(2):
+        write_trace(corpus / f"trace-{seed}.json", 500, seed=seed)
+    output_dir = tmp_path / "results"
+
+    run_corpus(corpus, output_dir, rules, 1, 200)
+    assert analyzed(output_dir) == 2
+    run_corpus(corpus, output_dir, rules, 1, 200)
+    assert analyzed(output_dir) == 2
+
+    summary = run_corpus(corpus, output_dir, rules, 1, 200, compact=True)
+    assert analyzed(output_dir) == 4
+    assert summary["status"] == {"done": 2}
+    for seed in range(2):
+        output = (output_dir / f"trace-{seed}.json").read_text(encoding="utf-8")
+        assert COMPACT_FORMAT in output
+
+    run_corpus(corpus, output_dir, rules, 1, 200, compact=True, triage=True)
+    assert analyzed(output_dir) == 6
+    run_corpus(corpus, output_dir, rules, 1, 200, compact=True, triage=True)
+    assert analyzed(output_dir) == 6
@@ -0,0 +1,169 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import Listener
+
+import pytest
+from ioc_extractor import app
+from ioc_extractor.utils import autotune, distributed, pipeline_executor
+from ioc_extractor.utils.distributed import RemoteExecutor, _serve_coordinator
+from ioc_extractor.utils.pipeline_executor import PipelineOptions, run_pipeline
+from typer.testing import CliRunner
+
+AUTHKEY = b"secret"
+
+
+class FakeRemote(ThreadPoolExecutor):
+    """Stands in for `RemoteExecutor`, running chunks on local threads."""
+
+    def __init__(self, capacity):
+        super().__init__(max_workers=2)
+        self.capacity = capacity
+        self.workers = ["a", "b"]
+
+
+def _fail(*args):
+    raise RuntimeError("worker pool broken")
+
+
+class FailingPool(ThreadPoolExecutor):
+    """A worker's pool on which every chunk fails."""
+
+    def submit(self, fn, /, *args, **kwargs):
+        return super().submit(_fail)
+
+
+@pytest.fixture
+def start_worker():
+    """Serve one coordinator connection per call on an in-process worker."""
+    listeners, pools = [], []
+
+    def start(pool=None, hang=False):
+        pool = pool or ThreadPoolExecutor(max_workers=2)
+        pools.append(pool)
+        listener = Listener(("127.0.0.1", 0), authkey=AUTHKEY)
+        listeners.append(listener)
+
+        def accept():
+            conn = listener.accept()
+            if not hang:
+                _serve_coordinator(conn, pool, 2, heartbeat_interval=0.1)
+                return
+            # Takes chunks but never answers nor sends a heartbeat
+            conn.send(("hello", 2))
+            try:
+                while True:
+                    conn.recv()
+            except (EOFError, OSError):
+                pass
+
+        threading.Thread(target=accept, daemon=True).start()
+        return listener.address
+
+    yield start
+    for listener in listeners:
+        listener.close()
+    for pool in pools:
+        pool.shutdown(wait=False)
+
+
+def analyze(trace, rules, output, executor=None, **options):
+    counts, _ = run_pipeline(
+        [str(trace)],
+        {str(trace): 200},
+        4,
+        rules,
+        PipelineOptions(
+            output_path=str(output),
+            ordered=True,
+            show_matches=False,
+            **options,
+        ),
+        executor=executor,
+    )
+    return dict(counts), json.loads(output.read_text(encoding="utf-8"))
+
+
+def test_remote_threads_follow_worker_capacity(trace, patterns, tmp_path, monkeypatch):
+    monkeypatch.setenv("IOC_EXTRACTOR_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(
+        distributed, "connect_workers", lambda *args: FakeRemote(capacity=7)
+    )
+
+    def no_tuning(*args, **kwargs):
+        raise AssertionError("auto-tuning measures this host, not the workers")
+
+    monkeypatch.setattr(autotune, "auto_tune_resources", no_tuning)
+    workers = []
+    run = pipeline_executor.run_pipeline
+
+    def recording_run(**kwargs):
+        workers.append(kwargs["workers"])
+        return run(**kwargs)
+
+    monkeypatch.setattr(pipeline_executor, "run_pipeline", recording_run)
+    result = CliRunner().invoke(
+        app,
+        [
+            "analyze",
+            *["-i", str(trace), "-p", str(patterns), "-o", str(tmp_path / "o.json")],
+            *["-w", "host-a:1", "--auth-key", "k"],
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    assert workers == [14]
+
+
+def test_remote_run_matches_local_run(trace, rules, tmp_path, start_worker):
+    expected = analyze(trace, rules, tmp_path / "local.json")
+    addresses = [start_worker(), start_worker()]
+    with RemoteExecutor(addresses, rules, AUTHKEY) as remote:
+        assert remote.capacity == 4
+        assert analyze(trace, rules, tmp_path / "remote.json", executor=remote) == (
+            expected
+        )
+
+
+def test_chunks_failing_on_a_worker_are_retried_elsewhere(
+    trace, rules, tmp_path, start_worker
+):
+    expected = analyze(trace, rules, tmp_path / "local.json")
+    addresses = [start_worker(FailingPool(max_workers=2)), start_worker()]
+    with RemoteExecutor(addresses, rules, AUTHKEY) as remote:
+        result = analyze(
+            trace, rules, tmp_path / "remote.json", executor=remote, strict=True
+        )
+    assert result == expected
+
+
+def test_chunks_failing_on_every_worker_fail_the_run(
+    trace, rules, tmp_path, start_worker
+):
+    addresses = [start_worker(FailingPool(max_workers=2)) for _ in range(2)]
+    with RemoteExecutor(addresses, rules, AUTHKEY) as remote:
+        with pytest.raises(RuntimeError, match="worker pool broken"):
+            analyze(
+                trace, rules, tmp_path / "remote.json", executor=remote, strict=True
+            )
+
+
+def test_failed_chunks_are_not_checkpointed(trace, rules, tmp_path, start_worker):
+    addresses = [start_worker(FailingPool(max_workers=2))]
+    output = tmp_path / "remote.json"
+    with RemoteExecutor(addresses, rules, AUTHKEY) as remote:
+        with pytest.raises(RuntimeError, match="worker pool broken"):
+            analyze(trace, rules, output, executor=remote, checkpoint_every=1e-6)
+    assert not output.with_name("remote.json.ckpt").exists()
+
+
+def test_silent_worker_is_dropped_and_its_chunks_reassigned(
+    trace, rules, tmp_path, start_worker
+):
+    expected = analyze(trace, rules, tmp_path / "local.json")
+    addresses = [start_worker(hang=True), start_worker()]
+    with RemoteExecutor(addresses, rules, AUTHKEY, heartbeat_timeout=0.5) as remote:
+        result = analyze(
+            trace, rules, tmp_path / "remote.json", executor=remote, strict=True
+        )
+        assert [w.alive for w in remote.workers] == [False, True]
+    assert result == expected
@@ -0,0 +1,40 @@
+import json
+from decimal import Decimal
+
+from ioc_extractor.utils.io import follow_json_chunks, read_json_chunks
+from ioc_extractor.utils.pipeline_executor import PipelineOptions, run_pipeline
+
+
+def test_follow_reads_numbers_like_batch(trace):
+    batch = [e for chunk in read_json_chunks(trace, 500) for e in chunk]
+    followed = [
+        e
+        for chunk in follow_json_chunks(trace, 500, poll_interval=0.01, idle_timeout=1)
+        for e in chunk
+    ]
+    assert isinstance(batch[0]["duration"], Decimal)
+    assert followed == batch
+
+
+def test_follow_output_matches_batch_output(trace, rules, tmp_path):
+    outputs = {}
+    for follow in (False, True):
+        output = tmp_path / f"follow-{follow}.json"
+        run_pipeline(
+            [str(trace)],
+            {str(trace): 500},
+            2,
+            rules,
+            PipelineOptions(
+                output_path=str(output),
+                ordered=True,
+                show_matches=False,
+                follow=follow,
+                follow_timeout=1,
+                flush_interval=0.1,
+                use_index=False,
+            ),
+        )
+        outputs[follow] = json.loads(output.read_text(encoding="utf-8"))
+    assert any("duration" in m["attributes"] for m in outputs[False])
+    assert outputs[True] == outputs[False]
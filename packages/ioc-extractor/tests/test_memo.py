@@ -0,0 +1,58 @@
+import json
+import random
+
+import pytest
+from conftest import APIS
+from ioc_extractor.utils.pipeline_executor import PipelineOptions, run_pipeline
+
+# Distinct calls in the looping trace; the smaller memo cannot hold them all
+DISTINCT_CALLS = 40
+
+
+@pytest.fixture
+def looping_trace(tmp_path):
+    """A trace repeating a few calls, each repeat with its own id."""
+    rng = random.Random(1)
+    calls = [
+        {
+            "module": "kernel32.dll",
+            "api": f"{APIS[i % len(APIS)]} ( 0x1 )",
+            "return_value": "0x0",
+            "duration": round(rng.random(), 3),
+            "parameters": [{"name": "hKey", "pre_value": f"0x{i:x}"}],
+            "metadata": {"pid": 100},
+        }
+        for i in range(DISTINCT_CALLS)
+    ]
+    entries = [{"id": i + 1} | rng.choice(calls) for i in range(3000)]
+    path = tmp_path / "looping.json"
+    path.write_text(json.dumps(entries), encoding="utf-8")
+    return path
+
+
+@pytest.mark.parametrize(
+    "options", [{}, {"summarize": True}, {"triage": True}, {"batch": True}]
+)
+@pytest.mark.parametrize("memo_size", [4, 1000])
+def test_memo_does_not_change_results(
+    looping_trace, rules, tmp_path, options, memo_size
+):
+    outputs = {}
+    for size in (0, memo_size):
+        output = tmp_path / f"memo-{size}.json"
+        counts, _ = run_pipeline(
+            [str(looping_trace)],
+            {str(looping_trace): 250},
+            2,
+            rules,
+            PipelineOptions(
+                output_path=str(output),
+                ordered=True,
+                show_matches=False,
+                memo_size=size,
+                **options,
+            ),
+        )
+        outputs[size] = (dict(counts), output.read_bytes())
+    assert set(outputs[0][0]) == {"read_file", "open_key"}
+    assert outputs[memo_size] == outputs[0]
@@ -0,0 +1,92 @@
+import pytest
+from ioc_extractor import app
+from ioc_extractor.utils.pipeline_executor import (
+    ChunkResult,
+    ReorderBuffer,
+    resolve_rule_shards,
+)
+from typer.testing import CliRunner
+
+# Overlapping rules, so first-match precedence decides which one reports an entry
+OVERLAPPING = {
+    "1-read-file": "(?i)^ReadFile",
+    "2-handles": "(?i)^(ReadFile|CloseHandle)",
+    "3-heap": "(?i)^Heap",
+    "4-registry": "(?i)^RegOpenKey",
+    "5-close-or-open": "(?i)^(CloseHandle|RegOpenKey)",
+    "6-any": ".",
+}
+
+
+@pytest.fixture
+def overlapping(tmp_path):
+    directory = tmp_path / "overlapping"
+    directory.mkdir()
+    for name, regex in OVERLAPPING.items():
+        (directory / f"{name}.yaml").write_text(
+            f"meta:\n  name: {name}\n  categories: [test]\nvariants:\n"
+            f"  - select:\n      - field: id\n        alias: id\n"
+            f'    where:\n      regex: ["api", "{regex}"]\n',
+            encoding="utf-8",
+        )
+    return directory
+
+
+@pytest.mark.parametrize("extra", [[], ["--compact"], ["--summarize"]])
+def test_rule_partition_output_is_identical(
+    trace, overlapping, tmp_path, monkeypatch, extra
+):
+    monkeypatch.setenv("IOC_EXTRACTOR_CACHE_DIR", str(tmp_path / "cache"))
+    outputs = {}
+    for partition in ("entries", "rules"):
+        output = tmp_path / f"{partition}.json"
+        result = CliRunner().invoke(
+            app,
+            [
+                "analyze",
+                *["-i", str(trace), "-p", str(overlapping), "-o", str(output)],
+                *["-t", "3", "-c", "250", "--ordered", "--partition", partition],
+                *extra,
+            ],
+        )
+        assert result.exit_code == 0, result.output
+        outputs[partition] = output.read_bytes()
+    assert outputs["entries"]
+    assert outputs["rules"] == outputs["entries"]
+
+
+def test_resolve_rule_shards(trace, rules):
+    chunk_sizes = {str(trace): 100}
+    assert resolve_rule_shards("entries", [str(trace)], chunk_sizes, 4, rules) == 1
+    assert resolve_rule_shards("rules", [str(trace)], chunk_sizes, 4, rules) == 2
+    assert resolve_rule_shards("rules", [str(trace)], chunk_sizes, 1, rules) == 1
+    # 30 chunks already keep 4 workers busy
+    assert resolve_rule_shards("auto", [str(trace)], chunk_sizes, 4, rules) == 1
+
+
+def test_reorder_buffer_releases_in_sequence_order():
+    results = {seq: ChunkResult(entries=seq) for seq in range(6)}
+    buffer = ReorderBuffer(window=4)
+    assert buffer.push(2, results[2]) == []
+    assert buffer.push(1, results[1]) == []
+    assert buffer.has_room(3)
+    assert not buffer.has_room(4)
+    assert buffer.push(0, results[0]) == [results[0], results[1], results[2]]
+    assert buffer.next_seq == 3
+    assert buffer.has_room(6)
+    assert buffer.push(5, results[5]) == []
+    assert buffer.push(4, results[4]) == []
+    assert buffer.push(3, results[3]) == [results[3], results[4], results[5]]
+    assert buffer.held == {}
+
+
+def test_reorder_buffer_resumes_from_start_and_passes_through_without_window():
+    result = ChunkResult()
+    buffer = ReorderBuffer(window=2, start=10)
+    assert buffer.push(11, result) == []
+    assert buffer.push(10, result) == [result, result]
+    assert buffer.next_seq == 12
+
+    unordered = ReorderBuffer()
+    assert unordered.has_room(10**6)
+    assert unordered.push(7, result) == [result]
@@ -0,0 +1,22 @@
+from ioc_extractor.utils import resource_monitor
+from ioc_extractor.utils.resource_monitor import (
+    record_entries,
+    with_resource_monitoring,
+)
+
+
+def test_each_monitored_run_counts_only_its_own_entries(monkeypatch):
+    reported = []
+    monkeypatch.setattr(
+        resource_monitor,
+        "_summarize",
+        lambda stats, duration: reported.append(stats.entries),
+    )
+
+    @with_resource_monitoring(enabled=True)
+    def run(entries):
+        record_entries(entries)
+
+    run(100)
+    run(40)
+    assert reported == [100, 40]
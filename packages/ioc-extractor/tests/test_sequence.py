@@ -0,0 +1,250 @@
+import json
+
+import pytest
+from ioc_extractor.engine import sequence
+from ioc_extractor.engine.sequence import (
+    SequenceTracker,
+    build_sequence_match,
+    evaluate_steps,
+)
+from ioc_extractor.rules.rule_loader import load_query_rules
+from ioc_extractor.utils.pipeline_executor import PipelineOptions, run_pipeline
+
+INJECTION = """
+meta:
+  name: injection
+  categories: [process]
+sequences:
+  - name: chain
+    key: metadata.pid
+    window:
+      events: 50
+    steps:
+      - name: open
+        where: { regex: ["api", "(?i)^OpenProcess"] }
+        capture:
+          - field: return_value
+            alias: handle
+      - name: write
+        where: { regex: ["api", "(?i)^WriteProcessMemory"] }
+        join:
+          - field: parameters[?name=='hProcess'].pre_value
+            alias: handle
+      - name: thread
+        where: { regex: ["api", "(?i)^CreateRemoteThread"] }
+        join:
+          - field: parameters[?name=='hProcess'].pre_value
+            alias: handle
+"""
+TIMED = """
+meta:
+  name: timed
+  categories: [process]
+sequences:
+  - name: chain
+    window:
+      seconds: 2
+      time_field: rel_time
+    steps:
+      - name: open
+        where: { regex: ["api", "(?i)^OpenProcess"] }
+      - name: thread
+        where: { regex: ["api", "(?i)^CreateRemoteThread"] }
+"""
+
+
+def load_rule(tmp_path, text, monkeypatch):
+    monkeypatch.setenv("IOC_EXTRACTOR_CACHE_DIR", str(tmp_path / "cache"))
+    directory = tmp_path / "sequences"
+    directory.mkdir(exist_ok=True)
+    (directory / "rule.yaml").write_text(text, encoding="utf-8")
+    (rule,) = load_query_rules([directory])
+    return rule
+
+
+@pytest.fixture
+def injection(tmp_path, monkeypatch):
+    return load_rule(tmp_path, INJECTION, monkeypatch)
+
+
+def call(entry_id, api, pid=100, handle="0x10", rel_time=None):
+    entry = {
+        "id": entry_id,
+        "api": f"{api} ( 0x1 )",
+        "return_value": handle if api == "OpenProcess" else "0x1",
+        "parameters": [{"name": "hProcess", "pre_value": handle}],
+        "metadata": {"pid": pid},
+    }
+    if rel_time is not None:
+        entry["rel_time"] = rel_time
+    return entry
+
+
+def track(tracker, rule, chunks, source="trace.json"):
+    """Feed `chunks` of entries in order, returning the completed runs."""
+    completed, base = [], 0
+    for chunk in chunks:
+        events = [
+            event
+            for index, entry in enumerate(chunk)
+            for event in evaluate_steps(index, entry, rule)
+        ]
+        completed += tracker.feed(events, base, source)
+        base += len(chunk)
+    return completed
+
+
+def chain(first_id, pid=100, handle="0x10"):
+    return [
+        call(first_id, "OpenProcess", pid, handle),
+        call(first_id + 1, "WriteProcessMemory", pid, handle),
+        call(first_id + 2, "CreateRemoteThread", pid, handle),
+    ]
+
+
+def test_evaluate_steps_reports_key_captures_and_joins(injection):
+    (open_event,) = evaluate_steps(3, call(7, "OpenProcess", handle="0xAB"), injection)
+    assert (open_event.index, open_event.entry_id, open_event.step) == (3, 7, 0)
+    assert open_event.api == "OpenProcess"
+    assert open_event.key == "100"
+    assert open_event.captures == {"handle": "0xAB"}
+
+    (write_event,) = evaluate_steps(0, call(8, "WriteProcessMemory"), injection)
+    assert write_event.step == 1
+    assert write_event.joins == {"handle": 16}
+    assert evaluate_steps(0, call(9, "CloseHandle"), injection) == []
+
+
+def test_chain_completes_across_chunks(injection):
+    tracker = SequenceTracker([injection])
+    entries = chain(1)
+    completed = track(
+        tracker, injection, [entries[:1], [call(2, "HeapAlloc")], entries[1:]]
+    )
+    ((rule, run),) = completed
+    assert rule is injection
+    assert [step["id"] for step in run.steps] == [1, 2, 3]
+    assert [step["name"] for step in run.steps] == ["open", "write", "thread"]
+    assert tracker.pending() == 0
+
+    match = build_sequence_match(rule, run, "trace.json", compact=False)
+    assert match["rule"]["name"] == "injection"
+    assert match["api"] == "CreateRemoteThread"
+    assert match["attributes"] == {"handle": "0x10"}
+    compact = build_sequence_match(rule, run, "trace.json", compact=True)
+    assert compact["rule_id"] == injection["variant"]["__id__"]
+
+
+def test_steps_of_another_key_or_handle_do_not_join(injection):
+    tracker = SequenceTracker([injection])
+    entries = [
+        call(1, "OpenProcess", pid=100),
+        call(2, "WriteProcessMemory", pid=200),
+        call(3, "CreateRemoteThread", pid=200),
+        call(4, "WriteProcessMemory", pid=100, handle="0x20"),
+        call(5, "CreateRemoteThread", pid=100, handle="0x20"),
+    ]
+    assert track(tracker, injection, [entries]) == []
+    assert tracker.pending() == 1
+
+
+def test_steps_of_another_input_do_not_join(injection):
+    tracker = SequenceTracker([injection])
+    entries = chain(1)
+    assert track(tracker, injection, [entries[:1]], source="a.json") == []
+    assert track(tracker, injection, [entries[1:]], source="b.json") == []
+
+
+def test_run_expires_outside_the_event_window(injection):
+    tracker = SequenceTracker([injection])
+    entries = chain(1)
+    gap = [call(10 + i, "HeapAlloc") for i in range(60)]
+    assert track(tracker, injection, [entries[:2], gap, entries[2:]]) == []
+
+    tracker = SequenceTracker([injection])
+    gap = [call(10 + i, "HeapAlloc") for i in range(40)]
+    assert len(track(tracker, injection, [entries[:2], gap, entries[2:]])) == 1
+
+
+def test_run_expires_outside_the_time_window(tmp_path, monkeypatch):
+    rule = load_rule(tmp_path, TIMED, monkeypatch)
+    late = [
+        call(1, "OpenProcess", rel_time="00:01.000"),
+        call(2, "CreateRemoteThread", rel_time="00:03.500"),
+    ]
+    assert track(SequenceTracker([rule]), rule, [late]) == []
+    soon = [
+        call(1, "OpenProcess", rel_time="00:01.000"),
+        call(2, "CreateRemoteThread", rel_time="00:02.500"),
+    ]
+    assert len(track(SequenceTracker([rule]), rule, [soon])) == 1
+
+
+def test_sweep_drops_runs_of_quiet_keys(injection, monkeypatch):
+    monkeypatch.setattr(sequence, "SWEEP_INTERVAL", 100)
+    tracker = SequenceTracker([injection])
+    track(tracker, injection, [chain(1)[:1]])
+    assert tracker.pending() == 1
+    # Another key keeps producing events; the first key never sees one again
+    busy = [[call(10 + i, "OpenProcess", pid=200, handle=f"0x{i}")] for i in range(60)]
+    track(
+        tracker,
+        injection,
+        [[call(2, "HeapAlloc")] * 60, *busy, [call(3, "HeapAlloc")] * 60],
+    )
+    assert "100" not in {key for _, _, key in tracker.runs}
+
+
+def test_oldest_run_is_evicted_beyond_the_limit(injection, monkeypatch):
+    monkeypatch.setattr(sequence, "MAX_RUNS_PER_KEY", 4)
+    tracker = SequenceTracker([injection])
+    opens = [call(i, "OpenProcess", handle=f"0x{i:x}") for i in range(1, 6)]
+    track(tracker, injection, [opens])
+    assert tracker.pending() == 4
+
+    def finish(handle):
+        return [
+            call(100, "WriteProcessMemory", handle=handle),
+            call(101, "CreateRemoteThread", handle=handle),
+        ]
+
+    assert track(tracker, injection, [finish("0x1")]) == []
+    ((_, run),) = track(tracker, injection, [finish("0x5")])
+    assert run.steps[0]["id"] == 5
+
+
+def test_pipeline_finds_chains_with_ordered_and_unordered_collection(
+    injection, tmp_path
+):
+    entries, pids = [], [100, 200, 300]
+    for i in range(40):
+        pid = pids[i % 3]
+        handle = f"0x{i:x}"
+        entries += [
+            call(len(entries) + 1, "OpenProcess", pid, handle),
+            call(len(entries) + 2, "HeapAlloc", pid),
+            call(len(entries) + 3, "WriteProcessMemory", pid, handle),
+            call(len(entries) + 4, "CreateRemoteThread", pid, handle),
+        ]
+    trace = tmp_path / "trace.json"
+    trace.write_text(json.dumps(entries), encoding="utf-8")
+
+    outputs = {}
+    for ordered in (True, False):
+        output = tmp_path / f"ordered-{ordered}.json"
+        run_pipeline(
+            [str(trace)],
+            {str(trace): 7},
+            3,
+            [injection],
+            PipelineOptions(
+                output_path=str(output),
+                ordered=ordered,
+                show_matches=False,
+            ),
+        )
+        outputs[ordered] = json.loads(output.read_text(encoding="utf-8"))
+
+    assert len(outputs[True]) == 40
+    assert [m["steps"][0]["id"] for m in outputs[True]] == list(range(1, 160, 4))
+    assert sorted(outputs[False], key=lambda m: m["steps"][0]["id"]) == outputs[True]
@@ -0,0 +1,85 @@
+import json
+
+import pytest
+from conftest import Killed, kill_after, write_trace
+from ioc_extractor import app
+from ioc_extractor.output import store
+from ioc_extractor.utils.pipeline_executor import PipelineOptions, run_pipeline
+from typer.testing import CliRunner
+
+
+def analyze(inputs, rules, output, **options):
+    run_pipeline(
+        [str(i) for i in inputs],
+        {str(i): 100 for i in inputs},
+        2,
+        rules,
+        PipelineOptions(
+            output_path=str(output),
+            ordered=True,
+            show_matches=False,
+            strict=True,
+            **options,
+        ),
+    )
+
+
+def stored(db, **filters):
+    conn = store.connect(db)
+    try:
+        return list(store.query_matches(conn, store.StoreQuery(**filters)))
+    finally:
+        conn.close()
+
+
+def test_store_round_trips_the_json_output(trace, rules, tmp_path):
+    analyze([trace], rules, tmp_path / "out.json")
+    expected = json.loads((tmp_path / "out.json").read_text(encoding="utf-8"))
+    db = tmp_path / "results.db"
+
+    analyze([trace], rules, db)
+    analyze([trace], rules, db)
+    assert stored(db, runs=[1]) == expected
+    assert stored(db, runs=[2]) == expected
+
+    conn = store.connect(db)
+    runs = store.list_runs(conn)
+    conn.close()
+    assert [(run[0], run[3]) for run in runs] == [
+        (2, len(expected)),
+        (1, len(expected)),
+    ]
+    assert stored(db, rules=["open_key"], runs=[1]) == [
+        m for m in expected if m["rule"]["name"] == "open_key"
+    ]
+
+
+def test_store_resumes_from_a_checkpoint(trace, rules, tmp_path, monkeypatch):
+    analyze([trace], rules, tmp_path / "out.json")
+    expected = json.loads((tmp_path / "out.json").read_text(encoding="utf-8"))
+    db = tmp_path / "results.db"
+
+    with monkeypatch.context() as patch:
+        kill_after(patch, 5)
+        with pytest.raises(Killed):
+            analyze([trace], rules, db, checkpoint_every=1e-6)
+    analyze([trace], rules, db, resume=True)
+    assert stored(db) == expected
+
+
+def test_query_input_filter_is_a_literal_substring(rules, tmp_path):
+    traces = [
+        write_trace(tmp_path / name, 300, seed=seed)
+        for seed, name in enumerate(["Nt_a.json", "Ntxa.json"])
+    ]
+    db = tmp_path / "results.db"
+    analyze(traces, rules, db)
+
+    output = tmp_path / "query.json"
+    result = CliRunner().invoke(
+        app, ["query", "-s", str(db), "--input", "Nt_", "-o", str(output)]
+    )
+    assert result.exit_code == 0, result.output
+    matches = json.loads(output.read_text(encoding="utf-8"))
+    assert matches
+    assert {m["sources"]["input"] for m in matches} == {str(traces[0])}
@@ -0,0 +1,34 @@
+import json
+import re
+
+from ioc_extractor.utils.pipeline_executor import PipelineOptions, run_pipeline
+
+
+def first_ids(trace, pattern, count):
+    entries = json.loads(trace.read_text(encoding="utf-8"))
+    return [e["id"] for e in entries if re.match(pattern, e["api"])][:count]
+
+
+def test_triage_examples_are_the_first_hits_with_several_workers(
+    trace, rules, tmp_path
+):
+    expected = {
+        "read_file": first_ids(trace, "(?i)ReadFile", 3),
+        "open_key": first_ids(trace, "(?i)RegOpenKey", 3),
+    }
+    for run in range(3):
+        output = tmp_path / f"triage-{run}.json"
+        run_pipeline(
+            [str(trace)],
+            {str(trace): 20},
+            4,
+            rules,
+            PipelineOptions(
+                output_path=str(output),
+                show_matches=False,
+                triage=True,
+            ),
+        )
+        records = json.loads(output.read_text(encoding="utf-8"))
+        examples = {r["rule"]: [e["id"] for e in r["examples"]] for r in records}
+        assert examples == expected
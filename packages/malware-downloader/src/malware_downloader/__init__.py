@@ -5,10 +5,12 @@ from malware_downloader.commands import mb, vt
 
 load_dotenv()
 
+# Service clients (vt, pyzipper, malwarebazaar) are imported by the command
+# that uses them, once its arguments have been parsed.
 app = typer.Typer(no_args_is_help=True, pretty_exceptions_show_locals=False)
 
 app.add_typer(mb.app, name="mb")
 app.add_typer(vt.app, name="vt")
 
 if __name__ == "__main__":
-    app()
\ No newline at end of file
+    app()
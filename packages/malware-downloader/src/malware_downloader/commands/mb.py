@@ -2,7 +2,6 @@ import inspect
 import itertools
 from typing import Annotated
 
-import malware_downloader.services.mb as svc
 import typer
 from common.callbacks import verbose_callback
 from common.logger import get_logger
@@ -48,6 +47,8 @@ def download(
     ] = 0,
 ):
     """Download data from MalwareBazaar for one or more hashes."""
+    import malware_downloader.services.mb as svc
+
     logger.debug(f"Download command invoked with {len(hashes)} hashes")
     logger.debug(f"Output directory set to: '{output}'")
 
@@ -59,4 +60,4 @@ def download(
     ]
 
     for h, op in itertools.product(hashes, selected_ops):
-        run_operation(op, h, output)
\ No newline at end of file
+        run_operation(op, h, output)
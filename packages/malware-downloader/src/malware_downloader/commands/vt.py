@@ -2,7 +2,6 @@ import inspect
 import itertools
 from typing import Annotated
 
-import malware_downloader.services.vt as svc
 import typer
 from common.callbacks import verbose_callback
 from common.logger import get_logger
@@ -60,6 +59,8 @@ def download(
     ] = 0,
 ):
     """Download data from VirusTotal for one or more hashes."""
+    import malware_downloader.services.vt as svc
+
     logger.debug(f"Download command invoked with {len(hashes)} hashes")
     logger.debug(f"Output directory set to: '{output}'")
 
@@ -75,4 +76,4 @@ def download(
             run_operation(op, h, output)
     finally:
         logger.debug("Closing VirusTotal API client session")
-        svc.get_client().close()
\ No newline at end of file
+        svc.get_client().close()